@@ -0,0 +1,131 @@
+"""Benchmark full JSON decoding of leaderboard pages against the projected fast path.
+
+Usage:
+    uv run python benchmarks/decode_pages.py                       # synthetic BeatLeader-shaped pages
+    uv run python benchmarks/decode_pages.py --source scoresaber pages/*.json
+
+Page files are raw API responses, e.g. recorded with
+    curl -o page1.json "https://api.beatleader.xyz/leaderboards?type=ranked&page=1&count=100"
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs_map_downloader import decoding
+
+FULL = {
+    # What the fetchers did before projection: httpx's resp.json(), i.e. the whole document via the stdlib
+    "scoresaber": lambda body: json.loads(body).get("leaderboards", []),
+    "beatleader": lambda body: json.loads(body).get("data", []),
+}
+PROJECTIONS = {
+    "scoresaber": decoding.project_scoresaber,
+    "beatleader": decoding.project_beatleader,
+}
+
+
+def synthetic_beatleader_page(page: int, count: int = 100) -> bytes:
+    """A BeatLeader leaderboards page with realistically large nested song and difficulty objects."""
+    entries = []
+    for i in range(count):
+        n = page * count + i
+        entries.append(
+            {
+                "id": f"{n:x}91",
+                "song": {
+                    "id": f"{n:x}",
+                    "hash": f"{n:040X}",
+                    "name": f"Song {n}",
+                    "subName": "",
+                    "author": f"Artist {n % 97}",
+                    "mapper": f"Mapper {n % 31}",
+                    "coverImage": f"https://cdn.beatsaver.com/{n:040x}.jpg",
+                    "downloadUrl": f"https://cdn.beatsaver.com/{n:040x}.zip",
+                    "bpm": 120 + n % 100,
+                    "duration": 180 + n % 60,
+                    "tags": "tech,balanced",
+                    "difficulties": [
+                        {
+                            "id": n * 10 + d,
+                            "value": d * 2 + 1,
+                            "mode": 1,
+                            "difficultyName": name,
+                            "modeName": "Standard",
+                            "stars": 4.0 + d,
+                            "notes": 500 + d * 200,
+                            "bombs": d * 10,
+                            "walls": d * 20,
+                            "nps": 3.0 + d,
+                            "njs": 16 + d,
+                            "requirements": 0,
+                        }
+                        for d, name in enumerate(["Easy", "Normal", "Hard", "Expert", "ExpertPlus"])
+                    ],
+                },
+                "difficulty": {
+                    "id": n * 10 + 4,
+                    "stars": 7.5 + (n % 50) / 10,
+                    "rankedTime": 1_700_000_000 - n * 600,
+                    "modifierValues": {key: 0.0 for key in ("da", "fs", "sf", "ss", "gn", "na", "nb", "nf", "no")},
+                    "modifiersRating": {
+                        f"{mod}{rating}Rating": 8.1 for mod in ("fs", "sf", "ss") for rating in ("Pass", "Acc", "Tech")
+                    },
+                    "passRating": 6.9,
+                    "accRating": 9.1,
+                    "techRating": 7.3,
+                    "maxScore": 1_000_000,
+                },
+                "plays": 1000 + n,
+                "positiveVotes": 40,
+                "negativeVotes": 2,
+            }
+        )
+    return json.dumps({"metadata": {"page": page, "itemsPerPage": count, "total": 10_000}, "data": entries}).encode()
+
+
+def measure(decode, pages: list[bytes]) -> tuple[float, int]:
+    """Return (CPU ms per page, peak traced bytes) of decoding pages one after another.
+
+    Like a fetch loop, each page's result stays alive until the next page has been decoded.
+    """
+    start = time.process_time()
+    for body in pages:
+        decode(body)
+    cpu = (time.process_time() - start) / len(pages) * 1000
+
+    tracemalloc.start()
+    result = None
+    for body in pages:
+        result = decode(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return cpu, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", type=Path, help="Recorded raw page responses (default: synthetic)")
+    parser.add_argument("--source", choices=PROJECTIONS, default="beatleader")
+    parser.add_argument("--synthetic", type=int, default=50, help="Synthetic pages to generate (default: 50)")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = [path.read_bytes() for path in args.pages]
+    elif args.source == "beatleader":
+        pages = [synthetic_beatleader_page(page) for page in range(args.synthetic)]
+    else:
+        parser.error("Pass recorded ScoreSaber pages; only BeatLeader pages are synthesized")
+
+    size = sum(len(body) for body in pages) / len(pages)
+    print(f"{len(pages)} {args.source} pages, {size / 1024:.0f} KiB each, orjson: {decoding.orjson is not None}")
+    for label, decode in (("full json", FULL[args.source]), ("projected", PROJECTIONS[args.source])):
+        cpu, peak = measure(decode, pages)
+        print(f"  {label:10} {cpu:7.2f} ms/page  peak {peak / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
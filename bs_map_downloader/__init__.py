@@ -1,12 +1,70 @@
 """Beat Saber ranked map scraper package."""
 
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+# rich is imported on first output rather than here, so `--help` and library use of
+# modules like reader don't pay for it
 
-console = Console()
 
+class _Console:
+    """Proxy for a rich Console that is created on first use.
 
-def fetch_progress(label: str, **extra_columns: str) -> Progress:
+    In quiet mode print does nothing and no progress bars are rendered; only messages
+    passed to error are shown, on stderr.
+    """
+
+    def __init__(self):
+        self.quiet = False
+        self._console = None
+
+    @property
+    def rich(self):
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(stderr=self.quiet)
+        return self._console
+
+    def print(self, *objects, **kwargs) -> None:
+        if self.quiet:
+            return
+        self.rich.print(*objects, **kwargs)
+
+    def error(self, message: str) -> None:
+        """Print an error in red; shown even in quiet mode."""
+        self.rich.print(f"[red]{message}[/red]")
+
+    def __getattr__(self, name: str):
+        return getattr(self.rich, name)
+
+
+console = _Console()
+
+
+def set_quiet(quiet: bool = True) -> None:
+    """Switch between rich output and quiet mode (errors only, no progress bars)."""
+    console.quiet = quiet
+    console._console = None
+
+
+class _NullProgress:
+    """Stand-in for rich's Progress that renders nothing, used in quiet mode."""
+
+    def __enter__(self) -> "_NullProgress":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def add_task(self, *args, **kwargs) -> int:
+        return 0
+
+    def update(self, *args, **kwargs) -> None:
+        pass
+
+    def advance(self, *args, **kwargs) -> None:
+        pass
+
+
+def fetch_progress(label: str, **extra_columns: str):
     """Create a reusable progress bar for fetch functions.
 
     Args:
@@ -14,9 +72,30 @@ def fetch_progress(label: str, **extra_columns: str) -> Progress:
         **extra_columns: Additional task field columns as format strings
                          (e.g. page="page {task.fields[page]}")
     """
+    if console.quiet:
+        return _NullProgress()
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
     columns = [
         SpinnerColumn(),
         TextColumn(f"[bold blue]{label}"),
         *[TextColumn(fmt) for fmt in extra_columns.values()],
     ]
-    return Progress(*columns, console=console)
+    return Progress(*columns, console=console.rich)
+
+
+def download_progress(label: str):
+    """Create a progress bar with a completion bar and ETA, for a known number of items."""
+    if console.quiet:
+        return _NullProgress()
+    from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn, TimeRemainingColumn
+
+    return Progress(
+        SpinnerColumn(),
+        TextColumn(f"[bold blue]{label}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        TextColumn("·"),
+        TimeRemainingColumn(),
+        console=console.rich,
+    )
@@ -0,0 +1,74 @@
+"""Persistent cache of BeatSaver hash lookups, including negative (not found) results."""
+
+import sqlite3
+import time
+from pathlib import Path
+
+CACHE_NAME = ".lookup-cache.sqlite"
+# Download URLs are keyed by the immutable song hash, so hits can live long
+HIT_TTL = 30 * 24 * 3600
+# Maps can be (re)published on BeatSaver, so misses are rechecked sooner
+MISS_TTL = 24 * 3600
+COMMIT_EVERY = 100
+
+
+class LookupCache:
+    """song hash → download URL (or "not found") with per-entry expiry, stored in SQLite."""
+
+    def __init__(self, path: Path, hit_ttl: float = HIT_TTL, miss_ttl: float = MISS_TTL):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lookups (song_hash TEXT PRIMARY KEY, url TEXT, expires REAL NOT NULL)"
+        )
+        self._uncommitted = 0
+
+    def __enter__(self) -> "LookupCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def get(self, song_hash: str) -> tuple[bool, str | None]:
+        """Return (hit, url). A hit with url None means the hash is known not to exist."""
+        row = self._db.execute(
+            "SELECT url FROM lookups WHERE song_hash = ? AND expires > ?", (song_hash, time.time())
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, row[0]
+
+    def _put(self, song_hash: str, url: str | None, ttl: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO lookups (song_hash, url, expires) VALUES (?, ?, ?)",
+            (song_hash, url, time.time() + ttl),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def put_url(self, song_hash: str, url: str) -> None:
+        self._put(song_hash, url, self.hit_ttl)
+
+    def put_missing(self, song_hash: str) -> None:
+        self._put(song_hash, None, self.miss_ttl)
+
+    def forget(self, song_hash: str) -> None:
+        """Drop the entry for song_hash, e.g. because its cached URL stopped working."""
+        self._db.execute("DELETE FROM lookups WHERE song_hash = ?", (song_hash,))
+        self._db.commit()
+
+    def prune(self) -> int:
+        """Delete expired entries. Returns how many were removed."""
+        removed = self._db.execute("DELETE FROM lookups WHERE expires <= ?", (time.time(),)).rowcount
+        self._db.commit()
+        return removed
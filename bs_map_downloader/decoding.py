@@ -0,0 +1,65 @@
+"""Fast JSON decoding of API pages, projected down to the fields the fetchers read."""
+
+import json
+from typing import Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON with orjson when it is installed, else with the stdlib."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class LeaderboardRow(NamedTuple):
+    """The fields of a ranked leaderboard entry that become a MapInfo.
+
+    ranked is the source's raw ranked time: an ISO string for ScoreSaber, a Unix
+    timestamp for BeatLeader.
+    """
+
+    song_hash: str
+    song_name: str
+    song_author: str
+    mapper: str
+    stars: float
+    ranked: Any
+
+
+def project_scoresaber(body: bytes) -> list[LeaderboardRow]:
+    """Decode a ScoreSaber leaderboards page into rows, dropping every other field."""
+    return [
+        LeaderboardRow(
+            entry["songHash"].lower(),
+            entry.get("songName", ""),
+            entry.get("songAuthorName", ""),
+            entry.get("levelAuthorName", ""),
+            entry.get("stars", 0),
+            entry["rankedDate"],
+        )
+        for entry in loads(body).get("leaderboards", [])
+    ]
+
+
+def project_beatleader(body: bytes) -> list[LeaderboardRow]:
+    """Decode a BeatLeader leaderboards page into rows, dropping the nested difficulty and song details."""
+    rows = []
+    for entry in loads(body).get("data", []):
+        song = entry.get("song", {})
+        difficulty = entry.get("difficulty", {})
+        rows.append(
+            LeaderboardRow(
+                song.get("hash", "").lower(),
+                song.get("name", ""),
+                song.get("author", ""),
+                song.get("mapper", ""),
+                difficulty.get("stars", 0),
+                difficulty.get("rankedTime", 0),
+            )
+        )
+    return rows
@@ -0,0 +1,150 @@
+"""Compact, disk-backed set of song hashes for deduplicating catalog-scale fetches."""
+
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+
+from bs_map_downloader.models import MapInfo
+
+# Expected number of hashes; past it the Bloom filter's false-positive rate rises,
+# which costs extra disk lookups but never wrong answers
+DEFAULT_CAPACITY = 1_000_000
+FALSE_POSITIVE_RATE = 0.01
+COMMIT_EVERY = 1000
+# Temporary sets stay in memory up to this many hashes (about 4 MiB) before moving to disk
+SPILL_AT = 50_000
+
+
+def digest(song_hash: str) -> bytes:
+    """20-byte binary form of a song hash (the SHA-1 itself for 40-hex-digit hashes)."""
+    song_hash = song_hash.lower()
+    if len(song_hash) == 40:
+        try:
+            return bytes.fromhex(song_hash)
+        except ValueError:
+            pass
+    return hashlib.blake2b(song_hash.encode(), digest_size=20).digest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 20-byte digests."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = FALSE_POSITIVE_RATE):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        # Digests are uniformly distributed, so two slices give independent hashes
+        h1 = int.from_bytes(key[:8], "big")
+        h2 = int.from_bytes(key[8:16], "big") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class HashSet:
+    """Set of song hashes stored as binary digests in SQLite, fronted by a Bloom filter.
+
+    Only the hash set is kept off-heap: most lookups of new hashes are answered by the
+    Bloom filter alone, and only possible duplicates hit the disk. Without a path, the
+    hashes are held in memory until spill_at of them have been added, then moved to a
+    temporary database that is deleted on close, so small fetches never touch disk.
+    """
+
+    def __init__(self, path: Path | None = None, capacity: int = DEFAULT_CAPACITY, spill_at: int = SPILL_AT):
+        self._temp = path is None
+        self._spill_at = spill_at
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._memory: set[bytes] | None = set() if path is None else None
+        self._bloom: BloomFilter | None = None
+        self._capacity = capacity
+        self._len = 0
+        if path is not None:
+            self._open(path)
+            for (key,) in self._db.execute("SELECT digest FROM hashes"):
+                self._bloom.add(key)
+                self._len += 1
+
+    def _open(self, path: Path) -> None:
+        self._db = sqlite3.connect(path)
+        # Throwaway data: skip the journal and fsyncs
+        self._db.execute("PRAGMA journal_mode=OFF" if self._temp else "PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF" if self._temp else "PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS hashes (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._bloom = BloomFilter(self._capacity)
+
+    def _spill(self) -> None:
+        fd, name = tempfile.mkstemp(prefix="bs-map-hashes-", suffix=".sqlite")
+        os.close(fd)
+        self.path = Path(name)
+        self._open(self.path)
+        self._db.executemany("INSERT INTO hashes VALUES (?)", ((key,) for key in self._memory))
+        self._db.commit()
+        for key in self._memory:
+            self._bloom.add(key)
+        self._memory = None
+
+    def __enter__(self) -> "HashSet":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        self._db.commit()
+        self._db.close()
+        if self._temp:
+            self.path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _has(self, key: bytes) -> bool:
+        if self._memory is not None:
+            return key in self._memory
+        if key not in self._bloom:
+            return False
+        return self._db.execute("SELECT 1 FROM hashes WHERE digest = ?", (key,)).fetchone() is not None
+
+    def __contains__(self, song_hash: str) -> bool:
+        return self._has(digest(song_hash))
+
+    def add(self, song_hash: str) -> bool:
+        """Add a hash. Returns False if it was already present."""
+        key = digest(song_hash)
+        if self._has(key):
+            return False
+        self._len += 1
+        if self._memory is not None:
+            self._memory.add(key)
+            if self._len >= self._spill_at:
+                self._spill()
+            return True
+        self._db.execute("INSERT INTO hashes VALUES (?)", (key,))
+        self._bloom.add(key)
+        if self._len % COMMIT_EVERY == 0:
+            self._db.commit()
+        return True
+
+
+def unique_maps(maps: Iterable[MapInfo], seen: HashSet | set[str]) -> list[MapInfo]:
+    """Return the maps whose hash isn't in seen yet (first occurrence wins), adding them to it."""
+    result = []
+    for m in maps:
+        if m.song_hash not in seen:
+            seen.add(m.song_hash)
+            result.append(m)
+    return result
@@ -1,61 +1,215 @@
 """Map download logic with concurrency control."""
 
 import asyncio
+import math
+import multiprocessing
+import queue
+import shutil
+import time
 import zipfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 
 import httpx
-from rich.progress import (
-    BarColumn,
-    Progress,
-    SpinnerColumn,
-    TaskProgressColumn,
-    TextColumn,
-    TimeRemainingColumn,
-)
-
-from bs_map_downloader import console
+
+from bs_map_downloader import console, download_progress, set_quiet
+from bs_map_downloader.cache import LookupCache
+from bs_map_downloader.hedging import Hedger
+from bs_map_downloader.mirrors import DEFAULT_MIRRORS, MirrorPool
 from bs_map_downloader.models import MapInfo
+from bs_map_downloader.ratelimit import THROTTLED_CHUNK_SIZE, BandwidthLimiter, Pacer
+from bs_map_downloader.scheduler import DownloadScheduler
+from bs_map_downloader.sharding import Shard
 
 BEATSAVER_MAP_API = "https://api.beatsaver.com/maps/hash"
 DOWNLOADS_DIR = Path.cwd() / "downloads"
+PARTIAL_SUFFIX = ".partial"
+# Minimum spacing between BeatSaver map lookups
+LOOKUP_INTERVAL = 0.1
 
 
-async def download_map(
+async def fetch_zip(
     client: httpx.AsyncClient,
-    map_info: MapInfo,
+    url: str,
     dest: Path,
-    semaphore: asyncio.Semaphore,
-) -> bool:
-    """Look up map on BeatSaver and download the zip. Returns True on success."""
-    async with semaphore:
-        await asyncio.sleep(0.1)
+    mirrors: MirrorPool | None = None,
+    alternate: bool = False,
+    limiter: BandwidthLimiter | None = None,
+) -> None:
+    """Stream a zip to dest, trying each mirror of url in turn until one succeeds.
+
+    The body is written to a ``.part`` file renamed into place on completion, so an
+    interrupted transfer never looks like a finished download. Every attempt is
+    reported to mirrors, which ranks hosts for subsequent transfers. With alternate,
+    the second-best mirror is tried first (used for hedged transfers). With a
+    limiter, each received chunk waits for its share of the bandwidth cap.
+    """
+    urls = mirrors.candidates(url) if mirrors else [url]
+    if alternate and len(urls) > 1:
+        urls = urls[1:] + urls[:1]
+    part = dest.with_name(f"{dest.name}.{'alt.' if alternate else ''}part")
+    for i, candidate in enumerate(urls):
+        start = time.monotonic()
         try:
-            download_url = map_info.download_url
-            if not download_url:
-                meta_resp = await client.get(f"{BEATSAVER_MAP_API}/{map_info.song_hash}")
-                if meta_resp.status_code == 404:
-                    console.print(f"[yellow]Not found on BeatSaver: {map_info.song_hash}[/yellow]")
-                    return False
-                meta_resp.raise_for_status()
-                map_data = meta_resp.json()
-                download_url = map_data["versions"][0]["downloadURL"]
-
-            dl_resp = await client.get(download_url, follow_redirects=True)
-            dl_resp.raise_for_status()
-            dest.write_bytes(dl_resp.content)
-            return True
-        except (httpx.HTTPError, KeyError, IndexError) as e:
-            console.print(f"[red]Failed {map_info.song_hash}: {e}[/red]")
+            async with client.stream("GET", candidate, follow_redirects=True) as resp:
+                resp.raise_for_status()
+                first_byte = time.monotonic()
+                nbytes = 0
+                chunk_size = THROTTLED_CHUNK_SIZE if limiter else None
+                with part.open("wb") as f:
+                    async for chunk in resp.aiter_bytes(chunk_size):
+                        if limiter:
+                            await limiter.throttle(candidate, len(chunk))
+                        f.write(chunk)
+                        nbytes += len(chunk)
+        except asyncio.CancelledError:
+            part.unlink(missing_ok=True)
+            raise
+        except httpx.HTTPError as e:
+            part.unlink(missing_ok=True)
+            # 4xx means this mirror lacks the file, not that the host is unhealthy
+            client_error = isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500
+            if mirrors and not client_error:
+                mirrors.record_failure(candidate)
+            if i == len(urls) - 1:
+                raise
+            continue
+
+        if mirrors:
+            mirrors.record_success(candidate, first_byte - start, nbytes, time.monotonic() - first_byte)
+        part.replace(dest)
+        return
+
+
+async def resolve_map(
+    client: httpx.AsyncClient,
+    map_info: MapInfo,
+    hedger: Hedger | None = None,
+    cache: LookupCache | None = None,
+) -> bool:
+    """Fill in map_info.download_url from BeatSaver if unknown. Returns True on success.
+
+    With a cache, cached hits and misses are answered without a request, and new
+    results (including "not found") are recorded.
+    """
+    if map_info.download_url:
+        return True
+    if cache:
+        hit, url = cache.get(map_info.song_hash)
+        if hit:
+            map_info.download_url = url
+            return url is not None
+    lookup_url = f"{BEATSAVER_MAP_API}/{map_info.song_hash}"
+    try:
+        if hedger:
+            meta_resp = await hedger.run("lookup", lambda: client.get(lookup_url))
+        else:
+            meta_resp = await client.get(lookup_url)
+        if meta_resp.status_code == 404:
+            console.print(f"[yellow]Not found on BeatSaver: {map_info.song_hash}[/yellow]")
+            if cache:
+                cache.put_missing(map_info.song_hash)
             return False
+        meta_resp.raise_for_status()
+        map_data = meta_resp.json()
+        map_info.download_url = map_data["versions"][0]["downloadURL"]
+        if cache:
+            cache.put_url(map_info.song_hash, map_info.download_url)
+        return True
+    except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+        console.error(f"Failed {map_info.song_hash}: {e}")
+        return False
+
+
+async def transfer_map(
+    client: httpx.AsyncClient,
+    map_info: MapInfo,
+    dest: Path,
+    mirrors: MirrorPool | None = None,
+    hedger: Hedger | None = None,
+    limiter: BandwidthLimiter | None = None,
+    cache: LookupCache | None = None,
+) -> bool:
+    """Download a resolved map's zip to dest. Returns True on success.
+
+    If the URL turns out not to exist (404), its entry in cache is dropped so the
+    next run looks the map up again instead of reusing the dead URL.
+    """
+    url = map_info.download_url
+    try:
+        if hedger:
+            await hedger.run(
+                "transfer",
+                lambda: fetch_zip(client, url, dest, mirrors, limiter=limiter),
+                lambda: fetch_zip(client, url, dest, mirrors, alternate=True, limiter=limiter),
+            )
+        else:
+            await fetch_zip(client, url, dest, mirrors, limiter=limiter)
+        return True
+    except httpx.HTTPError as e:
+        console.error(f"Failed {map_info.song_hash}: {e}")
+        if cache and isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 404:
+            cache.forget(map_info.song_hash)
+        return False
 
 
-async def download_all(maps: list[MapInfo]) -> list[MapInfo]:
+async def download_all(
+    maps: list[MapInfo],
+    install_dir: Path | None = None,
+    install_workers: int = 4,
+    mirrors: list[str] | None = None,
+    hedge_budget: float | None = None,
+    order: str = "input",
+    concurrency: int = 5,
+    resolvers: int = 2,
+    max_inflight_bytes: int | None = None,
+    max_rate: float | None = None,
+    max_host_rate: float | None = None,
+    client: httpx.AsyncClient | None = None,
+    lookup_cache: Path | None = None,
+    cache: LookupCache | None = None,
+    processes: int = 1,
+    lookup_interval: float = LOOKUP_INTERVAL,
+    on_result: Callable[[MapInfo, bool], None] | None = None,
+) -> list[MapInfo]:
     """Download all maps with a progress bar and concurrency limit.
 
+    BeatSaver lookups and zip transfers run as separate stages: a pool of resolvers
+    workers paced to the API rate limit feeds a pool of concurrency transfer workers,
+    so slow lookups never hold transfer capacity and vice versa. Both stages take
+    maps in priority order (see scheduler.ORDERS); with max_inflight_bytes the
+    estimated size of transfers in flight is kept under that cap. max_rate and max_host_rate cap the total
+    and per-host download rate in bytes/s, shared fairly between concurrent transfers.
+
+    Zips are fetched from whichever of mirrors (default DEFAULT_MIRRORS) is currently
+    fastest, failing over to the others on errors. If hedge_budget is set, slow
+    lookups and transfers are hedged, with backup requests capped at that fraction
+    of all requests.
+
+    If install_dir is given, each map is extracted into install_dir/{song_hash}/ by a
+    pool of install_workers threads as soon as its zip is on disk, overlapping
+    extraction with the remaining downloads.
+
+    With lookup_cache, BeatSaver hash lookups are answered from (and recorded in) a
+    persistent cache at that path: cached URLs skip the resolve stage entirely and
+    hashes known to be missing are not requested again until their entry expires.
+    An already open cache can be passed as cache instead; it is left open.
+
+    With processes > 1, the pending maps are partitioned by song hash across that
+    many worker processes, each running this pipeline with its own event loop and
+    client and an equal share of the concurrency and rate limits, and reporting each
+    result back to this process. The lookup cache stays in this process: workers
+    send their lookup results back with the download results, so only one process
+    ever writes to the cache file. Otherwise an existing client can be passed in to
+    reuse its connections across calls. on_result is called with each pending map
+    and whether it downloaded.
+
     Returns the list of successfully downloaded/existing maps.
     """
     DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    installer = _Installer(DOWNLOADS_DIR, install_dir, install_workers) if install_dir else None
 
     pending: list[MapInfo] = []
     existing: list[MapInfo] = []
@@ -70,42 +224,261 @@ async def download_all(maps: list[MapInfo]) -> list[MapInfo]:
         console.print(f"[dim]Skipping {len(existing)} already-downloaded maps.[/dim]")
 
     successful = list(existing)
+    if installer:
+        for m in existing:
+            installer.submit(m)
 
-    if not pending:
-        console.print("[green]All maps already downloaded, nothing to do.[/green]")
-    else:
-        semaphore = asyncio.Semaphore(5)
-        results: dict[str, bool] = {}
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[bold blue]Downloading maps"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TextColumn("·"),
-            TimeRemainingColumn(),
-            console=console,
-        ) as progress:
-            task = progress.add_task("download", total=len(pending))
-
-            async with httpx.AsyncClient(timeout=60) as client:
-                async def _download(map_info: MapInfo):
-                    dest = DOWNLOADS_DIR / f"{map_info.song_hash}.zip"
-                    success = await download_map(client, map_info, dest, semaphore)
+    own_cache = cache is None and lookup_cache is not None and bool(pending)
+    if own_cache:
+        cache = LookupCache(lookup_cache)
+    known_missing = 0
+    if cache:
+        pending, known_missing = _apply_lookup_cache(cache, pending)
+        if known_missing:
+            console.print(f"[dim]Skipping {known_missing} maps known to be missing from BeatSaver.[/dim]")
+
+    try:
+        if not pending:
+            if not known_missing:
+                console.print("[green]All maps already downloaded, nothing to do.[/green]")
+        else:
+            results: dict[str, bool] = {}
+            hedger = None
+
+            with download_progress("Downloading maps") as progress:
+                task = progress.add_task("download", total=len(pending))
+
+                def record(map_info: MapInfo, success: bool) -> None:
                     results[map_info.song_hash] = success
+                    if success and installer:
+                        installer.submit(map_info)
                     progress.advance(task)
+                    if on_result:
+                        on_result(map_info, success)
+
+                if processes > 1:
+                    # Each process gets an equal share of the concurrency and rate limits
+                    worker_options = {
+                        "mirrors": mirrors,
+                        "hedge_budget": hedge_budget,
+                        "order": order,
+                        "concurrency": math.ceil(concurrency / processes),
+                        "resolvers": math.ceil(resolvers / processes),
+                        "max_inflight_bytes": max_inflight_bytes // processes if max_inflight_bytes else None,
+                        "max_rate": max_rate / processes if max_rate else None,
+                        "max_host_rate": max_host_rate / processes if max_host_rate else None,
+                        "lookup_interval": lookup_interval * processes,
+                    }
+                    await _download_in_processes(pending, processes, worker_options, record, cache)
+                else:
+                    scheduler = DownloadScheduler(order, concurrency, max_inflight_bytes, resolvers)
+                    pacer = Pacer(lookup_interval)
+                    for m in pending:
+                        scheduler.put(m)
+                    mirror_pool = MirrorPool(mirrors if mirrors is not None else DEFAULT_MIRRORS)
+                    hedger = Hedger(budget=hedge_budget) if hedge_budget else None
+                    limiter = BandwidthLimiter(max_rate, max_host_rate) if max_rate or max_host_rate else None
 
-                await asyncio.gather(*[_download(m) for m in pending])
+                    async with nullcontext(client) if client else httpx.AsyncClient(timeout=60) as client:
+                        async def _resolve(map_info: MapInfo) -> bool:
+                            await pacer.wait()
+                            success = await resolve_map(client, map_info, hedger, cache)
+                            if not success:
+                                record(map_info, False)
+                            return success
 
-        newly = sum(1 for v in results.values() if v)
-        failed = len(pending) - newly
-        console.print(f"[green]Downloaded {newly} new maps ({failed} failed).[/green]")
+                        async def _transfer(map_info: MapInfo) -> int | None:
+                            dest = DOWNLOADS_DIR / f"{map_info.song_hash}.zip"
+                            success = await transfer_map(
+                                client, map_info, dest, mirror_pool, hedger, limiter, cache
+                            )
+                            record(map_info, success)
+                            return dest.stat().st_size if success else None
 
-        successful.extend(m for m in pending if results.get(m.song_hash, False))
+                        await scheduler.run(_transfer, _resolve)
+
+            newly = sum(1 for v in results.values() if v)
+            failed = len(pending) - newly
+            console.print(f"[green]Downloaded {newly} new maps ({failed} failed).[/green]")
+            if hedger and hedger.budget.spent:
+                console.print(f"[dim]Hedged {hedger.budget.spent} slow requests ({hedger.wins} backups won).[/dim]")
+
+            successful.extend(m for m in pending if results.get(m.song_hash, False))
+    finally:
+        if own_cache:
+            cache.close()
+
+    if installer:
+        await installer.finish()
 
     return successful
 
 
+# Module settings a spawned worker process copies from its parent
+_WORKER_SETTINGS = ("DOWNLOADS_DIR", "BEATSAVER_MAP_API")
+
+
+class _CacheUpdates:
+    """Stand-in for LookupCache in worker processes that forwards every write to the parent.
+
+    The parent has already applied its cache to the maps it hands out, so reads miss.
+    """
+
+    def __init__(self, results):
+        self._results = results
+
+    def get(self, song_hash: str) -> tuple[bool, str | None]:
+        return False, None
+
+    def put_url(self, song_hash: str, url: str) -> None:
+        self._results.put(("put_url", song_hash, url))
+
+    def put_missing(self, song_hash: str) -> None:
+        self._results.put(("put_missing", song_hash, None))
+
+    def forget(self, song_hash: str) -> None:
+        self._results.put(("forget", song_hash, None))
+
+
+def _process_worker(maps: list[MapInfo], options: dict, settings: dict, results) -> None:
+    """Entry point of a download worker process: download maps, reporting each result on results."""
+    globals().update(settings)
+    set_quiet()
+    asyncio.run(
+        download_all(
+            maps,
+            cache=_CacheUpdates(results),
+            on_result=lambda m, ok: results.put(("result", m.song_hash, ok)),
+            **options,
+        )
+    )
+
+
+async def _download_in_processes(
+    maps: list[MapInfo],
+    processes: int,
+    options: dict,
+    record: Callable[[MapInfo, bool], None],
+    cache: LookupCache | None = None,
+) -> None:
+    """Download maps in hash-partitioned slices across worker processes, recording results as they arrive.
+
+    Lookup results the workers send back are written to cache.
+    """
+    # Spawned rather than forked: this process has a running event loop and threads
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    by_hash = {m.song_hash: m for m in maps}
+    settings = {name: globals()[name] for name in _WORKER_SETTINGS}
+    workers = [
+        ctx.Process(target=_process_worker, args=(part, options, settings, results), daemon=True)
+        for part in (Shard(i, processes).filter(maps) for i in range(processes))
+        if part
+    ]
+    for worker in workers:
+        worker.start()
+
+    loop = asyncio.get_running_loop()
+    remaining = len(maps)
+    try:
+        while remaining:
+            try:
+                kind, song_hash, value = await loop.run_in_executor(None, results.get, True, 0.5)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    console.error(f"Download workers exited with {remaining} maps unreported.")
+                    break
+                continue
+            if kind == "result":
+                record(by_hash[song_hash], value)
+                remaining -= 1
+            elif cache and kind == "put_url":
+                cache.put_url(song_hash, value)
+            elif cache and kind == "put_missing":
+                cache.put_missing(song_hash)
+            elif cache and kind == "forget":
+                cache.forget(song_hash)
+    finally:
+        for worker in workers:
+            if remaining:
+                worker.terminate()
+            worker.join()
+
+
+def _apply_lookup_cache(cache: LookupCache, maps: list[MapInfo]) -> tuple[list[MapInfo], int]:
+    """Fill in cached download URLs. Returns the maps not known to be missing, and how many were."""
+    remaining: list[MapInfo] = []
+    for m in maps:
+        if not m.download_url:
+            hit, url = cache.get(m.song_hash)
+            if hit and url is None:
+                continue
+            m.download_url = url
+        remaining.append(m)
+    return remaining, len(maps) - len(remaining)
+
+
+def extract_map(zip_path: Path, dest: Path) -> None:
+    """Extract a map zip into dest atomically, replacing any existing directory.
+
+    Files are extracted into a sibling ``.{name}.partial`` directory that is renamed into
+    place once complete, so an interrupted extraction never leaves a half-filled dest.
+    """
+    partial = dest.with_name(f".{dest.name}{PARTIAL_SUFFIX}")
+    if partial.exists():
+        shutil.rmtree(partial)
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            zf.extractall(partial)
+        if dest.exists():
+            shutil.rmtree(dest)
+        partial.rename(dest)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+
+def install_map(zip_path: Path, dest: Path) -> bool:
+    """Extract one map zip into dest. Returns False if dest already exists."""
+    if dest.exists():
+        return False
+    extract_map(zip_path, dest)
+    return True
+
+
+class _Installer:
+    """Extracts maps on a thread pool while downloads are still in flight."""
+
+    def __init__(self, downloads_dir: Path, install_dir: Path, workers: int):
+        self.downloads_dir = downloads_dir
+        self.install_dir = install_dir
+        self.install_dir.mkdir(parents=True, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="install")
+        self._futures: list[asyncio.Future[bool | None]] = []
+
+    def _install(self, song_hash: str) -> bool | None:
+        try:
+            return install_map(self.downloads_dir / f"{song_hash}.zip", self.install_dir / song_hash)
+        except (zipfile.BadZipFile, OSError) as e:
+            console.error(f"Failed to install {song_hash}: {e}")
+            return None
+
+    def submit(self, map_info: MapInfo) -> None:
+        loop = asyncio.get_running_loop()
+        self._futures.append(loop.run_in_executor(self._pool, self._install, map_info.song_hash))
+
+    async def finish(self) -> None:
+        try:
+            outcomes = await asyncio.gather(*self._futures)
+        finally:
+            self._pool.shutdown()
+        installed = sum(1 for o in outcomes if o is True)
+        skipped = sum(1 for o in outcomes if o is False)
+        console.print(
+            f"[green]Installed {installed} maps to {self.install_dir} ({skipped} already present).[/green]"
+        )
+
+
 def install_maps(maps: list[MapInfo], downloads_dir: Path, install_dir: Path) -> None:
     """Extract downloaded zips into install_dir/{song_hash}/, skipping already-extracted."""
     install_dir.mkdir(parents=True, exist_ok=True)
@@ -122,8 +495,7 @@ def install_maps(maps: list[MapInfo], downloads_dir: Path, install_dir: Path) ->
         if not zip_path.exists():
             continue
 
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(dest)
+        install_map(zip_path, dest)
         installed += 1
 
     console.print(f"[green]Installed {installed} maps to {install_dir} ({skipped} already present).[/green]")
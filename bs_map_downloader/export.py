@@ -0,0 +1,185 @@
+"""Packing downloaded map zips into large tar shards with a sidecar index."""
+
+import io
+import json
+import os
+import re
+import tarfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from bs_map_downloader import console
+from bs_map_downloader.filters import INFO_DAT_FIELDS, MapFilter, features_from_info_dat, features_from_map_info
+from bs_map_downloader.models import MapInfo
+from bs_map_downloader.reader import MapArchive
+
+INDEX_NAME = "index.jsonl"
+DEFAULT_SHARD_SIZE = 1024**3
+_SHARD_RE = re.compile(r"^maps-(\d+)\.tar$")
+
+
+@dataclass
+class IndexEntry:
+    """Where a map's zip lives: byte offset and size of the tar member data within shard."""
+
+    song_hash: str
+    shard: str
+    offset: int
+    size: int
+    metadata: dict | None = None
+
+
+def shard_name(number: int) -> str:
+    return f"maps-{number:05d}.tar"
+
+
+def load_index(out_dir: Path) -> dict[str, IndexEntry]:
+    """Read the sidecar index of an export directory (song hash → entry)."""
+    index: dict[str, IndexEntry] = {}
+    path = out_dir / INDEX_NAME
+    if path.exists():
+        with path.open() as f:
+            for line in f:
+                entry = IndexEntry(**json.loads(line))
+                index[entry.song_hash] = entry
+    return index
+
+
+def read_exported(out_dir: Path, entry: IndexEntry) -> bytes:
+    """Return a map's zip bytes from its shard, with one seek and read."""
+    with (out_dir / entry.shard).open("rb") as f:
+        f.seek(entry.offset)
+        return f.read(entry.size)
+
+
+def _tar_size(zip_size: int, metadata: dict | None) -> int:
+    """Bytes a map adds to a shard: 512-byte headers plus data padded to 512."""
+    size = 512 + (zip_size + 511) // 512 * 512
+    if metadata is not None:
+        size += 512 + 512 * ((len(json.dumps(metadata)) + 511) // 512)
+    return size
+
+
+def plan_shards(
+    maps: list[tuple[str, MapInfo | None]],
+    downloads_dir: Path,
+    shard_size: int,
+) -> Iterator[list[tuple[str, MapInfo | None]]]:
+    """Group maps, in order, into shards of at most shard_size bytes (a larger map gets its own)."""
+    group: list[tuple[str, MapInfo | None]] = []
+    total = 0
+    for song_hash, m in maps:
+        size = _tar_size((downloads_dir / f"{song_hash}.zip").stat().st_size, m and m.to_metadata())
+        if group and total + size > shard_size:
+            yield group
+            group, total = [], 0
+        group.append((song_hash, m))
+        total += size
+    if group:
+        yield group
+
+
+def write_shard(path: Path, maps: list[tuple[str, MapInfo | None]], downloads_dir: Path) -> list[IndexEntry]:
+    """Write maps into a tar shard at path ({hash}.zip, plus {hash}.json when metadata is known).
+
+    The shard is written under a temporary name and renamed once complete.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    entries = []
+    with tarfile.open(tmp, "w", format=tarfile.PAX_FORMAT) as tar:
+        for song_hash, m in maps:
+            zip_path = downloads_dir / f"{song_hash}.zip"
+            info = tar.gettarinfo(zip_path, arcname=f"{song_hash}.zip")
+            # Integral mtime and no owner keep headers to one 512-byte block
+            info.mtime = int(info.mtime)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with zip_path.open("rb") as f:
+                tar.addfile(info, f)
+            # The data ends the member, padded to a 512-byte block
+            offset = tar.offset - (info.size + 511) // 512 * 512
+            entries.append(IndexEntry(song_hash, path.name, offset, info.size))
+
+            if m is not None:
+                metadata = m.to_metadata()
+                data = json.dumps(metadata).encode()
+                meta_info = tarfile.TarInfo(f"{song_hash}.json")
+                meta_info.size = len(data)
+                meta_info.mtime = info.mtime
+                tar.addfile(meta_info, io.BytesIO(data))
+                entries[-1].metadata = metadata
+    os.replace(tmp, path)
+    return entries
+
+
+def _matches(song_hash: str, m: MapInfo | None, downloads_dir: Path, map_filter: MapFilter) -> bool:
+    features = features_from_map_info(m) if m else {}
+    if map_filter.fields & INFO_DAT_FIELDS:
+        try:
+            with MapArchive(downloads_dir / f"{song_hash}.zip") as archive:
+                features.update(features_from_info_dat(archive.info()))
+        except (OSError, ValueError, KeyError):
+            return False
+    return map_filter.matches(features)
+
+
+def export_shards(
+    downloads_dir: Path,
+    out_dir: Path,
+    maps: list[MapInfo] | None = None,
+    map_filter: MapFilter | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int = 4,
+) -> list[IndexEntry]:
+    """Pack downloaded zips into tar shards in out_dir and extend its index.
+
+    Exports the given maps (with their metadata), or every zip in downloads_dir if
+    maps is None, skipping maps already in the index, so re-running only adds new
+    maps. Existing shards are never rewritten; new maps go into new shards, written
+    by up to workers threads in parallel. map_filter may use MapInfo fields and,
+    read from each zip, Info.dat fields.
+
+    Returns the index entries added.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = load_index(out_dir)
+
+    if maps is None:
+        candidates: list[tuple[str, MapInfo | None]] = [
+            (p.stem, None) for p in sorted(downloads_dir.glob("*.zip")) if p.stat().st_size > 0
+        ]
+    else:
+        candidates = [(m.song_hash, m) for m in maps if (downloads_dir / f"{m.song_hash}.zip").exists()]
+    candidates = [(h, m) for h, m in candidates if h not in index]
+
+    if map_filter and candidates:
+        with ThreadPoolExecutor(workers) as pool:
+            keep = list(pool.map(lambda c: _matches(c[0], c[1], downloads_dir, map_filter), candidates))
+        candidates = [c for c, k in zip(candidates, keep) if k]
+
+    if not candidates:
+        console.print("[green]Nothing new to export.[/green]")
+        return []
+
+    numbers = [int(m.group(1)) for e in index.values() if (m := _SHARD_RE.match(e.shard))]
+    next_number = max(numbers, default=-1) + 1
+    groups = list(plan_shards(candidates, downloads_dir, shard_size))
+
+    added: list[IndexEntry] = []
+    with ThreadPoolExecutor(workers) as pool, (out_dir / INDEX_NAME).open("a") as index_file:
+        futures = [
+            pool.submit(write_shard, out_dir / shard_name(next_number + i), group, downloads_dir)
+            for i, group in enumerate(groups)
+        ]
+        # Index lines are appended only once their shard is complete
+        for future in as_completed(futures):
+            entries = future.result()
+            for entry in entries:
+                index_file.write(json.dumps(asdict(entry)) + "\n")
+            index_file.flush()
+            added.extend(entries)
+
+    console.print(f"[green]Exported {len(added)} maps into {len(groups)} new shards in {out_dir}.[/green]")
+    return added
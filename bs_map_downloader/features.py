@@ -0,0 +1,156 @@
+"""Beat-aligned mel-spectrogram and onset features from map audio (needs numpy and soundfile)."""
+
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from zipfile import BadZipFile
+
+import numpy as np
+import soundfile
+
+from bs_map_downloader import console, download_progress
+from bs_map_downloader.reader import MapArchive, song_bpm
+
+N_MELS = 80
+FMIN = 30.0
+FMAX = 11025.0
+# STFT window and hop in seconds, so features don't depend on the audio's sample rate
+WINDOW_SECONDS = 0.046
+HOP_SECONDS = 0.0116
+# Feature grid resolution: Beat Saber notes sit on 1/4 to 1/16 beat subdivisions
+STEPS_PER_BEAT = 16
+# STFT frames transformed at a time, bounding each worker's peak memory
+CHUNK_FRAMES = 1024
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int = N_MELS) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)."""
+    fmax = min(FMAX, sample_rate / 2)
+    mel_points = np.linspace(_hz_to_mel(FMIN), _hz_to_mel(fmax), n_mels + 2)
+    hz_points = _mel_to_hz(mel_points)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = hz_points[:-2, None], hz_points[1:-1, None], hz_points[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def decode_audio(data: bytes) -> tuple[np.ndarray, int]:
+    """Decode audio bytes (ogg/egg, wav, ...) to mono float32 samples."""
+    samples, sample_rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return samples.mean(axis=1), sample_rate
+
+
+def log_mel_spectrogram(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Log-power mel spectrogram, shape (frames, N_MELS), one frame per HOP_SECONDS."""
+    n_fft = 1 << math.ceil(math.log2(WINDOW_SECONDS * sample_rate))
+    hop = max(1, round(HOP_SECONDS * sample_rate))
+    padded = np.pad(samples, (n_fft // 2, n_fft // 2))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop]
+    window = np.hanning(n_fft).astype(np.float32)
+    filters = mel_filterbank(sample_rate, n_fft).T
+    mel = np.empty((len(frames), filters.shape[1]), dtype=np.float32)
+    for i in range(0, len(frames), CHUNK_FRAMES):
+        spectrum = np.fft.rfft(frames[i : i + CHUNK_FRAMES] * window, axis=1)
+        mel[i : i + CHUNK_FRAMES] = (spectrum.real**2 + spectrum.imag**2) @ filters
+    return np.log1p(mel)
+
+
+def onset_strength(log_mel: np.ndarray) -> np.ndarray:
+    """Spectral flux: summed positive change in log-mel energy per frame."""
+    flux = np.maximum(0.0, np.diff(log_mel, axis=0, prepend=log_mel[:1])).sum(axis=1)
+    return flux.astype(np.float32)
+
+
+def beat_grid(frame_count: int, bpm: float) -> np.ndarray:
+    """Index of the first frame of each 1/STEPS_PER_BEAT beat step covering frame_count frames."""
+    step_frames = 60.0 / (bpm * STEPS_PER_BEAT) / HOP_SECONDS
+    steps = max(1, math.ceil(frame_count / step_frames))
+    return np.minimum((np.arange(steps) * step_frames).astype(np.int64), frame_count - 1)
+
+
+def compute_features(audio: bytes, bpm: float) -> tuple[np.ndarray, np.ndarray]:
+    """Return (mel, onset) on the map's beat grid: mean log-mel (steps, N_MELS) and peak onset (steps,)."""
+    samples, sample_rate = decode_audio(audio)
+    log_mel = log_mel_spectrogram(samples, sample_rate)
+    onset = onset_strength(log_mel)
+    starts = beat_grid(len(log_mel), bpm)
+    # Steps shorter than a frame repeat a start index; reduceat then returns that frame
+    counts = np.diff(np.append(starts, len(log_mel))).clip(min=1)
+    mel = np.add.reduceat(log_mel, starts, axis=0) / counts[:, None]
+    return mel.astype(np.float16), np.maximum.reduceat(onset, starts)
+
+
+def feature_paths(out_dir: Path, song_hash: str) -> tuple[Path, Path]:
+    return out_dir / f"{song_hash}.mel.npy", out_dir / f"{song_hash}.onset.npy"
+
+
+def load_features(out_dir: Path, song_hash: str) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map a map's (mel, onset) arrays."""
+    mel_path, onset_path = feature_paths(out_dir, song_hash)
+    return np.load(mel_path, mmap_mode="r"), np.load(onset_path, mmap_mode="r")
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _process(zip_path: str, out_dir: str) -> None:
+    """Worker: compute and store one map's features."""
+    song_hash = Path(zip_path).stem
+    with MapArchive(Path(zip_path)) as archive:
+        bpm = song_bpm(archive.info())
+        audio = archive.audio()
+    if not bpm or bpm <= 0:
+        raise ValueError("Info.dat has no BPM")
+    mel, onset = compute_features(audio, bpm)
+    mel_path, onset_path = feature_paths(Path(out_dir), song_hash)
+    # The onset file is written last, so its presence marks complete features
+    _save(mel_path, mel)
+    _save(onset_path, onset)
+
+
+def preprocess(downloads_dir: Path, out_dir: Path, workers: int | None = None) -> tuple[int, int]:
+    """Compute features for every downloaded map that doesn't have them yet.
+
+    Audio is decoded and analysed in a pool of workers processes (default: one per
+    CPU). Returns (processed, failed).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pending = [
+        p for p in sorted(downloads_dir.glob("*.zip")) if not feature_paths(out_dir, p.stem)[1].exists()
+    ]
+    if not pending:
+        console.print("[green]All maps already have features, nothing to do.[/green]")
+        return 0, 0
+
+    processed = failed = 0
+    with download_progress("Extracting audio features") as progress, ProcessPoolExecutor(workers) as pool:
+        task = progress.add_task("features", total=len(pending))
+        futures = {pool.submit(_process, str(p), str(out_dir)): p.stem for p in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                processed += 1
+            except (OSError, ValueError, KeyError, RuntimeError, BadZipFile) as e:
+                console.error(f"Failed {futures[future]}: {e}")
+                failed += 1
+            progress.advance(task)
+
+    console.print(f"[green]Computed features for {processed} maps ({failed} failed).[/green]")
+    return processed, failed
@@ -0,0 +1,321 @@
+"""Content filters evaluated before downloading, from BeatSaver metadata or remote Info.dat."""
+
+import asyncio
+import json
+import operator
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from zipfile import BadZipFile
+
+import httpx
+
+from bs_map_downloader import console
+from bs_map_downloader.cache import LookupCache
+from bs_map_downloader.downloader import BEATSAVER_MAP_API, resolve_map
+from bs_map_downloader.models import MapInfo
+from bs_map_downloader.remote import RemoteZip
+
+# BeatSaver accepts up to 50 comma-separated hashes per lookup
+BULK_LOOKUP_SIZE = 50
+
+# Fields answerable from BeatSaver map metadata without touching the zip
+BEATSAVER_FIELDS = {"bpm", "duration", "difficulties", "characteristic"}
+# Fields answerable from a map's Info.dat (duration only in v4 Info.dat)
+INFO_DAT_FIELDS = {"bpm", "duration", "difficulties", "characteristic", "environment"}
+# Fields answerable from fetched MapInfo metadata (used when exporting)
+MAP_INFO_FIELDS = {"stars", "source", "mapper", "ranked_date"}
+
+_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    "==": operator.eq,
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+_CLAUSE_RE = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|!=|==|=|>|<)\s*(.+?)\s*$")
+# Fields holding ISO dates, compared as points in time rather than as strings
+DATE_FIELDS = {"ranked_date"}
+_BARE_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+DAY = 24 * 60 * 60
+
+
+def parse_date(value: str) -> float | None:
+    """Return the Unix time of an ISO date or datetime (UTC unless it has an offset), or None."""
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def date_conditions(op: str, value: str) -> tuple[list[tuple[str, float]], bool]:
+    """Translate a date comparison into (operator, Unix time) conditions that must all hold.
+
+    A bare date such as 2024-07-01 stands for that whole UTC day: "=" matches any
+    time that day, ">" starts at the next midnight and "<=" includes the day. The
+    returned flag is True when the conditions must be negated ("!=" on a bare date).
+    Raises ValueError if value isn't a date.
+    """
+    ts = parse_date(value)
+    if ts is None:
+        raise ValueError(f"Dates look like 2024-06-01, got {value!r}")
+    op = "=" if op == "==" else op
+    if not _BARE_DATE_RE.match(value):
+        return [(op, ts)], False
+    end = ts + DAY
+    if op in ("=", "!="):
+        return [(">=", ts), ("<", end)], op == "!="
+    if op == ">":
+        return [(">=", end)], False
+    if op == "<=":
+        return [("<", end)], False
+    return [(op, ts)], False
+
+
+@dataclass(frozen=True)
+class Clause:
+    field: str
+    op: str
+    value: float | str
+    # The value as written, for text fields whose values look like numbers
+    raw: str
+
+    def matches(self, features: dict, keep_unknown: bool = False) -> bool:
+        actual = features.get(self.field)
+        if actual is None:
+            return keep_unknown
+        compare = _OPERATORS[self.op]
+        if self.field in DATE_FIELDS:
+            ts = parse_date(str(actual))
+            if ts is None:
+                return False
+            conditions, negate = date_conditions(self.op, self.raw)
+            return all(_OPERATORS[op](ts, bound) for op, bound in conditions) != negate
+        if isinstance(actual, (set, frozenset, list)):
+            # Multi-valued fields: "=" means "contains", "!=" means "does not contain"
+            values = {str(v).lower() for v in actual}
+            contains = str(self.value).lower() in values
+            return not contains if self.op == "!=" else contains and self.op in ("=", "==")
+        if isinstance(self.value, float):
+            try:
+                return compare(float(actual), self.value)
+            except (TypeError, ValueError):
+                return False
+        return compare(str(actual).lower(), self.value.lower())
+
+
+@dataclass(frozen=True)
+class MapFilter:
+    """A conjunction of ``field op value`` clauses.
+
+    Clauses are separated by ``,`` or ``and``, e.g. ``"bpm>=120, difficulties>=3,
+    characteristic=Standard"``. Date fields compare as points in time, with a bare
+    date covering its whole day (see date_conditions). A clause on a field that is
+    unknown for a map does not match, unless keep_unknown is passed to matches.
+    """
+
+    clauses: tuple[Clause, ...]
+
+    @classmethod
+    def parse(cls, expr: str) -> "MapFilter":
+        clauses = []
+        for part in re.split(r",|\band\b", expr):
+            if not part.strip():
+                continue
+            match = _CLAUSE_RE.match(part)
+            if not match:
+                raise ValueError(f"Invalid filter clause: {part.strip()!r}")
+            field, op, raw = match.groups()
+            raw = raw.strip("'\"")
+            if field in DATE_FIELDS:
+                try:
+                    date_conditions(op, raw)
+                except ValueError as e:
+                    raise ValueError(f"{field}: {e}") from None
+            try:
+                value: float | str = float(raw)
+            except ValueError:
+                value = raw
+            clauses.append(Clause(field, op, value, raw))
+        if not clauses:
+            raise ValueError("Empty filter expression")
+        return cls(tuple(clauses))
+
+    @property
+    def fields(self) -> set[str]:
+        return {c.field for c in self.clauses}
+
+    def matches(self, features: dict, keep_unknown: bool = False) -> bool:
+        return all(c.matches(features, keep_unknown) for c in self.clauses)
+
+
+def features_from_beatsaver(doc: dict) -> dict:
+    """Extract filterable features from a BeatSaver map document."""
+    metadata = doc.get("metadata", {})
+    versions = doc.get("versions", [])
+    diffs = versions[0].get("diffs", []) if versions else []
+    return {
+        "bpm": metadata.get("bpm"),
+        "duration": metadata.get("duration"),
+        "difficulties": len(diffs),
+        "characteristic": {d.get("characteristic", "") for d in diffs},
+    }
+
+
+def features_from_map_info(m: MapInfo) -> dict:
+    """Extract filterable features from fetched map metadata."""
+    return {"stars": m.stars, "source": m.source.value, "mapper": m.mapper, "ranked_date": m.ranked_date}
+
+
+def features_from_info_dat(info: dict) -> dict:
+    """Extract filterable features from an Info.dat (v2 or v4 schema)."""
+    if "_difficultyBeatmapSets" in info:
+        sets = info["_difficultyBeatmapSets"]
+        return {
+            "bpm": info.get("_beatsPerMinute"),
+            "duration": None,
+            "difficulties": sum(len(s.get("_difficultyBeatmaps", [])) for s in sets),
+            "characteristic": {s.get("_beatmapCharacteristicName", "") for s in sets},
+            "environment": info.get("_environmentName"),
+        }
+    diffs = info.get("difficultyBeatmaps", [])
+    audio = info.get("audio", {})
+    environments = info.get("environmentNames", [])
+    return {
+        "bpm": audio.get("bpm"),
+        "duration": audio.get("songDuration"),
+        "difficulties": len(diffs),
+        "characteristic": {d.get("characteristic", "") for d in diffs},
+        "environment": environments[0] if environments else None,
+    }
+
+
+async def lookup_beatsaver(
+    client: httpx.AsyncClient,
+    hashes: list[str],
+    failed: set[str] | None = None,
+) -> dict[str, dict]:
+    """Bulk-resolve song hashes to BeatSaver map documents. Missing hashes are omitted.
+
+    A chunk whose request fails is logged and skipped; its hashes are added to failed if given.
+    """
+    docs: dict[str, dict] = {}
+    for i in range(0, len(hashes), BULK_LOOKUP_SIZE):
+        chunk = hashes[i : i + BULK_LOOKUP_SIZE]
+        try:
+            resp = await client.get(f"{BEATSAVER_MAP_API}/{','.join(chunk)}")
+            if resp.status_code == 404:
+                continue
+            resp.raise_for_status()
+            data = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            console.print(f"[yellow]BeatSaver bulk lookup of {len(chunk)} maps failed ({e}).[/yellow]")
+            if failed is not None:
+                failed.update(chunk)
+            continue
+        if len(chunk) == 1:
+            data = {chunk[0]: data}
+        docs.update({h.lower(): doc for h, doc in data.items() if doc})
+        await asyncio.sleep(0.15)
+    return docs
+
+
+async def prefilter(
+    client: httpx.AsyncClient,
+    maps: list[MapInfo],
+    map_filter: MapFilter,
+    concurrency: int = 8,
+    rejected: list[MapInfo] | None = None,
+    cache: LookupCache | None = None,
+) -> list[MapInfo]:
+    """Drop maps that don't match map_filter, without downloading their zips.
+
+    Maps without a known download URL are resolved in bulk on BeatSaver, which also
+    fills in their download_url. When BeatSaver metadata covers every filtered field
+    it is used directly; otherwise the zip's Info.dat is read via HTTP Range requests.
+    Maps in a failed bulk lookup are resolved one by one and inspected the same way.
+    A clause on a field that neither source provides (e.g. duration in a v2 Info.dat)
+    is treated as unknown and doesn't drop the map. Maps that were inspected and
+    didn't match are appended to rejected if given; maps that couldn't be inspected
+    are dropped without being added.
+
+    With a cache, maps known to be missing from BeatSaver are dropped and cached
+    download URLs are used without a lookup (unless the filter can be answered from
+    BeatSaver metadata, which still needs the bulk lookup); lookup results are
+    recorded in it.
+    """
+    use_metadata = map_filter.fields <= BEATSAVER_FIELDS
+    total = len(maps)
+    candidates: list[MapInfo] = []
+    unresolved: list[str] = []
+    for m in maps:
+        if not m.download_url and cache:
+            hit, url = cache.get(m.song_hash)
+            if hit and url is None:
+                continue
+            if hit and not use_metadata:
+                m.download_url = url
+        candidates.append(m)
+        if not m.download_url:
+            unresolved.append(m.song_hash)
+    maps = candidates
+
+    failed: set[str] = set()
+    docs = await lookup_beatsaver(client, unresolved, failed) if unresolved else {}
+    if cache:
+        for song_hash in unresolved:
+            versions = docs.get(song_hash, {}).get("versions", [])
+            if versions and versions[0].get("downloadURL"):
+                cache.put_url(song_hash, versions[0]["downloadURL"])
+            elif song_hash not in docs and song_hash not in failed:
+                cache.put_missing(song_hash)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched_bytes = 0
+
+    async def _features(m: MapInfo) -> dict | None:
+        nonlocal fetched_bytes
+        doc = docs.get(m.song_hash)
+        if doc is not None:
+            versions = doc.get("versions", [])
+            if versions:
+                m.download_url = versions[0].get("downloadURL")
+            if use_metadata:
+                return features_from_beatsaver(doc)
+        elif m.song_hash in failed:
+            async with semaphore:
+                if not await resolve_map(client, m, cache=cache):
+                    return None
+        if not m.download_url:
+            return None
+
+        async with semaphore:
+            remote = RemoteZip(client, m.download_url)
+            try:
+                info = json.loads(await remote.read("Info.dat"))
+            except (httpx.HTTPError, BadZipFile, KeyError, ValueError) as e:
+                console.error(f"Failed to inspect {m.song_hash}: {e}")
+                return None
+            finally:
+                fetched_bytes += remote.bytes_fetched
+                m.size = remote.size
+        features = features_from_beatsaver(doc) if doc is not None else {}
+        features.update({k: v for k, v in features_from_info_dat(info).items() if v is not None})
+        return features
+
+    features = await asyncio.gather(*[_features(m) for m in maps])
+    kept = []
+    for m, f in zip(maps, features):
+        if f is not None and map_filter.matches(f, keep_unknown=True):
+            kept.append(m)
+        elif f is not None and rejected is not None:
+            rejected.append(m)
+
+    suffix = f", {fetched_bytes / 1024:.0f} KiB read via range requests" if fetched_bytes else ""
+    console.print(f"[green]Filter kept {len(kept)} of {total} maps{suffix}.[/green]")
+    return kept
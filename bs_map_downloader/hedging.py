@@ -0,0 +1,112 @@
+"""Hedged requests: race a backup request against one that is slower than usual."""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of observed latencies with a percentile threshold."""
+
+    def __init__(self, percentile: float = 0.95, window: int = 200, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def threshold(self) -> float | None:
+        """Latency at the configured percentile, or None until enough samples are in."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(self.percentile * (len(ordered) - 1))]
+
+
+class HedgeBudget:
+    """Token bucket limiting hedges to a fraction of all requests.
+
+    Every request earns ratio tokens (capped at burst) and every hedge spends one,
+    so extra load stays within ratio of the base request rate.
+    """
+
+    def __init__(self, ratio: float = 0.05, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self.spent = 0
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.spent += 1
+        return True
+
+
+class Hedger:
+    """Issues a backup request when the primary exceeds a percentile of observed latency.
+
+    Latencies are tracked separately per kind of request (e.g. "lookup", "transfer"),
+    while the budget is shared across all of them.
+    """
+
+    def __init__(self, percentile: float = 0.95, budget: float = 0.05, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(budget)
+        self.trackers: dict[str, LatencyTracker] = {}
+        self.wins = 0
+
+    def tracker(self, kind: str) -> LatencyTracker:
+        if kind not in self.trackers:
+            self.trackers[kind] = LatencyTracker(self.percentile, min_samples=self.min_samples)
+        return self.trackers[kind]
+
+    async def run(
+        self,
+        kind: str,
+        primary: Callable[[], Awaitable[T]],
+        backup: Callable[[], Awaitable[T]] | None = None,
+    ) -> T:
+        """Await primary(), racing backup() (default: primary again) if it runs long.
+
+        The first attempt to succeed wins and the other is cancelled. If the first to
+        finish fails, the other is awaited instead.
+        """
+        tracker = self.tracker(kind)
+        self.budget.earn()
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(primary())]
+        try:
+            delay = tracker.threshold()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.budget.try_spend():
+                    tasks.append(asyncio.ensure_future((backup or primary)()))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [t for t in tasks if t in done and t.exception() is None]
+                if winners or not pending:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        tracker.observe(time.monotonic() - start)
+        if not winners:
+            return done.pop().result()
+        if winners[0] is not tasks[0]:
+            self.wins += 1
+        return winners[0].result()
@@ -1,26 +1,66 @@
 """Beat Saber ranked map scraper — CLI entry point."""
 
+# httpx, asyncio and the download machinery are imported inside the functions that
+# need them, so argument errors and --help return without loading them
+
+from __future__ import annotations
+
 import argparse
-import asyncio
+import importlib.util
+import json
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from bs_map_downloader import console, set_quiet
+from bs_map_downloader.models import ORDERS, MapInfo
+from bs_map_downloader.sharding import Shard
+
+if TYPE_CHECKING:
+    import httpx
+
+    from bs_map_downloader.filters import MapFilter
+    from bs_map_downloader.profiling import PhaseProfiler
+    from bs_map_downloader.sources.catalog import CatalogCursor
+
 
-import httpx
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
 
-from bs_map_downloader import console
-from bs_map_downloader.downloader import DOWNLOADS_DIR, download_all, install_maps
-from bs_map_downloader.models import MapInfo
-from bs_map_downloader.sources import fetch_beatleader, fetch_mapper, fetch_scoresaber
 
+def parse_size(value: str) -> int:
+    """Parse a byte count with an optional K/M/G suffix (e.g. "512K", "64M")."""
+    value = value.strip().upper().removesuffix("B")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    try:
+        return int(float(value[: len(value) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}") from None
 
-async def main():
+
+def parse_shard(value: str) -> Shard:
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Download ranked Beat Saber maps")
-    parser.add_argument("--limit", type=int, default=None, help="Max number of maps to download (per source)")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Max number of maps to fetch per source, counting only maps not already returned by an "
+        "earlier source. Applied before --shard, so each shard gets its slice (about 1/N) of the same "
+        "first LIMIT maps",
+    )
     parser.add_argument(
         "--source",
-        choices=["scoresaber", "beatleader", "both"],
+        choices=["scoresaber", "beatleader", "both", "catalog"],
         default="both",
-        help="Which leaderboard to fetch from (default: both)",
+        help="Which leaderboard to fetch from (default: both). \"catalog\" mirrors every BeatSaver "
+        "upload in the date range, ranked or not; later runs fetch only new uploads",
     )
     parser.add_argument("--mapper", type=str, help="Download all maps by a specific mapper from BeatSaver")
     parser.add_argument(
@@ -35,51 +75,686 @@ async def main():
         default=None,
         help="Only include maps ranked on or before this date, YYYY-MM-DD",
     )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard saved fetch checkpoints and the catalog cursor, and paginate every source "
+        "from the first page",
+    )
     parser.add_argument(
         "--install-dir",
         type=str,
         default=None,
         help="Extract downloaded zips into this directory (e.g. Beat Saber CustomLevels path)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--install-during-download",
+        action="store_true",
+        help="With --install-dir, extract each map as soon as its download completes",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="With --install-dir, make it match the fetched map set: install new maps, repair "
+        "incomplete ones and prune previously installed maps that are no longer wanted",
+    )
+    parser.add_argument(
+        "--trash-dir",
+        type=str,
+        default=None,
+        help="With --sync, move pruned maps here instead of deleting them",
+    )
+    parser.add_argument(
+        "--mirror",
+        action="append",
+        default=None,
+        metavar="URL",
+        help="CDN host serving {hash}.zip files (repeatable; replaces the default BeatSaver CDN mirrors). "
+        "Transfers go to the fastest healthy mirror and fail over to the others",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Race a backup request against lookups and transfers slower than the 95th "
+        "percentile of observed latency",
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=0.05,
+        help="With --hedge, max backup requests as a fraction of all requests (default: 0.05)",
+    )
+    parser.add_argument(
+        "--order",
+        choices=ORDERS,
+        default="input",
+        help="Download order, most valuable first: newest ranked, highest stars, or smallest zip "
+        "(sizes are known after --filter range inspection) (default: input order)",
+    )
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent zip transfers (default: 5)")
+    parser.add_argument(
+        "--resolvers",
+        type=int,
+        default=2,
+        help="Concurrent BeatSaver lookups, paced to one per --lookup-interval overall (default: 2)",
+    )
+    parser.add_argument(
+        "--lookup-interval",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Minimum spacing between BeatSaver map lookups across all resolvers (default: 0.1, "
+        "i.e. 10 lookups/s). Lower it only if BeatSaver's rate limit allows",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Split downloads by hash across N worker processes, each with its own event loop "
+        "and connections, sharing --concurrency, --resolvers and rate caps (default: 1)",
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=parse_size,
+        default=None,
+        metavar="SIZE",
+        help="Cap the estimated bytes of transfers in flight, e.g. 64M",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=parse_size,
+        default=None,
+        metavar="SIZE",
+        help="Cap total download bandwidth in bytes/s, shared fairly across transfers, e.g. 10M",
+    )
+    parser.add_argument(
+        "--max-host-rate",
+        type=parse_size,
+        default=None,
+        metavar="SIZE",
+        help="Cap download bandwidth per host in bytes/s",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default=None,
+        help="Only download maps matching this expression, checked before downloading "
+        "(e.g. \"bpm>=120, difficulties>=3, characteristic=Standard\"; fields: "
+        "bpm, duration, difficulties, characteristic, environment)",
+    )
+    parser.add_argument(
+        "--no-lookup-cache",
+        action="store_true",
+        help="Don't consult or update the persistent BeatSaver lookup cache "
+        "(downloads/.lookup-cache.sqlite; hits kept 30 days, not-found results 1 day)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Only handle maps in shard I of N (0-based), partitioned by song hash, so N machines "
+        "can each fetch a disjoint slice. Writes downloads/manifest-I-of-N.json for merge-manifests",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Write the downloaded maps' metadata to this JSON file",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, polling ScoreSaber/BeatLeader for newly ranked maps and downloading "
+        "(and, with --install-dir, installing) them as they appear. Stops cleanly on SIGTERM/Ctrl-C",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=300,
+        help="With --watch, seconds between polls (default: 300)",
+    )
+    parser.add_argument(
+        "--subscribe",
+        action="store_true",
+        help="Keep running and download new and updated maps as BeatSaver pushes them over its "
+        "websocket feed, with no polling (with --mapper, only that mapper's). Needs websockets",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Profile each phase (fetch, filter, download, install/sync) into DIR: pstats data, "
+        "a top-N CPU and allocation summary and a tracemalloc snapshot per phase (a repeated phase "
+        "overwrites its files). Slows the run",
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--quiet",
+        action="store_true",
+        help="No progress bars or status output; only errors, on stderr",
+    )
+    output.add_argument(
+        "--json",
+        action="store_true",
+        help="Like --quiet, but print a JSON summary of the downloaded maps to stdout "
+        "(one line per run, or per poll with new maps in --watch mode)",
+    )
+    return parser
 
-    since = datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-    until = datetime.strptime(args.until, "%Y-%m-%d").replace(tzinfo=timezone.utc) if args.until else None
 
-    all_maps: list[MapInfo] = []
-    async with httpx.AsyncClient(timeout=30) as client:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse and validate command-line arguments."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if (args.sync or args.install_during_download) and not args.install_dir:
+        parser.error("--sync and --install-during-download require --install-dir")
+    for option in ("concurrency", "resolvers", "processes"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option} must be at least 1")
+    if args.lookup_interval is not None and args.lookup_interval < 0:
+        parser.error("--lookup-interval can't be negative")
+
+    args.map_filter = None
+    if args.filter:
+        from bs_map_downloader.filters import BEATSAVER_FIELDS, INFO_DAT_FIELDS, MapFilter
+
+        try:
+            args.map_filter = MapFilter.parse(args.filter)
+        except ValueError as e:
+            parser.error(str(e))
+        unknown = args.map_filter.fields - BEATSAVER_FIELDS - INFO_DAT_FIELDS
+        if unknown:
+            parser.error(f"Unknown filter field(s): {', '.join(sorted(unknown))}")
+
+    if args.watch and (args.mapper or args.sync):
+        parser.error("--watch polls ranked leaderboards and can't be combined with --mapper or --sync")
+    if (args.watch or args.subscribe) and args.shard:
+        # A shard's known set lacks other shards' hashes, so polls would never stop early
+        parser.error("--shard splits one-off fetches and can't be combined with --watch or --subscribe")
+    if args.subscribe:
+        if args.watch or args.sync:
+            parser.error("--subscribe can't be combined with --watch or --sync")
+        if importlib.util.find_spec("websockets") is None:
+            parser.error("--subscribe needs the websockets package (pip install 'bs-map-downloader[push]')")
+    return args
+
+
+def partial_selection(args: argparse.Namespace) -> str | None:
+    """Name the option that makes this run fetch only part of the wanted maps, if any.
+
+    --sync must not prune installs that were merely outside such a selection.
+    """
+    if args.limit:
+        return "--limit"
+    if args.mapper:
+        return "--mapper"
+    if args.filter:
+        return "--filter"
+    if args.shard:
+        return "--shard"
+    if args.source == "catalog" and not args.fresh:
+        return "an incremental --source catalog run"
+    return None
+
+
+def profile_phase(profiler: PhaseProfiler | None, name: str):
+    """Profile the enclosed block as phase name if profiling is on."""
+    from contextlib import nullcontext
+
+    return profiler.phase(name) if profiler else nullcontext()
+
+
+def print_json_summary(fetched: int, successful: list[MapInfo]) -> None:
+    summary = {"fetched": fetched, "downloaded": len(successful), "maps": [m.to_metadata() for m in successful]}
+    print(json.dumps(summary), flush=True)
+
+
+def catalog_cursor(args: argparse.Namespace) -> CatalogCursor | None:
+    """The saved catalog cursor for a --source catalog run (cleared with --fresh), else None."""
+    if args.source != "catalog" or args.mapper:
+        return None
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.sources.catalog import CURSOR_NAME, CatalogCursor
+
+    cursor = CatalogCursor(DOWNLOADS_DIR / CURSOR_NAME)
+    if args.fresh:
+        cursor.clear()
+    return cursor
+
+
+def commit_cursor(cursor: CatalogCursor | None, maps: list[MapInfo], delivered: list[MapInfo]) -> None:
+    """Advance the catalog cursor past the fetched maps, stopping before any that weren't delivered."""
+    if cursor:
+        done = {m.song_hash for m in delivered}
+        cursor.commit(m for m in maps if m.song_hash not in done)
+
+
+async def fetch_maps(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    since: datetime,
+    until: datetime | None,
+    known: set[str] | None = None,
+    cursor: CatalogCursor | None = None,
+) -> list[MapInfo]:
+    """Fetch maps from the selected sources, deduplicated across sources.
+
+    Full fetches are checkpointed per source so an interrupted run resumes where it
+    stopped; polls for new maps (known given) are short and start from the top. A
+    catalog fetch leaves the walk's position pending on cursor; see commit_cursor.
+    """
+    from bs_map_downloader.dedup import HashSet, unique_maps
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.pagination import CHECKPOINT_DIR_NAME, Checkpoint
+    from bs_map_downloader.sources import fetch_beatleader, fetch_catalog, fetch_mapper, fetch_scoresaber
+    from bs_map_downloader.store import STORE_NAME, MetadataStore
+
+    def checkpoint(source: str, **query) -> Checkpoint | None:
+        if known is not None:
+            return None
+        cp = Checkpoint(DOWNLOADS_DIR / CHECKPOINT_DIR_NAME / f"{source}.json", {"limit": args.limit, **query})
+        if args.fresh:
+            cp.clear()
+        return cp
+
+    query = {"since": since.isoformat(), "until": until.isoformat() if until else None}
+    # One compact hash set shared by every source deduplicates across sources as they
+    # fetch, keeping the first occurrence
+    maps: list[MapInfo] = []
+    with HashSet() as seen:
         if args.mapper:
-            all_maps.extend(await fetch_mapper(client, args.mapper, args.limit))
+            cp = checkpoint("beatsaver", mapper=args.mapper)
+            maps = unique_maps(await fetch_mapper(client, args.mapper, args.limit, checkpoint=cp), seen)
+        elif args.source == "catalog":
+            cp = checkpoint("catalog", **query)
+            maps = await fetch_catalog(client, args.limit, since, until, cursor=cursor, checkpoint=cp, seen=seen)
         else:
+            fetch_args = {"since": since, "until": until, "known": known, "seen": seen}
             if args.source in ("scoresaber", "both"):
-                all_maps.extend(await fetch_scoresaber(client, args.limit, since=since, until=until))
+                cp = checkpoint("scoresaber", **query)
+                maps.extend(await fetch_scoresaber(client, args.limit, **fetch_args, checkpoint=cp))
             if args.source in ("beatleader", "both"):
-                all_maps.extend(await fetch_beatleader(client, args.limit, since=since, until=until))
+                cp = checkpoint("beatleader", **query)
+                maps.extend(await fetch_beatleader(client, args.limit, **fetch_args, checkpoint=cp))
 
-    # Deduplicate by song hash, keeping first occurrence
-    seen: set[str] = set()
-    maps: list[MapInfo] = []
-    for m in all_maps:
-        if m.song_hash not in seen:
-            seen.add(m.song_hash)
-            maps.append(m)
+    # Everything fetched is kept for offline `query` runs, including other shards' maps
+    with MetadataStore(DOWNLOADS_DIR / STORE_NAME) as store:
+        store.add(maps)
+
+    if args.shard:
+        total = len(maps)
+        maps = args.shard.filter(maps)
+        console.print(f"[dim]Shard {args.shard}: {len(maps)} of {total} maps.[/dim]")
+    return maps
+
+
+async def deliver(
+    args: argparse.Namespace,
+    maps: list[MapInfo],
+    map_filter: MapFilter | None,
+    client: httpx.AsyncClient | None = None,
+    profiler: PhaseProfiler | None = None,
+    rejected: list[MapInfo] | None = None,
+) -> list[MapInfo]:
+    """Filter, download and install maps as configured. Returns the downloaded maps.
+
+    Maps the filter rejected are appended to rejected if given.
+    """
+    from contextlib import nullcontext
+
+    import httpx
+
+    from bs_map_downloader.cache import CACHE_NAME, LookupCache
+    from bs_map_downloader.downloader import DOWNLOADS_DIR, download_all, install_maps
+    from bs_map_downloader.filters import prefilter
+    from bs_map_downloader.sync import sync_install
+
+    lookup_cache = None if args.no_lookup_cache else DOWNLOADS_DIR / CACHE_NAME
+    if map_filter:
+        cache = LookupCache(lookup_cache) if lookup_cache else None
+        async with nullcontext(client) if client else httpx.AsyncClient(timeout=30) as filter_client:
+            with profile_phase(profiler, "filter"), cache or nullcontext():
+                maps = await prefilter(filter_client, maps, map_filter, rejected=rejected, cache=cache)
+        if not maps:
+            console.print("[yellow]No maps match the filter.[/yellow]")
+            return []
+
+    if args.order == "smallest" and not any(m.size for m in maps):
+        console.print(
+            "[yellow]--order smallest needs zip sizes, which only --filter inspection provides; "
+            "using input order.[/yellow]"
+        )
+
+    download_options = {
+        "mirrors": args.mirror,
+        "hedge_budget": args.hedge_budget if args.hedge else None,
+        "order": args.order,
+        "concurrency": args.concurrency,
+        "resolvers": args.resolvers,
+        "max_inflight_bytes": args.max_inflight,
+        "max_rate": args.max_rate,
+        "max_host_rate": args.max_host_rate,
+        "client": client,
+        "lookup_cache": lookup_cache,
+        "processes": args.processes,
+    }
+    if args.lookup_interval is not None:
+        download_options["lookup_interval"] = args.lookup_interval
+    install_dir = Path(args.install_dir) if args.install_dir else None
+
+    if args.sync:
+        with profile_phase(profiler, "download"):
+            successful = await download_all(maps, **download_options)
+        trash_dir = Path(args.trash_dir) if args.trash_dir else None
+        partial = partial_selection(args)
+        if partial:
+            console.print(f"[yellow]Not pruning {install_dir}: {partial} selects only part of the maps.[/yellow]")
+        with profile_phase(profiler, "sync"):
+            sync_install(maps, DOWNLOADS_DIR, install_dir, trash_dir, prune=not partial)
+        return successful
+
+    if install_dir and (args.install_during_download or args.watch or args.subscribe):
+        with profile_phase(profiler, "download-install"):
+            return await download_all(maps, install_dir=install_dir, **download_options)
+
+    with profile_phase(profiler, "download"):
+        successful = await download_all(maps, **download_options)
+
+    if install_dir:
+        with profile_phase(profiler, "install"):
+            install_maps(successful, DOWNLOADS_DIR, install_dir)
+    return successful
+
+
+async def main(args: argparse.Namespace) -> None:
+    import asyncio
+
+    import httpx
+
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.sharding import default_manifest_path, write_manifest
+    from bs_map_downloader.watch import downloaded_hashes, install_stop_signals, watch
 
-    if len(maps) < len(all_maps):
-        console.print(f"[dim]{len(all_maps) - len(maps)} duplicates across sources removed.[/dim]")
+    profiler = None
+    if args.profile:
+        from bs_map_downloader.profiling import PhaseProfiler
+
+        profiler = PhaseProfiler(Path(args.profile))
+
+    map_filter = args.map_filter
+    since = datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    until = datetime.strptime(args.until, "%Y-%m-%d").replace(tzinfo=timezone.utc) if args.until else None
+
+    cursor = catalog_cursor(args)
+    if args.watch or args.subscribe:
+        stop = asyncio.Event()
+        install_stop_signals(stop)
+
+        async def deliver_new(maps: list[MapInfo]) -> list[MapInfo]:
+            if args.subscribe:
+                from bs_map_downloader.store import STORE_NAME, MetadataStore
+
+                with MetadataStore(DOWNLOADS_DIR / STORE_NAME) as store:
+                    store.add(maps)
+            rejected: list[MapInfo] = []
+            successful = await deliver(args, maps, map_filter, client, profiler, rejected)
+            commit_cursor(cursor, maps, successful + rejected)
+            if args.json:
+                print_json_summary(len(maps), successful)
+            # Filtered-out maps become known too, so they aren't re-inspected every poll
+            return successful + rejected
+
+        async def poll(known: set[str]) -> list[MapInfo]:
+            with profile_phase(profiler, "fetch"):
+                return await fetch_maps(client, args, since, until, known, cursor)
+
+        async with httpx.AsyncClient(timeout=60) as client:
+            if args.subscribe:
+                from bs_map_downloader.subscribe import subscribe
+
+                mappers = {args.mapper.lower()} if args.mapper else None
+                await subscribe(deliver_new, downloaded_hashes(DOWNLOADS_DIR), stop, mappers=mappers)
+            else:
+                await watch(
+                    poll,
+                    deliver_new,
+                    downloaded_hashes(DOWNLOADS_DIR),
+                    args.interval,
+                    stop,
+                )
+        return
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        try:
+            with profile_phase(profiler, "fetch"):
+                maps = await fetch_maps(client, args, since, until, cursor=cursor)
+        except httpx.HTTPError as e:
+            console.error(f"Fetch failed: {e}. Progress was saved; rerun to resume.")
+            sys.exit(1)
 
     if not maps:
         console.print("[yellow]No maps found.[/yellow]")
+        commit_cursor(cursor, [], [])
+        if args.json:
+            print_json_summary(0, [])
         return
 
     console.print(f"[bold]{len(maps)} unique maps total.[/bold]")
-    successful = await download_all(maps)
+    rejected: list[MapInfo] = []
+    successful = await deliver(args, maps, map_filter, profiler=profiler, rejected=rejected)
+    commit_cursor(cursor, maps, successful + rejected)
+
+    if args.manifest or args.shard:
+        manifest = Path(args.manifest) if args.manifest else default_manifest_path(DOWNLOADS_DIR, args.shard)
+        write_manifest(manifest, successful, args.shard)
+        console.print(f"[dim]Wrote manifest of {len(successful)} maps to {manifest}.[/dim]")
+
+    if args.json:
+        print_json_summary(len(maps), successful)
+
+
+def merge_manifests_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="bs-map-downloader merge-manifests",
+        description="Combine per-shard manifests written by --shard runs",
+    )
+    parser.add_argument("manifests", nargs="+", help="Manifest files to merge")
+    parser.add_argument("-o", "--output", default="metadata.json", help="Output file (default: metadata.json)")
+    args = parser.parse_args(argv)
+
+    from bs_map_downloader.sharding import merge_manifests
+
+    entries = merge_manifests([Path(p) for p in args.manifests])
+    output = Path(args.output)
+    output.write_text(json.dumps({"maps": entries}, indent=2))
+    console.print(f"[green]Merged {len(args.manifests)} manifests into {output} ({len(entries)} maps).[/green]")
+
+
+def export_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="bs-map-downloader export",
+        description="Pack downloaded map zips into tar shards with a hash → shard/offset index. "
+        "Re-running adds only maps not yet exported",
+    )
+    parser.add_argument("out_dir", help="Directory for the maps-NNNNN.tar shards and index.jsonl")
+    parser.add_argument(
+        "--metadata",
+        type=str,
+        default=None,
+        help="Export only the maps in this manifest/metadata.json, with their metadata "
+        "(default: every zip in downloads/, without metadata)",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default=None,
+        help="Only export maps matching this expression (fields: stars, source, mapper, "
+        "ranked_date from --metadata; bpm, duration, difficulties, characteristic, environment from Info.dat)",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=parse_size,
+        default="1G",
+        metavar="SIZE",
+        help="Target size of each shard (default: 1G)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Shards written in parallel (default: 4)")
+    args = parser.parse_args(argv)
+
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.export import export_shards
+    from bs_map_downloader.filters import INFO_DAT_FIELDS, MAP_INFO_FIELDS, MapFilter
+
+    map_filter = None
+    if args.filter:
+        try:
+            map_filter = MapFilter.parse(args.filter)
+        except ValueError as e:
+            parser.error(str(e))
+        unknown = map_filter.fields - MAP_INFO_FIELDS - INFO_DAT_FIELDS
+        if unknown:
+            parser.error(f"Unknown filter field(s): {', '.join(sorted(unknown))}")
+        needs_metadata = map_filter.fields & MAP_INFO_FIELDS
+        if needs_metadata and not args.metadata:
+            parser.error(f"--filter on {', '.join(sorted(needs_metadata))} needs --metadata")
+
+    maps = None
+    if args.metadata:
+        data = json.loads(Path(args.metadata).read_text())
+        maps = [MapInfo.from_metadata(entry) for entry in data["maps"]]
+
+    export_shards(DOWNLOADS_DIR, Path(args.out_dir), maps, map_filter, args.shard_size, args.workers)
+
+
+def features_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="bs-map-downloader features",
+        description="Compute beat-aligned mel-spectrogram and onset features for downloaded maps, "
+        "skipping maps that already have them",
+    )
+    parser.add_argument("out_dir", help="Directory for the {hash}.mel.npy and {hash}.onset.npy arrays")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("numpy") is None or importlib.util.find_spec("soundfile") is None:
+        parser.error("features needs numpy and soundfile (pip install 'bs-map-downloader[features]')")
+
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.features import preprocess
+
+    _, failed = preprocess(DOWNLOADS_DIR, Path(args.out_dir), args.workers)
+    if failed:
+        sys.exit(1)
+
+
+def query_main(argv: list[str]) -> None:
+    from bs_map_downloader.store import SORTS
+
+    parser = argparse.ArgumentParser(
+        prog="bs-map-downloader query",
+        description="Select maps from the metadata stored by previous fetches, offline, "
+        "and optionally download or install them",
+    )
+    parser.add_argument(
+        "filter",
+        nargs="?",
+        default=None,
+        help='Filter expression over stars, mapper, source and ranked_date, e.g. "mapper=Joetastic, '
+        'stars>10, ranked_date>=2024-06-01" (default: all stored maps)',
+    )
+    parser.add_argument("--sort", choices=SORTS, default="newest", help="Result order (default: newest)")
+    parser.add_argument("--limit", type=int, default=None, help="Return at most this many maps")
+    parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        default=[],
+        metavar="MANIFEST",
+        help="Add the maps in a manifest/metadata.json to the store before querying (repeatable)",
+    )
+    parser.add_argument("-o", "--output", default=None, help="Write the result set as a manifest to this file")
+    parser.add_argument("--download", action="store_true", help="Download the result set")
+    parser.add_argument("--install-dir", default=None, help="Download the result set and install it here")
+    parser.add_argument("--json", action="store_true", help="Print the result set (or download summary) as JSON")
+    args = parser.parse_args(argv)
+    set_quiet(args.json)
 
-    if args.install_dir:
-        install_maps(successful, DOWNLOADS_DIR, Path(args.install_dir))
+    from bs_map_downloader.downloader import DOWNLOADS_DIR
+    from bs_map_downloader.filters import MapFilter
+    from bs_map_downloader.store import STORE_NAME, MetadataStore
+
+    try:
+        map_filter = MapFilter.parse(args.filter) if args.filter else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    with MetadataStore(DOWNLOADS_DIR / STORE_NAME) as store:
+        for manifest in args.imports:
+            data = json.loads(Path(manifest).read_text())
+            store.add([MapInfo.from_metadata(entry) for entry in data["maps"]])
+        if not len(store):
+            console.print("[yellow]No map metadata stored yet: run a fetch first, or --import a manifest.[/yellow]")
+            return
+        try:
+            maps = store.query(map_filter, args.sort, args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.output:
+        from bs_map_downloader.sharding import write_manifest
+
+        write_manifest(Path(args.output), maps)
+        console.print(f"[dim]Wrote manifest of {len(maps)} maps to {args.output}.[/dim]")
+
+    if args.download or args.install_dir:
+        import asyncio
+
+        from bs_map_downloader.cache import CACHE_NAME
+        from bs_map_downloader.downloader import download_all
+
+        install_dir = Path(args.install_dir) if args.install_dir else None
+        successful = asyncio.run(download_all(maps, install_dir, lookup_cache=DOWNLOADS_DIR / CACHE_NAME))
+        if args.json:
+            print_json_summary(len(maps), successful)
+        return
+
+    if args.json:
+        print(json.dumps({"maps": [m.to_metadata() for m in maps]}), flush=True)
+        return
+
+    from rich.markup import escape
+
+    for m in maps:
+        console.print(
+            f"{m.ranked_date[:10]}  {m.stars:5.2f}★  {escape(m.song_name)} — {escape(m.song_author)}  "
+            f"[dim]{escape(m.mapper)} · {m.song_hash}[/dim]"
+        )
+    console.print(f"[bold]{len(maps)} maps.[/bold]")
+
+
+SUBCOMMANDS = {
+    "merge-manifests": merge_manifests_main,
+    "export": export_main,
+    "features": features_main,
+    "query": query_main,
+}
 
 
 def cli():
-    asyncio.run(main())
+    argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
+    args = parse_args(argv)
+    set_quiet(args.quiet or args.json)
+
+    import asyncio
+
+    asyncio.run(main(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""Latency-aware selection between CDN mirrors serving the same map zips."""
+
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+# Hosts serving identical {hash}.zip paths
+DEFAULT_MIRRORS = ["https://r2cdn.beatsaver.com", "https://cdn.beatsaver.com"]
+# Typical map zip size, used to weigh latency against throughput when ranking hosts
+REFERENCE_SIZE = 2 * 1024 * 1024
+# Smaller transfers finish too quickly for a meaningful throughput sample
+MIN_THROUGHPUT_SAMPLE = 64 * 1024
+# Assumed throughput (bytes/s) while no host in the pool has a sample
+DEFAULT_THROUGHPUT = 5 * 1024 * 1024
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+@dataclass
+class HostStats:
+    latency: float | None = None
+    throughput: float | None = None
+    failures: int = 0
+    down_until: float = 0.0
+
+    def expected_time(self, default_throughput: float = DEFAULT_THROUGHPUT) -> float:
+        """Expected seconds to fetch a reference-sized zip; 0 for unmeasured hosts so they get tried.
+
+        A host with a latency but no throughput sample yet (it has only served small
+        bodies) is assumed to transfer at default_throughput, keeping scores comparable.
+        """
+        if self.latency is None:
+            return 0.0
+        return self.latency + REFERENCE_SIZE / (self.throughput or default_throughput)
+
+
+class MirrorPool:
+    """Tracks per-host latency and throughput and routes transfers to the fastest healthy mirror.
+
+    Measurements are exponentially weighted moving averages, so the ranking follows
+    hosts whose speed changes during a run. A host that fails max_failures times in a
+    row is skipped for cooldown seconds.
+    """
+
+    def __init__(
+        self,
+        mirrors: list[str],
+        alpha: float = 0.3,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+    ):
+        self.mirrors = [_origin(m) for m in mirrors]
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.stats: dict[str, HostStats] = {m: HostStats() for m in self.mirrors}
+
+    def _stats(self, url: str) -> HostStats:
+        return self.stats.setdefault(_origin(url), HostStats())
+
+    def _ewma(self, old: float | None, new: float) -> float:
+        return new if old is None else self.alpha * new + (1 - self.alpha) * old
+
+    def candidates(self, url: str) -> list[str]:
+        """Return url rewritten onto every mirror, best first.
+
+        URLs on the default BeatSaver CDN hosts are rewritten onto the mirrors even when
+        those hosts aren't in the pool (custom --mirror lists), with the original URL
+        kept as the last fallback. URLs on other hosts are returned unchanged. Hosts in
+        cooldown go last rather than being dropped, so a transfer is still attempted if
+        all are down.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self.mirrors and origin not in DEFAULT_MIRRORS:
+            return [url]
+
+        now = time.monotonic()
+        # Hosts without a throughput sample are scored at the pool's average
+        measured = [s.throughput for s in self.stats.values() if s.throughput]
+        default_throughput = sum(measured) / len(measured) if measured else DEFAULT_THROUGHPUT
+
+        def rank(host: str) -> tuple[bool, float, bool]:
+            stats = self.stats[host]
+            return stats.down_until > now, stats.expected_time(default_throughput), host != origin
+
+        hosts = sorted(self.mirrors, key=rank)
+        urls = [urlunsplit(urlsplit(host)[:2] + parts[2:]) for host in hosts]
+        return urls if origin in self.mirrors else [*urls, url]
+
+    def record_success(self, url: str, latency: float, nbytes: int, transfer_time: float) -> None:
+        stats = self._stats(url)
+        stats.latency = self._ewma(stats.latency, latency)
+        if nbytes >= MIN_THROUGHPUT_SAMPLE and transfer_time > 0:
+            stats.throughput = self._ewma(stats.throughput, nbytes / transfer_time)
+        stats.failures = 0
+        stats.down_until = 0.0
+
+    def record_failure(self, url: str) -> None:
+        stats = self._stats(url)
+        stats.failures += 1
+        if stats.failures >= self.max_failures:
+            stats.down_until = time.monotonic() + self.cooldown
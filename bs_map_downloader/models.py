@@ -14,6 +14,9 @@ class Source(str, Enum):
 CUTOFF_DATE = datetime(2022, 1, 1, tzinfo=timezone.utc)
 CUTOFF_TIMESTAMP = int(CUTOFF_DATE.timestamp())
 
+# Download priority orders, see scheduler.priority_key
+ORDERS = ("input", "newest", "stars", "smallest")
+
 
 @dataclass
 class MapInfo:
@@ -25,6 +28,7 @@ class MapInfo:
     source: Source
     stars: float = 0.0
     download_url: str | None = None
+    size: int | None = None
 
     def to_metadata(self) -> dict:
         """Serialize to the camelCase dict format used in metadata.json."""
@@ -37,3 +41,18 @@ class MapInfo:
             "rankedDate": self.ranked_date,
             "source": self.source.value,
         }
+
+    @classmethod
+    def from_metadata(cls, data: dict) -> "MapInfo":
+        """Inverse of to_metadata. Also reads the optional downloadURL and size keys."""
+        return cls(
+            song_hash=data["songHash"],
+            song_name=data.get("songName", ""),
+            song_author=data.get("songAuthorName", ""),
+            mapper=data.get("levelAuthorName", ""),
+            ranked_date=data.get("rankedDate", ""),
+            source=Source(data["source"]),
+            stars=data.get("stars", 0.0),
+            download_url=data.get("downloadURL"),
+            size=data.get("size"),
+        )
@@ -0,0 +1,105 @@
+"""Retrying page requests and resumable checkpoints for paginated source fetches."""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from bs_map_downloader import console
+from bs_map_downloader.decoding import loads
+from bs_map_downloader.models import MapInfo
+
+CHECKPOINT_DIR_NAME = ".checkpoints"
+# Pages fetched between checkpoint writes
+CHECKPOINT_EVERY = 10
+# Newly ranked maps shift the listings, so old checkpoints would miss them
+CHECKPOINT_TTL = 24 * 3600
+PAGE_RETRIES = 5
+RETRY_BACKOFF = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+async def get_page(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict | None = None,
+    retries: int = PAGE_RETRIES,
+    backoff: float = RETRY_BACKOFF,
+    decode: Callable[[bytes], Any] = loads,
+) -> Any:
+    """GET a page and return its body decoded by decode (default: the whole JSON document).
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with exponential
+    backoff; other errors (and the last failed attempt) raise.
+    """
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.get(url, params=params)
+            resp.raise_for_status()
+            return decode(resp.content)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in RETRY_STATUSES or attempt == retries:
+                raise
+            error: httpx.HTTPError = e
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            error = e
+        delay = backoff * 2**attempt
+        console.print(f"[yellow]Page request failed ({error!r}), retrying in {delay:g}s...[/yellow]")
+        await asyncio.sleep(delay)
+
+
+class Checkpoint:
+    """Cursor and accumulated maps of a paginated fetch, persisted as JSON.
+
+    A checkpoint written by a fetch with a different key (source and query
+    parameters), or older than CHECKPOINT_TTL, is ignored.
+    """
+
+    def __init__(self, path: Path, key: dict, every: int = CHECKPOINT_EVERY, ttl: float = CHECKPOINT_TTL):
+        self.path = path
+        self.key = key
+        self.every = every
+        self.ttl = ttl
+        self._pages = 0
+
+    def load(self) -> tuple[Any, list[MapInfo]] | None:
+        """Return (next page, maps so far) from a matching checkpoint, if any."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != self.key or time.time() - data.get("saved", 0) > self.ttl:
+            return None
+        return data["page"], [MapInfo.from_metadata(m) for m in data["maps"]]
+
+    def save(self, page: Any, maps: list[MapInfo]) -> None:
+        """Atomically record that maps were collected before page.
+
+        page is usually a page number, but can be any JSON-serializable cursor.
+        """
+        data = {
+            "key": self.key,
+            "saved": time.time(),
+            "page": page,
+            "maps": [{**m.to_metadata(), "downloadURL": m.download_url} for m in maps],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.path)
+
+    def advance(self, page: Any, maps: list[MapInfo]) -> None:
+        """Called after each page; saves every `every` pages."""
+        self._pages += 1
+        if self._pages % self.every == 0:
+            self.save(page, maps)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,100 @@
+"""Per-phase CPU profiles and allocation snapshots for --profile."""
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from bs_map_downloader import console
+
+# Functions and allocation sites listed in each phase's summary
+TOP_N = 25
+
+
+class PhaseProfiler:
+    """Profiles phases of a run (fetch, download, install...) one at a time into out_dir.
+
+    Each phase writes NN-{name}.prof (pstats data, e.g. for snakeviz),
+    NN-{name}.tracemalloc (a tracemalloc snapshot taken at the end of the phase) and
+    NN-{name}.txt with wall and CPU time, peak traced memory, the top functions by
+    cumulative time and the call sites whose retained memory grew the most. NN numbers
+    phase names in order of first use; a phase that runs again (each poll in watch
+    mode) overwrites its files, so the directory holds one set per name.
+
+    Growth compares snapshots from the start and end of the phase, so it shows memory
+    still held when the phase ends; allocations freed before then only show up in
+    the peak. Only the calling thread is CPU-profiled; allocations are traced in
+    every thread.
+    """
+
+    def __init__(self, out_dir: Path, top: int = TOP_N):
+        self.out_dir = out_dir
+        self.top = top
+        self._numbers: dict[str, int] = {}
+        self._runs: dict[str, int] = {}
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        number = self._numbers.setdefault(name, len(self._numbers) + 1)
+        self._runs[name] = self._runs.get(name, 0) + 1
+        stem = self.out_dir / f"{number:02d}-{name}"
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        wall, cpu = time.perf_counter(), time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._write(stem, name, profile, before, after, wall, cpu, peak)
+
+    def _write(
+        self,
+        stem: Path,
+        name: str,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        wall: float,
+        cpu: float,
+        peak: int,
+    ) -> None:
+        profile.dump_stats(stem.with_suffix(".prof"))
+        after.dump(str(stem.with_suffix(".tracemalloc")))
+
+        stats_text = io.StringIO()
+        pstats.Stats(profile, stream=stats_text).sort_stats("cumulative").print_stats(self.top)
+        # Leave out the profiler's own bookkeeping
+        own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        growth = after.filter_traces(own).compare_to(before.filter_traces(own), "lineno")[: self.top]
+
+        lines = [
+            f"phase: {name} (run {self._runs[name]})",
+            f"wall: {wall:.3f}s",
+            f"cpu: {cpu:.3f}s",
+            f"peak traced memory: {peak / 1024**2:.1f} MiB",
+            "",
+            f"top {self.top} allocation sites by retained growth (still allocated at the end of the phase; "
+            "memory freed before then only counts towards the peak):",
+            *(str(stat) for stat in growth),
+            "",
+            f"top {self.top} functions by cumulative time:",
+            stats_text.getvalue(),
+        ]
+        summary = stem.with_suffix(".txt")
+        summary.write_text("\n".join(lines))
+        console.print(
+            f"[dim]Profile {name}: {wall:.1f}s wall, {cpu:.1f}s CPU, "
+            f"peak {peak / 1024**2:.1f} MiB → {summary}[/dim]"
+        )
@@ -0,0 +1,74 @@
+"""Rate limiting for API requests and streamed transfers."""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+# Chunk size for throttled streams; small enough that transfers interleave finely
+THROTTLED_CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """Token bucket over bytes.
+
+    Callers are served strictly in arrival order, so concurrent transfers consuming
+    similar-sized chunks get an equal share of the rate.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, nbytes: int) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Go into debt and sleep it off while holding the lock, keeping later callers queued
+            self.tokens -= nbytes
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+
+
+class BandwidthLimiter:
+    """Global byte-rate cap with an optional per-host cap."""
+
+    def __init__(self, rate: float | None = None, per_host_rate: float | None = None):
+        self.total = TokenBucket(rate) if rate else None
+        self.per_host_rate = per_host_rate
+        self._hosts: dict[str, TokenBucket] = {}
+
+    def _host_bucket(self, url: str) -> TokenBucket | None:
+        if not self.per_host_rate:
+            return None
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = TokenBucket(self.per_host_rate)
+        return self._hosts[host]
+
+    async def throttle(self, url: str, nbytes: int) -> None:
+        """Wait until nbytes received from url fit within the configured rates."""
+        host_bucket = self._host_bucket(url)
+        if host_bucket:
+            await host_bucket.consume(nbytes)
+        if self.total:
+            await self.total.consume(nbytes)
+
+
+class Pacer:
+    """Spaces calls at least interval seconds apart, across all callers."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = time.monotonic() + self.interval
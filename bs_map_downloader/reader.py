@@ -0,0 +1,248 @@
+"""Zero-extraction access to files inside downloaded map zips."""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from zipfile import BadZipFile
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+LOCAL_SIGNATURE = b"PK\x03\x04"
+EOCD_SIZE = 22
+CENTRAL_HEADER_SIZE = 46
+LOCAL_HEADER_SIZE = 30
+# EOCD record plus the longest possible archive comment
+EOCD_SEARCH_SIZE = EOCD_SIZE + 0xFFFF
+
+_EOCD = struct.Struct("<4s4H2IH")
+_CENTRAL_HEADER = struct.Struct("<4s6H3I5H2I")
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    """Location of a single member inside a zip archive."""
+
+    name: str
+    header_offset: int
+    compressed_size: int
+    size: int
+    method: int
+
+
+def find_central_directory(tail: bytes, tail_offset: int = 0) -> tuple[int, int]:
+    """Locate the central directory from the trailing bytes of an archive.
+
+    Args:
+        tail: The last bytes of the archive (at least the EOCD record).
+        tail_offset: Absolute offset of ``tail[0]`` within the archive.
+
+    Returns (offset, size) of the central directory.
+    """
+    pos = tail.rfind(EOCD_SIGNATURE)
+    if pos < 0 or len(tail) - pos < EOCD_SIZE:
+        raise BadZipFile("End of central directory record not found")
+    _, _, _, _, _, cd_size, cd_offset, _ = _EOCD.unpack_from(tail, pos)
+    if cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF:
+        raise BadZipFile("ZIP64 archives are not supported")
+    if cd_offset + cd_size > tail_offset + pos:
+        raise BadZipFile("Central directory extends past end of archive")
+    return cd_offset, cd_size
+
+
+def parse_central_directory(data: bytes) -> dict[str, ZipEntry]:
+    """Parse central directory records into entries keyed by lowercase name."""
+    entries: dict[str, ZipEntry] = {}
+    pos = 0
+    while pos + CENTRAL_HEADER_SIZE <= len(data):
+        (
+            signature, _, _, flags, method, _, _, _,
+            compressed_size, size, name_len, extra_len, comment_len, _, _, _,
+            header_offset,
+        ) = _CENTRAL_HEADER.unpack_from(data, pos)
+        if signature != CENTRAL_SIGNATURE:
+            break
+        raw_name = data[pos + CENTRAL_HEADER_SIZE : pos + CENTRAL_HEADER_SIZE + name_len]
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+        if not name.endswith("/"):
+            entries[name.lower()] = ZipEntry(name, header_offset, compressed_size, size, method)
+        pos += CENTRAL_HEADER_SIZE + name_len + extra_len + comment_len
+    return entries
+
+
+def data_offset(local_header: bytes, entry: ZipEntry) -> int:
+    """Return the absolute offset of an entry's data given its local file header."""
+    signature, _, _, _, _, _, _, _, _, name_len, extra_len = _LOCAL_HEADER.unpack_from(local_header)
+    if signature != LOCAL_SIGNATURE:
+        raise BadZipFile(f"Bad local file header for {entry.name}")
+    return entry.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len
+
+
+def decompress(entry: ZipEntry, raw: bytes) -> bytes:
+    """Decompress an entry's raw (stored or deflated) data."""
+    if entry.method == 0:
+        return bytes(raw)
+    if entry.method == 8:
+        return zlib.decompress(raw, -15)
+    raise BadZipFile(f"Unsupported compression method {entry.method} for {entry.name}")
+
+
+@lru_cache(maxsize=4096)
+def _read_index(path: str, mtime_ns: int, size: int) -> dict[str, ZipEntry]:
+    """Read a zip's central directory. Cached per (path, mtime, size)."""
+    with open(path, "rb") as f:
+        tail_offset = max(0, size - EOCD_SEARCH_SIZE)
+        f.seek(tail_offset)
+        cd_offset, cd_size = find_central_directory(f.read(), tail_offset)
+        f.seek(cd_offset)
+        return parse_central_directory(f.read(cd_size))
+
+
+def read_index(path: Path) -> dict[str, ZipEntry]:
+    """Return the (cached) central directory index of a zip file."""
+    st = path.stat()
+    return _read_index(str(path), st.st_mtime_ns, st.st_size)
+
+
+def song_filename(info: dict) -> str | None:
+    """Return the audio filename referenced by an Info.dat (v2 or v4 schema)."""
+    if "_songFilename" in info:
+        return info["_songFilename"]
+    return info.get("audio", {}).get("songFilename")
+
+
+def song_bpm(info: dict) -> float | None:
+    """Return the song BPM from an Info.dat (v2 or v4 schema)."""
+    if "_beatsPerMinute" in info:
+        return info["_beatsPerMinute"]
+    return info.get("audio", {}).get("bpm")
+
+
+def difficulty_filenames(info: dict) -> list[str]:
+    """Return the difficulty filenames referenced by an Info.dat (v2 or v4 schema)."""
+    names = [
+        diff["_beatmapFilename"]
+        for beatmap_set in info.get("_difficultyBeatmapSets", [])
+        for diff in beatmap_set.get("_difficultyBeatmaps", [])
+        if "_beatmapFilename" in diff
+    ]
+    names.extend(
+        diff["beatmapDataFilename"]
+        for diff in info.get("difficultyBeatmaps", [])
+        if "beatmapDataFilename" in diff
+    )
+    return names
+
+
+class MapArchive:
+    """A memory-mapped map zip that serves member files by name without extracting.
+
+    Lookups are case-insensitive, since maps ship both ``Info.dat`` and ``info.dat``.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._index = read_index(path)
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self) -> "MapArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def names(self) -> list[str]:
+        """Return the names of all files in the archive."""
+        return [entry.name for entry in self._index.values()]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._index
+
+    def read(self, name: str) -> bytes:
+        """Return the decompressed contents of a member. Raises KeyError if missing."""
+        entry = self._index.get(name.lower())
+        if entry is None:
+            raise KeyError(f"There is no item named {name!r} in {self.path.name}")
+        start = data_offset(self._mmap[entry.header_offset : entry.header_offset + LOCAL_HEADER_SIZE], entry)
+        return decompress(entry, self._mmap[start : start + entry.compressed_size])
+
+    def info(self) -> dict:
+        """Return the parsed Info.dat."""
+        return json.loads(self.read("Info.dat"))
+
+    def audio(self) -> bytes:
+        """Return the raw audio bytes referenced by Info.dat."""
+        filename = song_filename(self.info())
+        if not filename:
+            raise KeyError(f"Info.dat in {self.path.name} does not reference an audio file")
+        return self.read(filename)
+
+    def difficulties(self) -> dict[str, bytes]:
+        """Return raw difficulty file contents keyed by filename."""
+        return {name: self.read(name) for name in difficulty_filenames(self.info()) if name in self}
+
+
+class MapReader:
+    """Read files from every map zip in a downloads directory without extracting.
+
+    Keeps up to ``max_open`` archives memory-mapped, closing the least recently used.
+    """
+
+    def __init__(self, downloads_dir: Path, max_open: int = 64):
+        self.downloads_dir = downloads_dir
+        self.max_open = max_open
+        self._open: OrderedDict[str, MapArchive] = OrderedDict()
+
+    def __enter__(self) -> "MapReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for archive in self._open.values():
+            archive.close()
+        self._open.clear()
+
+    def hashes(self) -> Iterator[str]:
+        """Yield the song hash of every non-empty zip in the downloads directory."""
+        with os.scandir(self.downloads_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".zip") and entry.is_file() and entry.stat().st_size > 0:
+                    yield entry.name[: -len(".zip")]
+
+    def open(self, song_hash: str) -> MapArchive:
+        """Return the (cached) archive for a song hash."""
+        archive = self._open.get(song_hash)
+        if archive is not None:
+            self._open.move_to_end(song_hash)
+            return archive
+
+        archive = MapArchive(self.downloads_dir / f"{song_hash}.zip")
+        self._open[song_hash] = archive
+        if len(self._open) > self.max_open:
+            _, evicted = self._open.popitem(last=False)
+            evicted.close()
+        return archive
+
+    def read(self, song_hash: str, name: str) -> bytes:
+        return self.open(song_hash).read(name)
+
+    def info(self, song_hash: str) -> dict:
+        return self.open(song_hash).info()
@@ -0,0 +1,96 @@
+"""Read individual files from remote map zips via HTTP Range requests."""
+
+from zipfile import BadZipFile
+
+import httpx
+
+from bs_map_downloader.reader import (
+    EOCD_SEARCH_SIZE,
+    LOCAL_HEADER_SIZE,
+    ZipEntry,
+    data_offset,
+    decompress,
+    find_central_directory,
+    parse_central_directory,
+)
+
+# Most map zips have no archive comment and a small central directory, so a 4 KiB
+# tail usually holds both the EOCD record and the whole central directory.
+INITIAL_TAIL_SIZE = 4096
+# Slack for local header extra fields, which may differ from the central directory's
+LOCAL_EXTRA_SLACK = 256
+
+
+async def _get_range(client: httpx.AsyncClient, url: str, range_spec: str) -> tuple[bytes, int, int | None]:
+    """Fetch a byte range. Returns (content, offset of content, total archive size).
+
+    Servers that ignore Range answer 200 with the whole file, which is handled as offset 0.
+    """
+    resp = await client.get(url, headers={"Range": f"bytes={range_spec}"}, follow_redirects=True)
+    resp.raise_for_status()
+    if resp.status_code != 206:
+        return resp.content, 0, len(resp.content)
+
+    # Content-Range: bytes start-end/total
+    content_range = resp.headers.get("content-range", "")
+    span, _, total = content_range.removeprefix("bytes ").partition("/")
+    start = int(span.partition("-")[0])
+    return resp.content, start, int(total) if total.isdigit() else None
+
+
+class RemoteZip:
+    """Lazily indexed zip behind a URL; only the tail and requested members are fetched."""
+
+    def __init__(self, client: httpx.AsyncClient, url: str):
+        self.client = client
+        self.url = url
+        self.size: int | None = None
+        self.bytes_fetched = 0
+        self._index: dict[str, ZipEntry] | None = None
+
+    async def _fetch(self, range_spec: str) -> tuple[bytes, int]:
+        content, offset, total = await _get_range(self.client, self.url, range_spec)
+        self.bytes_fetched += len(content)
+        if total is not None:
+            self.size = total
+        return content, offset
+
+    async def index(self) -> dict[str, ZipEntry]:
+        """Return the archive's central directory, fetching it on first use."""
+        if self._index is not None:
+            return self._index
+
+        tail, tail_offset = await self._fetch(f"-{INITIAL_TAIL_SIZE}")
+        try:
+            cd_offset, cd_size = find_central_directory(tail, tail_offset)
+        except BadZipFile:
+            # Archive comment pushed the EOCD record out of the initial window
+            if tail_offset == 0:
+                raise
+            tail, tail_offset = await self._fetch(f"-{EOCD_SEARCH_SIZE}")
+            cd_offset, cd_size = find_central_directory(tail, tail_offset)
+
+        if cd_offset >= tail_offset:
+            start = cd_offset - tail_offset
+            cd = tail[start : start + cd_size]
+        else:
+            cd, _ = await self._fetch(f"{cd_offset}-{cd_offset + cd_size - 1}")
+
+        self._index = parse_central_directory(cd)
+        return self._index
+
+    async def read(self, name: str) -> bytes:
+        """Fetch and decompress a single member. Raises KeyError if missing."""
+        entry = (await self.index()).get(name.lower())
+        if entry is None:
+            raise KeyError(f"There is no item named {name!r} in {self.url}")
+
+        end = entry.header_offset + LOCAL_HEADER_SIZE + len(entry.name.encode()) + LOCAL_EXTRA_SLACK
+        chunk, offset = await self._fetch(f"{entry.header_offset}-{end + entry.compressed_size - 1}")
+        start = data_offset(chunk[entry.header_offset - offset :], entry) - offset
+        raw = chunk[start : start + entry.compressed_size]
+        if len(raw) < entry.compressed_size:
+            missing_from = offset + start + len(raw)
+            rest, _ = await self._fetch(f"{missing_from}-{offset + start + entry.compressed_size - 1}")
+            raw += rest
+        return decompress(entry, raw)
@@ -0,0 +1,166 @@
+"""Priority-ordered resolve → transfer download pipeline with an in-flight byte budget."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from bs_map_downloader.models import ORDERS, MapInfo
+
+# Size assumed for maps of unknown size until real sizes have been observed
+DEFAULT_SIZE_ESTIMATE = 3 * 1024 * 1024
+
+
+def _ranked_timestamp(m: MapInfo) -> float:
+    try:
+        return datetime.fromisoformat(m.ranked_date.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def priority_key(order: str) -> Callable[[MapInfo], tuple]:
+    """Return a sort key putting the most valuable maps first for the given order."""
+    if order == "input":
+        return lambda m: ()
+    if order == "newest":
+        return lambda m: (-_ranked_timestamp(m),)
+    if order == "stars":
+        return lambda m: (-m.stars,)
+    if order == "smallest":
+        # Unknown sizes go last
+        return lambda m: (m.size is None, m.size or 0)
+    raise ValueError(f"Unknown order {order!r}, expected one of {', '.join(ORDERS)}")
+
+
+class ByteBudget:
+    """Caps the total estimated bytes of transfers in flight.
+
+    A single transfer larger than the limit is still admitted when nothing else is
+    in flight, so oversized maps can't stall the run.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight == 0 or self.in_flight + nbytes <= self.limit)
+            self.in_flight += nbytes
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= nbytes
+                self._cond.notify_all()
+
+
+class SizeEstimator:
+    """Running mean of observed zip sizes, used for maps whose size is unknown."""
+
+    def __init__(self, default: int = DEFAULT_SIZE_ESTIMATE):
+        self.default = default
+        self._total = 0
+        self._count = 0
+
+    def observe(self, nbytes: int) -> None:
+        self._total += nbytes
+        self._count += 1
+
+    def estimate(self, m: MapInfo) -> int:
+        if m.size is not None:
+            return m.size
+        return self._total // self._count if self._count else self.default
+
+
+class DownloadScheduler:
+    """Two-stage pipeline of bounded worker pools pulling from priority queues.
+
+    Maps without a download URL first go through resolvers workers, which feed
+    resolved maps into the transfer queue; maps with a known URL go straight there.
+    Each stage takes the most valuable remaining map first (per order), so an
+    interrupted run has already fetched the maps that matter most. With
+    max_inflight_bytes, a transfer worker waits until the estimated size of its map
+    fits the in-flight byte budget.
+    """
+
+    def __init__(
+        self,
+        order: str = "input",
+        workers: int = 5,
+        max_inflight_bytes: int | None = None,
+        resolvers: int = 2,
+    ):
+        self.key = priority_key(order)
+        self.workers = workers
+        self.resolvers = resolvers
+        self.budget = ByteBudget(max_inflight_bytes) if max_inflight_bytes else None
+        self.sizes = SizeEstimator()
+        self._items: list[tuple[tuple, int, MapInfo]] = []
+
+    def put(self, m: MapInfo) -> None:
+        # The sequence number keeps equal-priority maps in input order
+        self._items.append((self.key(m), len(self._items), m))
+
+    async def _resolver(
+        self,
+        resolve: Callable[[MapInfo], Awaitable[bool]],
+        inbox: asyncio.PriorityQueue,
+        outbox: asyncio.PriorityQueue,
+    ) -> None:
+        while not inbox.empty():
+            key, seq, m = inbox.get_nowait()
+            if await resolve(m):
+                outbox.put_nowait((0, key, seq, m))
+
+    async def _transferrer(
+        self,
+        transfer: Callable[[MapInfo], Awaitable[int | None]],
+        inbox: asyncio.PriorityQueue,
+    ) -> None:
+        while True:
+            done, _, _, m = await inbox.get()
+            if done:
+                return
+            if self.budget:
+                async with self.budget.reserve(self.sizes.estimate(m)):
+                    nbytes = await transfer(m)
+            else:
+                nbytes = await transfer(m)
+            if nbytes:
+                self.sizes.observe(nbytes)
+
+    async def run(
+        self,
+        transfer: Callable[[MapInfo], Awaitable[int | None]],
+        resolve: Callable[[MapInfo], Awaitable[bool]] | None = None,
+    ) -> None:
+        """Run every queued map through resolve (if its URL is unknown), then transfer.
+
+        resolve returns whether the map was resolved; transfer returns the bytes
+        transferred, if any.
+        """
+        to_resolve: asyncio.PriorityQueue[tuple[tuple, int, MapInfo]] = asyncio.PriorityQueue()
+        # Entries are (done, key, seq, map); done sentinels sort after all real work
+        to_transfer: asyncio.PriorityQueue[tuple[int, tuple, int, MapInfo | None]] = asyncio.PriorityQueue()
+        for key, seq, m in self._items:
+            if resolve and not m.download_url:
+                to_resolve.put_nowait((key, seq, m))
+            else:
+                to_transfer.put_nowait((0, key, seq, m))
+        self._items = []
+
+        async def _resolve_stage() -> None:
+            if resolve:
+                await asyncio.gather(
+                    *[self._resolver(resolve, to_resolve, to_transfer) for _ in range(self.resolvers)]
+                )
+            for _ in range(self.workers):
+                to_transfer.put_nowait((1, (), 0, None))
+
+        await asyncio.gather(
+            _resolve_stage(),
+            *[self._transferrer(transfer, to_transfer) for _ in range(self.workers)],
+        )
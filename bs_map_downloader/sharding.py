@@ -0,0 +1,86 @@
+"""Deterministic partitioning of maps across machines, and merging of per-shard manifests."""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from bs_map_downloader import console
+from bs_map_downloader.models import MapInfo
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Shard index of count, 0-based."""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """Parse "i/n" with 0 <= i < n."""
+        index, sep, count = spec.partition("/")
+        try:
+            shard = cls(int(index), int(count))
+        except ValueError:
+            raise ValueError(f"Invalid shard {spec!r}, expected i/n (e.g. 0/4)") from None
+        if not sep or shard.count < 1 or not 0 <= shard.index < shard.count:
+            raise ValueError(f"Invalid shard {spec!r}, expected i/n with 0 <= i < n")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def contains(self, song_hash: str) -> bool:
+        return shard_of(song_hash, self.count) == self.index
+
+    def filter(self, maps: list[MapInfo]) -> list[MapInfo]:
+        return [m for m in maps if self.contains(m.song_hash)]
+
+
+def shard_of(song_hash: str, count: int) -> int:
+    """Map a song hash to a shard, identically on every machine and Python version."""
+    digest = hashlib.blake2b(song_hash.lower().encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def default_manifest_path(downloads_dir: Path, shard: Shard) -> Path:
+    return downloads_dir / f"manifest-{shard.index}-of-{shard.count}.json"
+
+
+def write_manifest(path: Path, maps: list[MapInfo], shard: Shard | None = None) -> None:
+    """Atomically write a manifest of maps in metadata.json format."""
+    data: dict = {"maps": [m.to_metadata() for m in maps]}
+    if shard:
+        data["shard"] = {"index": shard.index, "count": shard.count}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def merge_manifests(paths: list[Path]) -> list[dict]:
+    """Combine per-shard manifests into one map list, deduplicated by song hash.
+
+    Warns if the manifests don't cover every shard of the same count.
+    """
+    merged: dict[str, dict] = {}
+    shards: set[int] = set()
+    counts: set[int] = set()
+    for path in paths:
+        data = json.loads(path.read_text())
+        if "shard" in data:
+            shards.add(data["shard"]["index"])
+            counts.add(data["shard"]["count"])
+        for entry in data.get("maps", []):
+            merged.setdefault(entry["songHash"], entry)
+
+    if len(counts) > 1:
+        console.print(f"[yellow]Manifests come from different shard counts: {sorted(counts)}.[/yellow]")
+    elif counts:
+        missing = sorted(set(range(counts.pop())) - shards)
+        if missing:
+            console.print(f"[yellow]Missing manifests for shard(s) {', '.join(map(str, missing))}.[/yellow]")
+
+    return list(merged.values())
@@ -2,6 +2,7 @@
 
 from bs_map_downloader.sources.beatleader import fetch_beatleader
 from bs_map_downloader.sources.beatsaver import fetch_mapper
+from bs_map_downloader.sources.catalog import fetch_catalog
 from bs_map_downloader.sources.scoresaber import fetch_scoresaber
 
-__all__ = ["fetch_scoresaber", "fetch_beatleader", "fetch_mapper"]
+__all__ = ["fetch_scoresaber", "fetch_beatleader", "fetch_mapper", "fetch_catalog"]
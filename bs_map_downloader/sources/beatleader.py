@@ -6,7 +6,10 @@ from datetime import datetime, timezone
 import httpx
 
 from bs_map_downloader import console, fetch_progress
+from bs_map_downloader.decoding import project_beatleader
+from bs_map_downloader.dedup import HashSet, unique_maps
 from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.pagination import Checkpoint, get_page
 
 BEATLEADER_API = "https://api.beatleader.xyz/leaderboards"
 
@@ -16,11 +19,27 @@ async def fetch_beatleader(
     limit: int | None,
     since: datetime,
     until: datetime | None,
+    known: set[str] | None = None,
+    checkpoint: Checkpoint | None = None,
+    seen: HashSet | set[str] | None = None,
 ) -> list[MapInfo]:
-    """Paginate BeatLeader leaderboards API and collect unique maps ranked within the date range."""
-    seen_hashes: set[str] = set()
+    """Paginate BeatLeader leaderboards API and collect unique maps ranked within the date range.
+
+    If known is given, pagination stops at the first map whose hash is in it, since
+    everything after it was ranked earlier (used to poll for newly ranked maps).
+    If checkpoint is given, progress is saved periodically and on failure, and a
+    matching saved checkpoint is resumed from instead of starting at page 1.
+    seen is the set of hashes to deduplicate against; pass one shared set to
+    deduplicate across sources.
+    """
+    seen_hashes = seen if seen is not None else set()
     maps: list[MapInfo] = []
     page = 1
+    resumed = checkpoint.load() if checkpoint else None
+    if resumed:
+        page, maps = resumed
+        maps = unique_maps(maps, seen_hashes)
+        console.print(f"[dim]BeatLeader: resuming from page {page} ({len(maps)} maps so far).[/dim]")
     count = 100
 
     since_ts = int(since.timestamp())
@@ -33,67 +52,78 @@ async def fetch_beatleader(
     ) as progress:
         task = progress.add_task("fetch", total=None, page=0, unique=0)
 
-        while True:
-            if limit and len(maps) >= limit:
-                maps = maps[:limit]
-                break
-
-            progress.update(task, page=page, unique=len(maps))
-
-            resp = await client.get(
-                BEATLEADER_API,
-                params={
-                    "type": "ranked",
-                    "sortBy": "timestamp",
-                    "order": "desc",
-                    "page": page,
-                    "count": count,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-
-            entries = data.get("data", [])
-            if not entries:
-                break
-
-            stop = False
-            for entry in entries:
-                ranked_time = entry.get("difficulty", {}).get("rankedTime", 0)
-                if ranked_time < since_ts:
-                    stop = True
+        try:
+            while True:
+                if limit and len(maps) >= limit:
+                    maps = maps[:limit]
                     break
 
-                if until_ts and ranked_time > until_ts:
-                    continue
-
-                song = entry.get("song", {})
-                song_hash = song.get("hash", "").lower()
-                if not song_hash or song_hash in seen_hashes:
-                    continue
-                seen_hashes.add(song_hash)
-
-                ranked_dt = datetime.fromtimestamp(ranked_time, tz=timezone.utc)
-                maps.append(
-                    MapInfo(
-                        song_hash=song_hash,
-                        song_name=song.get("name", ""),
-                        song_author=song.get("author", ""),
-                        mapper=song.get("mapper", ""),
-                        stars=entry.get("difficulty", {}).get("stars", 0),
-                        ranked_date=ranked_dt.isoformat(),
-                        source=Source.BEATLEADER,
-                    )
+                progress.update(task, page=page, unique=len(maps))
+
+                rows = await get_page(
+                    client,
+                    BEATLEADER_API,
+                    params={
+                        "type": "ranked",
+                        "sortBy": "timestamp",
+                        "order": "desc",
+                        "page": page,
+                        "count": count,
+                    },
+                    decode=project_beatleader,
                 )
-
-                if limit and len(maps) >= limit:
+                if not rows:
                     break
 
-            if stop:
-                break
+                stop = False
+                for row in rows:
+                    ranked_time = row.ranked
+                    if ranked_time < since_ts:
+                        stop = True
+                        break
+
+                    if until_ts and ranked_time > until_ts:
+                        continue
+
+                    song_hash = row.song_hash
+                    if known is not None and song_hash in known:
+                        stop = True
+                        break
+                    if not song_hash or song_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(song_hash)
+
+                    ranked_dt = datetime.fromtimestamp(ranked_time, tz=timezone.utc)
+                    maps.append(
+                        MapInfo(
+                            song_hash=song_hash,
+                            song_name=row.song_name,
+                            song_author=row.song_author,
+                            mapper=row.mapper,
+                            stars=row.stars,
+                            ranked_date=ranked_dt.isoformat(),
+                            source=Source.BEATLEADER,
+                        )
+                    )
+
+                    if limit and len(maps) >= limit:
+                        break
+
+                if stop:
+                    break
 
-            page += 1
-            await asyncio.sleep(0.15)
+                page += 1
+                if checkpoint:
+                    checkpoint.advance(page, maps)
+                await asyncio.sleep(0.15)
+        except BaseException:
+            # Interrupted or out of retries: keep what was fetched for the next run
+            if checkpoint:
+                checkpoint.save(page, maps)
+            raise
+
+    if checkpoint:
+        checkpoint.clear()
 
     since_label = since.strftime("%Y-%m-%d")
     console.print(f"[green]BeatLeader: found {len(maps)} unique maps ranked since {since_label}.[/green]")
@@ -6,14 +6,46 @@ import httpx
 
 from bs_map_downloader import console, fetch_progress
 from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.pagination import Checkpoint, get_page
 
 BEATSAVER_SEARCH_API = "https://api.beatsaver.com/search/text"
 
 
-async def fetch_mapper(client: httpx.AsyncClient, mapper: str, limit: int | None) -> list[MapInfo]:
-    """Fetch all maps by a specific mapper from BeatSaver."""
+def map_from_doc(doc: dict) -> MapInfo | None:
+    """Build a MapInfo from a BeatSaver map document (its latest version), if it has one."""
+    versions = doc.get("versions", [])
+    if not versions:
+        return None
+
+    song_hash = versions[0].get("hash", "").lower()
+    if not song_hash:
+        return None
+
+    metadata = doc.get("metadata", {})
+    return MapInfo(
+        song_hash=song_hash,
+        song_name=metadata.get("songName", ""),
+        song_author=metadata.get("songAuthorName", ""),
+        mapper=metadata.get("levelAuthorName", ""),
+        ranked_date=doc.get("uploaded", ""),
+        source=Source.BEATSAVER,
+        download_url=versions[0]["downloadURL"],
+    )
+
+
+async def fetch_mapper(
+    client: httpx.AsyncClient,
+    mapper: str,
+    limit: int | None,
+    checkpoint: Checkpoint | None = None,
+) -> list[MapInfo]:
+    """Fetch all maps by a specific mapper from BeatSaver, resuming from checkpoint if given."""
     maps: list[MapInfo] = []
     page = 0
+    resumed = checkpoint.load() if checkpoint else None
+    if resumed:
+        page, maps = resumed
+        console.print(f"[dim]BeatSaver: resuming from page {page} ({len(maps)} maps so far).[/dim]")
 
     with fetch_progress(
         f"Fetching maps by {mapper}...",
@@ -22,51 +54,45 @@ async def fetch_mapper(client: httpx.AsyncClient, mapper: str, limit: int | None
     ) as progress:
         task = progress.add_task("fetch", total=None, page=0, count=0)
 
-        while True:
-            if limit and len(maps) >= limit:
-                maps = maps[:limit]
-                break
-
-            progress.update(task, page=page, count=len(maps))
-
-            resp = await client.get(
-                f"{BEATSAVER_SEARCH_API}/{page}",
-                params={"q": f"mapper:{mapper}", "sortOrder": "Latest"},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-
-            docs = data.get("docs", [])
-            if not docs:
-                break
-
-            for entry in docs:
-                versions = entry.get("versions", [])
-                if not versions:
-                    continue
-
-                song_hash = versions[0].get("hash", "").lower()
-                if not song_hash:
-                    continue
-
-                metadata = entry.get("metadata", {})
-                maps.append(
-                    MapInfo(
-                        song_hash=song_hash,
-                        song_name=metadata.get("songName", ""),
-                        song_author=metadata.get("songAuthorName", ""),
-                        mapper=metadata.get("levelAuthorName", ""),
-                        ranked_date=entry.get("uploaded", ""),
-                        source=Source.BEATSAVER,
-                        download_url=versions[0]["downloadURL"],
-                    )
+        try:
+            while True:
+                if limit and len(maps) >= limit:
+                    maps = maps[:limit]
+                    break
+
+                progress.update(task, page=page, count=len(maps))
+
+                data = await get_page(
+                    client,
+                    f"{BEATSAVER_SEARCH_API}/{page}",
+                    params={"q": f"mapper:{mapper}", "sortOrder": "Latest"},
                 )
 
-                if limit and len(maps) >= limit:
+                docs = data.get("docs", [])
+                if not docs:
                     break
 
-            page += 1
-            await asyncio.sleep(0.15)
+                for entry in docs:
+                    map_info = map_from_doc(entry)
+                    if map_info is None:
+                        continue
+                    maps.append(map_info)
+
+                    if limit and len(maps) >= limit:
+                        break
+
+                page += 1
+                if checkpoint:
+                    checkpoint.advance(page, maps)
+                await asyncio.sleep(0.15)
+        except BaseException:
+            # Interrupted or out of retries: keep what was fetched for the next run
+            if checkpoint:
+                checkpoint.save(page, maps)
+            raise
+
+    if checkpoint:
+        checkpoint.clear()
 
     console.print(f"[green]BeatSaver: found {len(maps)} maps by {mapper}.[/green]")
     return maps
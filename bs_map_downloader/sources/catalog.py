@@ -0,0 +1,206 @@
+"""BeatSaver latest-maps feed walker, for mirroring the whole catalog."""
+
+import asyncio
+import json
+import os
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from bs_map_downloader import console, fetch_progress
+from bs_map_downloader.dedup import HashSet, unique_maps
+from bs_map_downloader.models import MapInfo
+from bs_map_downloader.pagination import Checkpoint, get_page
+from bs_map_downloader.sources.beatsaver import map_from_doc
+
+BEATSAVER_LATEST_API = "https://api.beatsaver.com/maps/latest"
+# Before BeatSaver's first upload
+CATALOG_START = datetime(2018, 5, 1, tzinfo=timezone.utc)
+CURSOR_NAME = ".catalog-cursor.json"
+PAGE_SIZE = 100
+CATALOG_CONCURRENCY = 4
+# More windows than workers, so a worker that finishes a sparse window picks up another
+WINDOWS_PER_WORKER = 4
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def format_time(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class CatalogCursor:
+    """Upload time of the newest map fetched by the last complete catalog walk.
+
+    Stored with the since date of that walk, since it only vouches for uploads
+    from that date on. A walk only records its position in pending; commit saves it
+    once the walk's maps have been delivered.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.pending: tuple[datetime, datetime] | None = None
+
+    def load(self, since: datetime) -> datetime | None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+        if parse_time(data["since"]) > since:
+            return None
+        return parse_time(data["newest"])
+
+    def save(self, since: datetime, newest: datetime) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"since": format_time(since), "newest": format_time(newest)}))
+        os.replace(tmp, self.path)
+
+    def commit(self, failed: Iterable[MapInfo] = ()) -> None:
+        """Save the pending position, stopping just before the oldest failed map.
+
+        The next run then fetches the failed maps again, along with everything newer.
+        """
+        if self.pending is None:
+            return
+        since, newest = self.pending
+        failed_times = [parse_time(m.ranked_date) for m in failed]
+        if failed_times:
+            newest = min(newest, min(failed_times) - timedelta(milliseconds=1))
+        self.save(since, newest)
+        self.pending = None
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def split_windows(after: datetime, before: datetime, count: int) -> list[list[str]]:
+    """Split [after, before) into count equal time windows, newest first, as [after, before] strings."""
+    span = (before - after) / count
+    bounds = [after + span * i for i in range(count)] + [before]
+    return [[format_time(bounds[i]), format_time(bounds[i + 1])] for i in reversed(range(count))]
+
+
+async def fetch_catalog(
+    client: httpx.AsyncClient,
+    limit: int | None,
+    since: datetime,
+    until: datetime | None = None,
+    cursor: CatalogCursor | None = None,
+    concurrency: int = CATALOG_CONCURRENCY,
+    checkpoint: Checkpoint | None = None,
+    seen: HashSet | set[str] | None = None,
+) -> list[MapInfo]:
+    """Collect every BeatSaver map uploaded within the date range from the latest-maps feed.
+
+    The range is split into time windows walked by up to concurrency workers at once.
+    Each window pages newest-first with a `before` upload-time cursor instead of an
+    offset, so uploads made during the walk can't shift pages under it. With limit, a
+    single window is walked so the newest maps come first.
+
+    With cursor (and no until or limit), only maps uploaded since the last complete
+    walk are fetched, and once this walk completes the newest upload time becomes the
+    cursor's pending position, for the caller to commit after delivering the maps. A
+    limited walk never moves the cursor, since the maps it cut off weren't fetched. A
+    checkpoint saves the remaining windows and the maps so far, as for the other
+    sources.
+    """
+    seen_hashes = seen if seen is not None else set()
+    incremental = cursor is not None and until is None and not limit
+    after = since
+    if incremental:
+        previous = cursor.load(since)
+        if previous:
+            after = max(since, previous + timedelta(milliseconds=1))
+            console.print(f"[dim]BeatSaver catalog: fetching uploads since {format_time(previous)}.[/dim]")
+
+    maps: list[MapInfo] = []
+    resumed = checkpoint.load() if checkpoint else None
+    if resumed:
+        windows, maps = resumed
+        maps = unique_maps(maps, seen_hashes)
+        console.print(f"[dim]BeatSaver catalog: resuming {len(windows)} windows ({len(maps)} maps so far).[/dim]")
+    else:
+        before = until or datetime.now(timezone.utc)
+        count = 1 if limit else concurrency * WINDOWS_PER_WORKER
+        windows = split_windows(after, before, count)
+
+    semaphore = asyncio.Semaphore(1 if limit else concurrency)
+    pages = 0
+
+    with fetch_progress(
+        "Fetching BeatSaver catalog...",
+        page="page {task.fields[page]}",
+        unique="· {task.fields[unique]} unique maps",
+    ) as progress:
+        task = progress.add_task("fetch", total=None, page=0, unique=0)
+
+        async def walk(window: list[str]) -> None:
+            nonlocal pages
+            lower = parse_time(window[0])
+            async with semaphore:
+                while not (limit and len(maps) >= limit):
+                    data = await get_page(
+                        client,
+                        BEATSAVER_LATEST_API,
+                        params={"before": window[1], "sort": "FIRST_PUBLISHED", "pageSize": PAGE_SIZE},
+                    )
+                    docs = data.get("docs", [])
+                    pages += 1
+
+                    # Windows are [after, before); the lower bound is applied here, so only
+                    # `before` is sent
+                    done = len(docs) < PAGE_SIZE
+                    for doc in docs:
+                        if parse_time(doc["uploaded"]) < lower:
+                            done = True
+                            break
+                        map_info = map_from_doc(doc)
+                        if map_info is None or map_info.song_hash in seen_hashes:
+                            continue
+                        seen_hashes.add(map_info.song_hash)
+                        maps.append(map_info)
+
+                    progress.update(task, page=pages, unique=len(maps))
+                    if done:
+                        break
+
+                    # before is exclusive, so step just past the last upload rather than
+                    # to it, in case the next map shares its timestamp
+                    last = parse_time(docs[-1]["uploaded"])
+                    step = last + timedelta(milliseconds=1)
+                    window[1] = format_time(step if step < parse_time(window[1]) else last)
+                    if checkpoint:
+                        checkpoint.advance(windows, maps)
+                    await asyncio.sleep(0.15)
+            windows.remove(window)
+
+        walkers = [asyncio.ensure_future(walk(window)) for window in list(windows)]
+        try:
+            await asyncio.gather(*walkers)
+        except BaseException:
+            # One window failed or the fetch was interrupted: stop the others, then keep
+            # what was fetched for the next run
+            for walker in walkers:
+                walker.cancel()
+            await asyncio.gather(*walkers, return_exceptions=True)
+            if checkpoint:
+                checkpoint.save(windows, maps)
+            raise
+
+    if checkpoint:
+        checkpoint.clear()
+
+    maps.sort(key=lambda m: m.ranked_date, reverse=True)
+    if limit:
+        maps = maps[:limit]
+    if incremental and maps:
+        cursor.pending = (since, parse_time(maps[0].ranked_date))
+
+    since_label = after.strftime("%Y-%m-%d")
+    console.print(f"[green]BeatSaver catalog: found {len(maps)} maps uploaded since {since_label}.[/green]")
+    return maps
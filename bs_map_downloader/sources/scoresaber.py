@@ -6,7 +6,10 @@ from datetime import datetime
 import httpx
 
 from bs_map_downloader import console, fetch_progress
+from bs_map_downloader.decoding import project_scoresaber
+from bs_map_downloader.dedup import HashSet, unique_maps
 from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.pagination import Checkpoint, get_page
 
 SCORESABER_API = "https://scoresaber.com/api/leaderboards"
 
@@ -16,11 +19,27 @@ async def fetch_scoresaber(
     limit: int | None,
     since: datetime,
     until: datetime | None,
+    known: set[str] | None = None,
+    checkpoint: Checkpoint | None = None,
+    seen: HashSet | set[str] | None = None,
 ) -> list[MapInfo]:
-    """Paginate ScoreSaber leaderboards API and collect unique maps ranked within the date range."""
-    seen_hashes: set[str] = set()
+    """Paginate ScoreSaber leaderboards API and collect unique maps ranked within the date range.
+
+    If known is given, pagination stops at the first map whose hash is in it, since
+    everything after it was ranked earlier (used to poll for newly ranked maps).
+    If checkpoint is given, progress is saved periodically and on failure, and a
+    matching saved checkpoint is resumed from instead of starting at page 1.
+    seen is the set of hashes to deduplicate against; pass one shared set to
+    deduplicate across sources.
+    """
+    seen_hashes = seen if seen is not None else set()
     maps: list[MapInfo] = []
     page = 1
+    resumed = checkpoint.load() if checkpoint else None
+    if resumed:
+        page, maps = resumed
+        maps = unique_maps(maps, seen_hashes)
+        console.print(f"[dim]ScoreSaber: resuming from page {page} ({len(maps)} maps so far).[/dim]")
 
     with fetch_progress(
         "Fetching ScoreSaber leaderboards...",
@@ -29,59 +48,71 @@ async def fetch_scoresaber(
     ) as progress:
         task = progress.add_task("fetch", total=None, page=0, unique=0)
 
-        while True:
-            if limit and len(maps) >= limit:
-                maps = maps[:limit]
-                break
-
-            progress.update(task, page=page, unique=len(maps))
-
-            resp = await client.get(
-                SCORESABER_API,
-                params={"ranked": "true", "sort": 0, "category": 1, "page": page},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-
-            leaderboards = data.get("leaderboards", [])
-            if not leaderboards:
-                break
-
-            stop = False
-            for entry in leaderboards:
-                ranked_date = datetime.fromisoformat(entry["rankedDate"].replace("Z", "+00:00"))
-                if ranked_date < since:
-                    stop = True
+        try:
+            while True:
+                if limit and len(maps) >= limit:
+                    maps = maps[:limit]
                     break
 
-                if until and ranked_date > until:
-                    continue
-
-                song_hash = entry["songHash"].lower()
-                if song_hash in seen_hashes:
-                    continue
-                seen_hashes.add(song_hash)
-
-                maps.append(
-                    MapInfo(
-                        song_hash=song_hash,
-                        song_name=entry.get("songName", ""),
-                        song_author=entry.get("songAuthorName", ""),
-                        mapper=entry.get("levelAuthorName", ""),
-                        stars=entry.get("stars", 0),
-                        ranked_date=entry["rankedDate"],
-                        source=Source.SCORESABER,
-                    )
-                )
+                progress.update(task, page=page, unique=len(maps))
 
-                if limit and len(maps) >= limit:
+                rows = await get_page(
+                    client,
+                    SCORESABER_API,
+                    params={"ranked": "true", "sort": 0, "category": 1, "page": page},
+                    decode=project_scoresaber,
+                )
+                if not rows:
                     break
 
-            if stop:
-                break
+                stop = False
+                for row in rows:
+                    ranked_date = datetime.fromisoformat(row.ranked.replace("Z", "+00:00"))
+                    if ranked_date < since:
+                        stop = True
+                        break
+
+                    if until and ranked_date > until:
+                        continue
+
+                    song_hash = row.song_hash
+                    if known is not None and song_hash in known:
+                        stop = True
+                        break
+                    if song_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(song_hash)
+
+                    maps.append(
+                        MapInfo(
+                            song_hash=song_hash,
+                            song_name=row.song_name,
+                            song_author=row.song_author,
+                            mapper=row.mapper,
+                            stars=row.stars,
+                            ranked_date=row.ranked,
+                            source=Source.SCORESABER,
+                        )
+                    )
+
+                    if limit and len(maps) >= limit:
+                        break
+
+                if stop:
+                    break
 
-            page += 1
-            await asyncio.sleep(0.15)
+                page += 1
+                if checkpoint:
+                    checkpoint.advance(page, maps)
+                await asyncio.sleep(0.15)
+        except BaseException:
+            # Interrupted or out of retries: keep what was fetched for the next run
+            if checkpoint:
+                checkpoint.save(page, maps)
+            raise
+
+    if checkpoint:
+        checkpoint.clear()
 
     since_label = since.strftime("%Y-%m-%d")
     console.print(f"[green]ScoreSaber: found {len(maps)} unique maps ranked since {since_label}.[/green]")
@@ -0,0 +1,170 @@
+"""Local SQLite store of fetched map metadata, queryable offline with filter expressions."""
+
+import sqlite3
+import time
+from pathlib import Path
+
+from bs_map_downloader.filters import MAP_INFO_FIELDS, MapFilter, date_conditions, parse_date
+from bs_map_downloader.models import MapInfo, Source
+
+STORE_NAME = ".metadata.sqlite"
+# Sort orders for query results; ties keep the newest first
+SORTS = {
+    "newest": "ranked_ts DESC",
+    "oldest": "ranked_ts ASC",
+    "stars": "stars DESC, ranked_ts DESC",
+    "mapper": "mapper, ranked_ts DESC",
+}
+_SQL_OPERATORS = {">=": ">=", "<=": "<=", "!=": "!=", "==": "=", "=": "=", ">": ">", "<": "<"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    song_hash TEXT PRIMARY KEY,
+    song_name TEXT NOT NULL,
+    song_author TEXT NOT NULL,
+    mapper TEXT NOT NULL COLLATE NOCASE,
+    stars REAL NOT NULL,
+    ranked_date TEXT NOT NULL,
+    ranked_ts REAL,
+    source TEXT NOT NULL COLLATE NOCASE,
+    download_url TEXT,
+    size INTEGER,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS maps_mapper ON maps (mapper, ranked_ts);
+CREATE INDEX IF NOT EXISTS maps_stars ON maps (stars);
+CREATE INDEX IF NOT EXISTS maps_ranked ON maps (ranked_ts);
+"""
+
+
+def filter_sql(map_filter: MapFilter) -> tuple[str, list]:
+    """Translate a filter over MapInfo fields into an SQL WHERE clause and its parameters.
+
+    ranked_date compares like MapFilter.matches does, with a bare date covering its whole
+    UTC day (see filters.date_conditions). Raises ValueError for fields the store
+    doesn't hold or ranked_date values that aren't dates.
+    """
+    unknown = map_filter.fields - MAP_INFO_FIELDS
+    if unknown:
+        fields = ", ".join(sorted(MAP_INFO_FIELDS))
+        raise ValueError(f"Unknown query field(s): {', '.join(sorted(unknown))} (stored fields: {fields})")
+    conditions, params = [], []
+    for clause in map_filter.clauses:
+        op = _SQL_OPERATORS[clause.op]
+        if clause.field == "ranked_date":
+            try:
+                date_clauses, negate = date_conditions(clause.op, clause.raw)
+            except ValueError as e:
+                raise ValueError(f"ranked_date: {e}") from None
+            condition = " AND ".join(f"ranked_ts {date_op} ?" for date_op, _ in date_clauses)
+            conditions.append(f"NOT ({condition})" if negate else condition)
+            params.extend(ts for _, ts in date_clauses)
+        elif clause.field == "stars":
+            if not isinstance(clause.value, float):
+                raise ValueError(f"stars needs a number, got {clause.value!r}")
+            conditions.append(f"stars {op} ?")
+            params.append(clause.value)
+        else:
+            # mapper and source compare case-insensitively, like MapFilter does
+            conditions.append(f"{clause.field} {op} ?")
+            params.append(clause.raw)
+    return " AND ".join(conditions), params
+
+
+class MetadataStore:
+    """Fetched maps keyed by song hash, indexed by mapper, stars and ranked date, stored in SQLite."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self) -> "MetadataStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM maps").fetchone()[0]
+
+    def add(self, maps: list[MapInfo]) -> None:
+        """Insert or update maps. A known download URL or size is kept if the new record lacks it.
+
+        A BeatSaver record never overwrites the stars, source or ranked date of a map
+        stored from a ranked source; its other fields are merged in as usual.
+        """
+        now = time.time()
+        # BeatSaver records (--mapper, catalog, feed) carry no stars and use the upload
+        # date, so they must not replace what a ranked source recorded
+        ranked = f"(excluded.source = '{Source.BEATSAVER.value}' AND maps.source != '{Source.BEATSAVER.value}')"
+        kept = ", ".join(
+            f"{column} = CASE WHEN {ranked} THEN maps.{column} ELSE excluded.{column} END"
+            for column in ("stars", "ranked_date", "ranked_ts", "source")
+        )
+        self._db.executemany(
+            "INSERT INTO maps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (song_hash) DO UPDATE SET song_name = excluded.song_name, "
+            f"song_author = excluded.song_author, mapper = excluded.mapper, {kept}, "
+            "download_url = coalesce(excluded.download_url, download_url), size = coalesce(excluded.size, size), "
+            "fetched = excluded.fetched",
+            [
+                (
+                    m.song_hash,
+                    m.song_name,
+                    m.song_author,
+                    m.mapper,
+                    m.stars,
+                    m.ranked_date,
+                    parse_date(m.ranked_date),
+                    m.source.value,
+                    m.download_url,
+                    m.size,
+                    now,
+                )
+                for m in maps
+            ],
+        )
+        self._db.commit()
+
+    def query(
+        self,
+        map_filter: MapFilter | None = None,
+        sort: str = "newest",
+        limit: int | None = None,
+    ) -> list[MapInfo]:
+        """Return the stored maps matching map_filter, in sort order (see SORTS), at most limit of them."""
+        sql = (
+            "SELECT song_hash, song_name, song_author, mapper, ranked_date, source, stars, download_url, size "
+            "FROM maps"
+        )
+        params: list = []
+        if map_filter:
+            where, params = filter_sql(map_filter)
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {SORTS[sort]}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            MapInfo(
+                song_hash=song_hash,
+                song_name=song_name,
+                song_author=song_author,
+                mapper=mapper,
+                ranked_date=ranked_date,
+                source=Source(source),
+                stars=stars,
+                download_url=download_url,
+                size=size,
+            )
+            for song_hash, song_name, song_author, mapper, ranked_date, source, stars, download_url, size in (
+                self._db.execute(sql, params)
+            )
+        ]
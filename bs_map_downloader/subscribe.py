@@ -0,0 +1,113 @@
+"""Push-based map updates from BeatSaver's websocket feed (needs the optional websockets package)."""
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+
+from bs_map_downloader import console
+from bs_map_downloader.models import MapInfo
+from bs_map_downloader.sources.beatsaver import map_from_doc
+
+BEATSAVER_WS = "wss://ws.beatsaver.com/maps"
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
+# Events arriving within this many seconds of each other are delivered as one batch
+BATCH_DELAY = 2.0
+
+
+def map_from_event(event: dict, mappers: set[str] | None = None) -> MapInfo | None:
+    """Return the MapInfo for a published-map update event, optionally only for the given mappers."""
+    if event.get("type") != "MAP_UPDATE" or not isinstance(event.get("msg"), dict):
+        return None
+    doc = event["msg"]
+    versions = doc.get("versions", [])
+    if versions and versions[0].get("state", "Published") != "Published":
+        return None
+    if mappers is not None:
+        names = {doc.get("uploader", {}).get("name", ""), doc.get("metadata", {}).get("levelAuthorName", "")}
+        if not {name.lower() for name in names} & mappers:
+            return None
+    return map_from_doc(doc)
+
+
+async def subscribe(
+    deliver: Callable[[list[MapInfo]], Awaitable[list[MapInfo]]],
+    known: set[str],
+    stop: asyncio.Event,
+    url: str = BEATSAVER_WS,
+    mappers: set[str] | None = None,
+    batch_delay: float = BATCH_DELAY,
+) -> None:
+    """Deliver maps pushed by the websocket feed at url until stop is set.
+
+    Maps whose hash is in known, or already queued, are skipped; deliver downloads
+    them and returns the ones that succeeded, which become known, so a failed map
+    is retried if the feed sends it again. A delivery that raises is logged and
+    treated as all maps failing. Lost connections are retried with
+    exponential backoff. mappers (lowercase names) restricts the feed to those
+    mappers' uploads. A stop request lets an in-progress delivery finish.
+    """
+    try:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import WebSocketException
+    except ImportError:
+        raise RuntimeError("The websocket feed needs the websockets package (pip install websockets)") from None
+
+    queue: asyncio.Queue[MapInfo] = asyncio.Queue()
+    queued: set[str] = set()
+
+    async def receive() -> None:
+        backoff = RECONNECT_MIN
+        while True:
+            try:
+                async with connect(url) as ws:
+                    console.print(f"[dim]Subscribed to {url}.[/dim]")
+                    backoff = RECONNECT_MIN
+                    async for message in ws:
+                        try:
+                            map_info = map_from_event(json.loads(message), mappers)
+                        except (ValueError, KeyError, AttributeError):
+                            continue
+                        if map_info and map_info.song_hash not in known and map_info.song_hash not in queued:
+                            queued.add(map_info.song_hash)
+                            queue.put_nowait(map_info)
+                console.print(f"[yellow]Feed closed, reconnecting in {backoff:g}s...[/yellow]")
+            except (OSError, WebSocketException) as e:
+                console.print(f"[yellow]Feed connection failed ({e}), reconnecting in {backoff:g}s...[/yellow]")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+
+    async def deliver_batch(batch: list[MapInfo]) -> None:
+        console.print(f"[bold]{len(batch)} new maps from the feed.[/bold]")
+        try:
+            delivered = await deliver(batch)
+            known.update(m.song_hash for m in delivered)
+        except Exception as e:
+            # Keep draining; the batch's maps are retried if the feed sends them again
+            console.error(f"Delivery failed: {e!r}")
+        finally:
+            queued.difference_update(m.song_hash for m in batch)
+
+    delivering: asyncio.Future | None = None
+
+    async def drain() -> None:
+        nonlocal delivering
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(batch_delay)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            delivering = asyncio.ensure_future(deliver_batch(batch))
+            await asyncio.shield(delivering)
+
+    receiver = asyncio.create_task(receive())
+    drainer = asyncio.create_task(drain())
+    try:
+        await stop.wait()
+    finally:
+        receiver.cancel()
+        drainer.cancel()
+        await asyncio.gather(receiver, drainer, return_exceptions=True)
+        if delivering:
+            await delivering
+    console.print("[dim]Subscription stopped.[/dim]")
@@ -0,0 +1,163 @@
+"""Incremental install-dir sync against a manifest of managed maps."""
+
+import json
+import os
+import shutil
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from bs_map_downloader import console
+from bs_map_downloader.downloader import PARTIAL_SUFFIX, extract_map
+from bs_map_downloader.models import MapInfo
+
+MANIFEST_NAME = ".bs-map-downloader.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class SyncResult:
+    installed: int = 0
+    repaired: int = 0
+    pruned: int = 0
+    unchanged: int = 0
+    missing: int = 0
+
+
+def load_manifest(install_dir: Path) -> dict[str, dict]:
+    """Return the managed maps recorded in install_dir's manifest, keyed by song hash."""
+    path = install_dir / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        console.print(f"[yellow]Ignoring corrupt manifest {path}.[/yellow]")
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("maps", {})
+
+
+def save_manifest(install_dir: Path, entries: dict[str, dict]) -> None:
+    """Atomically write the manifest."""
+    path = install_dir / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "maps": entries}, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def _scan_dir(path: Path) -> dict[str, os.DirEntry]:
+    if not path.exists():
+        return {}
+    with os.scandir(path) as it:
+        return {entry.name: entry for entry in it}
+
+
+def _zip_signature(entry: os.DirEntry) -> dict:
+    st = entry.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _matches_zip(zip_path: Path, map_dir: Path) -> bool:
+    """True if map_dir holds every file of the zip with the same size."""
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            members = [info for info in zf.infolist() if not info.is_dir()]
+        return all(
+            (map_dir / info.filename).is_file() and (map_dir / info.filename).stat().st_size == info.file_size
+            for info in members
+        )
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def sync_install(
+    maps: list[MapInfo],
+    downloads_dir: Path,
+    install_dir: Path,
+    trash_dir: Path | None = None,
+    prune: bool = True,
+) -> SyncResult:
+    """Make install_dir contain exactly the given maps, as far as managed maps go.
+
+    A manifest in install_dir records every map this tool installed together with the
+    size and mtime of the zip it came from. With one scan of each directory, sync:
+
+    - installs maps that are not present,
+    - adopts directories that exist but are not in the manifest if they hold every
+      file of the zip at the same size, and otherwise repairs them (e.g. half-extracted),
+    - re-extracts maps whose zip changed since installation,
+    - unless prune is False (maps is only part of the wanted set), prunes managed maps
+      that are no longer wanted, deleting them or moving them to trash_dir.
+      Directories the manifest doesn't know about are never pruned.
+    """
+    install_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(install_dir)
+    installed_dirs = _scan_dir(install_dir)
+    zips = _scan_dir(downloads_dir)
+    result = SyncResult()
+
+    # Leftovers from extractions interrupted before the final rename
+    for name, entry in installed_dirs.items():
+        if name.startswith(".") and name.endswith(PARTIAL_SUFFIX) and entry.is_dir():
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    desired = {m.song_hash for m in maps}
+
+    try:
+        for song_hash in sorted(set(manifest) - desired) if prune else ():
+            dest = installed_dirs.get(song_hash)
+            if dest is not None:
+                if trash_dir:
+                    trash_dir.mkdir(parents=True, exist_ok=True)
+                    target = trash_dir / song_hash
+                    if target.exists():
+                        shutil.rmtree(target)
+                    shutil.move(dest.path, target)
+                else:
+                    shutil.rmtree(dest.path)
+            del manifest[song_hash]
+            result.pruned += 1
+
+        for song_hash in desired:
+            zip_entry = zips.get(f"{song_hash}.zip")
+            signature = _zip_signature(zip_entry) if zip_entry else None
+            recorded = manifest.get(song_hash)
+            present = song_hash in installed_dirs
+
+            if present and recorded is not None and (signature is None or recorded == signature):
+                result.unchanged += 1
+                continue
+            if signature is None or signature["size"] == 0:
+                result.missing += 1
+                continue
+
+            if present and recorded is None and _matches_zip(Path(zip_entry.path), install_dir / song_hash):
+                # Installed by hand or by an earlier tool: take it over without touching it
+                manifest[song_hash] = signature
+                result.unchanged += 1
+                continue
+
+            try:
+                extract_map(Path(zip_entry.path), install_dir / song_hash)
+            except (zipfile.BadZipFile, OSError) as e:
+                console.error(f"Failed to install {song_hash}: {e}")
+                manifest.pop(song_hash, None)
+                continue
+
+            manifest[song_hash] = signature
+            if present:
+                result.repaired += 1
+            else:
+                result.installed += 1
+    finally:
+        save_manifest(install_dir, manifest)
+
+    console.print(
+        f"[green]Synced {install_dir}: {result.installed} installed, {result.repaired} repaired, "
+        f"{result.pruned} pruned, {result.unchanged} unchanged.[/green]"
+    )
+    if result.missing:
+        console.print(f"[yellow]{result.missing} maps have no downloaded zip and were not installed.[/yellow]")
+    return result
@@ -0,0 +1,77 @@
+"""Long-running watch mode that polls for newly ranked maps."""
+
+import asyncio
+import os
+import signal
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from bs_map_downloader import console
+from bs_map_downloader.models import MapInfo
+
+
+def downloaded_hashes(downloads_dir: Path) -> set[str]:
+    """Return the song hashes of all non-empty zips in downloads_dir, in one scan."""
+    if not downloads_dir.exists():
+        return set()
+    with os.scandir(downloads_dir) as it:
+        return {
+            entry.name[: -len(".zip")]
+            for entry in it
+            if entry.name.endswith(".zip") and entry.stat().st_size > 0
+        }
+
+
+def install_stop_signals(stop: asyncio.Event) -> None:
+    """Set stop on SIGTERM/SIGINT, where the event loop supports signal handlers."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def watch(
+    poll: Callable[[set[str]], Awaitable[list[MapInfo]]],
+    deliver: Callable[[list[MapInfo]], Awaitable[list[MapInfo]]],
+    known: set[str],
+    interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Poll for new maps every interval seconds until stop is set.
+
+    poll receives the in-memory set of known hashes and returns maps not in it;
+    deliver downloads/installs them and returns the ones that succeeded or were
+    deliberately skipped (e.g. by a filter), which become known. Maps that failed
+    are picked up again by the next poll, as are all maps of a delivery that
+    raised. A stop request lets the current cycle finish before returning.
+    """
+    while not stop.is_set():
+        try:
+            new_maps = [m for m in await poll(known) if m.song_hash not in known]
+        except httpx.HTTPError as e:
+            console.error(f"Poll failed: {e}")
+            new_maps = []
+
+        if new_maps:
+            console.print(f"[bold]{len(new_maps)} newly ranked maps.[/bold]")
+            try:
+                delivered = await deliver(new_maps)
+            except Exception as e:
+                # One bad response mustn't end a long-running daemon
+                console.error(f"Delivery failed: {e!r}")
+                delivered = []
+            known.update(m.song_hash for m in delivered)
+        else:
+            console.print(f"[dim]{datetime.now():%H:%M:%S} no new maps.[/dim]")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+    console.print("[dim]Watch stopped.[/dim]")
@@ -166,3 +166,20 @@ async def test_since_and_until():
 
     assert len(maps) == 1
     assert maps[0].song_hash == "in_range"
+
+
+@pytest.mark.asyncio
+async def test_stops_at_first_known_map():
+    """Polling stops paginating at the first already-known map."""
+    pages = {
+        1: [
+            _bl_entry("brand_new", TS_2025_MID),
+            _bl_entry("known", TS_2025),
+            _bl_entry("older", TS_2024),
+        ],
+        2: [_bl_entry("much_older", TS_2023)],
+    }
+    async with _make_client(pages) as client:
+        maps = await fetch_beatleader(client, limit=None, since=CUTOFF_DATE, until=None, known={"known"})
+
+    assert [m.song_hash for m in maps] == ["brand_new"]
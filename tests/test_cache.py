@@ -0,0 +1,129 @@
+"""Tests for the persistent BeatSaver lookup cache."""
+
+import asyncio
+
+import pytest
+import httpx
+
+from bs_map_downloader.cache import LookupCache
+from bs_map_downloader.downloader import download_all, resolve_map
+from bs_map_downloader.models import MapInfo, Source
+
+
+def _map_info(song_hash: str) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.SCORESABER,
+    )
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with LookupCache(path) as cache:
+        assert cache.get("aaa") == (False, None)
+        cache.put_url("aaa", "https://cdn.example/aaa.zip")
+        cache.put_missing("bbb")
+
+    with LookupCache(path) as cache:
+        assert cache.get("aaa") == (True, "https://cdn.example/aaa.zip")
+        assert cache.get("bbb") == (True, None)
+
+
+def test_entries_expire(tmp_path):
+    with LookupCache(tmp_path / "cache.sqlite", hit_ttl=-1, miss_ttl=-1) as cache:
+        cache.put_url("aaa", "https://cdn.example/aaa.zip")
+        cache.put_missing("bbb")
+        assert cache.get("aaa") == (False, None)
+        assert cache.get("bbb") == (False, None)
+        assert cache.prune() == 2
+
+
+@pytest.mark.asyncio
+async def test_resolve_map_records_and_reuses_results(tmp_path):
+    requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path.endswith("/gone"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"versions": [{"downloadURL": "https://cdn.example/found.zip"}]})
+
+    with LookupCache(tmp_path / "cache.sqlite") as cache:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(2):
+                found, gone = _map_info("found"), _map_info("gone")
+                assert await resolve_map(client, found, cache=cache)
+                assert not await resolve_map(client, gone, cache=cache)
+                assert found.download_url == "https://cdn.example/found.zip"
+
+    assert requests == ["/maps/hash/found", "/maps/hash/gone"]
+
+
+@pytest.mark.asyncio
+async def test_download_all_skips_lookups_for_cached_hashes(tmp_path, monkeypatch):
+    import bs_map_downloader.downloader as dl_mod
+    monkeypatch.setattr(dl_mod, "DOWNLOADS_DIR", tmp_path / "downloads")
+    cache_path = tmp_path / "cache.sqlite"
+    with LookupCache(cache_path) as cache:
+        cache.put_url("cached", "https://cdn.example/cached.zip")
+        cache.put_missing("dead")
+
+    requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        return httpx.Response(200, content=b"PK zip")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await download_all(
+            [_map_info("cached"), _map_info("dead")], client=client, lookup_cache=cache_path
+        )
+
+    assert [m.song_hash for m in result] == ["cached"]
+    assert requests == ["https://cdn.example/cached.zip"]
+
+
+@pytest.mark.asyncio
+async def test_prefilter_consults_and_fills_cache(tmp_path):
+    from bs_map_downloader.filters import MapFilter, prefilter
+
+    requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={
+            "found": {"metadata": {"bpm": 150}, "versions": [{"downloadURL": "https://cdn.example/found.zip"}]},
+        })
+
+    with LookupCache(tmp_path / "cache.sqlite") as cache:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            maps = [_map_info("found"), _map_info("gone")]
+            kept = await prefilter(client, maps, MapFilter.parse("bpm>100"), cache=cache)
+            assert [m.song_hash for m in kept] == ["found"]
+            assert cache.get("found") == (True, "https://cdn.example/found.zip")
+            assert cache.get("gone") == (True, None)
+
+            # Known-missing maps are dropped without asking BeatSaver again
+            requests.clear()
+            await prefilter(client, [_map_info("found"), _map_info("gone")], MapFilter.parse("bpm>100"), cache=cache)
+            assert requests == ["/maps/hash/found"]
+
+
+@pytest.mark.asyncio
+async def test_transfer_404_forgets_cached_url(tmp_path):
+    from bs_map_downloader.downloader import transfer_map
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404)
+
+    with LookupCache(tmp_path / "cache.sqlite") as cache:
+        cache.put_url("dead", "https://cdn.example/dead.zip")
+        m = _map_info("dead")
+        m.download_url = "https://cdn.example/dead.zip"
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            assert not await transfer_map(client, m, tmp_path / "dead.zip", cache=cache)
+        assert cache.get("dead") == (False, None)
@@ -0,0 +1,167 @@
+"""Tests for the BeatSaver catalog walker."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import httpx
+
+import bs_map_downloader.sources.catalog as catalog
+from bs_map_downloader.pagination import Checkpoint
+from bs_map_downloader.sources.catalog import CatalogCursor, fetch_catalog, format_time, split_windows
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SINCE = datetime(2022, 1, 1, tzinfo=timezone.utc)
+UNTIL = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(catalog, "PAGE_SIZE", 3)
+    real_sleep = asyncio.sleep
+
+    async def no_sleep(delay, *args):
+        await real_sleep(0)
+
+    monkeypatch.setattr(catalog.asyncio, "sleep", no_sleep)
+
+
+def _doc(i: int, uploaded: datetime) -> dict:
+    return {
+        "versions": [{"hash": f"{i:040x}", "downloadURL": f"https://cdn.example/{i}.zip"}],
+        "metadata": {"songName": f"Song {i}", "songAuthorName": "Author", "levelAuthorName": "Mapper"},
+        "uploaded": format_time(uploaded),
+    }
+
+
+class Feed:
+    """Fake /maps/latest: docs uploaded before the cursor, newest first."""
+
+    def __init__(self, docs: list[dict], fail_before: str | None = None):
+        self.docs = sorted(docs, key=lambda d: d["uploaded"], reverse=True)
+        self.fail_before = fail_before
+        self.requests: list[dict] = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.requests.append(params)
+        if params["before"] == self.fail_before:
+            return httpx.Response(404)
+        before = catalog.parse_time(params["before"])
+        page = [d for d in self.docs if catalog.parse_time(d["uploaded"]) < before][: int(params["pageSize"])]
+        return httpx.Response(200, json={"docs": page})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def _docs(n: int, start: datetime = START, step: timedelta = timedelta(days=7)) -> list[dict]:
+    return [_doc(i, start + step * i) for i in range(n)]
+
+
+def test_split_windows_covers_range_newest_first():
+    windows = split_windows(SINCE, UNTIL, 4)
+    assert len(windows) == 4
+    assert windows[0][1] == format_time(UNTIL)
+    assert windows[-1][0] == format_time(SINCE)
+    assert all(newer[0] == older[1] for newer, older in zip(windows, windows[1:]))
+
+
+@pytest.mark.asyncio
+async def test_walks_every_window_with_before_cursor():
+    feed = Feed(_docs(40))
+    async with feed.client() as client:
+        maps = await fetch_catalog(client, None, SINCE, UNTIL, concurrency=3)
+
+    assert len(maps) == 40
+    assert len({m.song_hash for m in maps}) == 40
+    assert [m.ranked_date for m in maps] == sorted((m.ranked_date for m in maps), reverse=True)
+    assert all("after" not in r and "page" not in r for r in feed.requests)
+
+
+@pytest.mark.asyncio
+async def test_maps_sharing_a_timestamp_across_pages_are_not_skipped():
+    # The first page ends partway through the maps uploaded at `same`
+    same = START + timedelta(days=10)
+    newer = [_doc(10 + i, same + timedelta(days=1)) for i in range(2)]
+    feed = Feed(newer + [_doc(20 + i, same) for i in range(3)] + _docs(2))
+    async with feed.client() as client:
+        maps = await fetch_catalog(client, None, SINCE, UNTIL, concurrency=1)
+
+    assert len(maps) == 7
+
+
+@pytest.mark.asyncio
+async def test_limit_returns_newest_maps():
+    feed = Feed(_docs(20))
+    async with feed.client() as client:
+        maps = await fetch_catalog(client, 4, SINCE, UNTIL)
+
+    assert [m.song_name for m in maps] == ["Song 19", "Song 18", "Song 17", "Song 16"]
+
+
+@pytest.mark.asyncio
+async def test_cursor_limits_later_runs_to_new_uploads(tmp_path, monkeypatch):
+    cursor = CatalogCursor(tmp_path / "cursor.json")
+    docs = _docs(10)
+    feed = Feed(docs)
+    async with feed.client() as client:
+        assert len(await fetch_catalog(client, None, SINCE, cursor=cursor)) == 10
+        # Nothing is saved until the maps are delivered
+        assert cursor.load(SINCE) is None
+        cursor.commit()
+
+        feed.docs = sorted(docs + [_doc(100, START + timedelta(days=400))], key=lambda d: d["uploaded"], reverse=True)
+        maps = await fetch_catalog(client, None, SINCE, cursor=cursor)
+        cursor.commit()
+
+    assert [m.song_name for m in maps] == ["Song 100"]
+    assert cursor.load(SINCE) == START + timedelta(days=400)
+    # A wider date range isn't covered by the cursor
+    assert cursor.load(datetime(2019, 1, 1, tzinfo=timezone.utc)) is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_stops_before_oldest_failed_map(tmp_path):
+    cursor = CatalogCursor(tmp_path / "cursor.json")
+    feed = Feed(_docs(10))
+    async with feed.client() as client:
+        maps = await fetch_catalog(client, None, SINCE, cursor=cursor)
+        failed = [m for m in maps if m.song_name in ("Song 7", "Song 4")]
+        cursor.commit(failed)
+
+        again = await fetch_catalog(client, None, SINCE, cursor=cursor)
+
+    assert [m.song_name for m in again] == ["Song 9", "Song 8", "Song 7", "Song 6", "Song 5", "Song 4"]
+
+
+@pytest.mark.asyncio
+async def test_limited_walk_leaves_cursor_alone(tmp_path):
+    cursor = CatalogCursor(tmp_path / "cursor.json")
+    async with Feed(_docs(10)).client() as client:
+        assert len(await fetch_catalog(client, 3, SINCE, cursor=cursor)) == 3
+    cursor.commit()
+
+    assert cursor.pending is None
+    assert not cursor.path.exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_window_resumes_from_checkpoint(tmp_path):
+    windows = split_windows(SINCE, UNTIL, 4)
+    feed = Feed(_docs(40), fail_before=windows[1][1])
+    path = tmp_path / "catalog.json"
+
+    async with feed.client() as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_catalog(client, None, SINCE, UNTIL, concurrency=1, checkpoint=Checkpoint(path, {}))
+
+        saved_windows, saved_maps = Checkpoint(path, {}).load()
+        assert windows[0] not in saved_windows
+        assert windows[1] in saved_windows
+
+        feed.fail_before = None
+        maps = await fetch_catalog(client, None, SINCE, UNTIL, concurrency=1, checkpoint=Checkpoint(path, {}))
+
+    assert len(maps) == 40
+    assert not path.exists()
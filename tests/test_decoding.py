@@ -0,0 +1,79 @@
+"""Tests for page decoding and projection."""
+
+import json
+
+import pytest
+
+from bs_map_downloader import decoding
+from bs_map_downloader.decoding import LeaderboardRow, loads, project_beatleader, project_scoresaber
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_loads_with_and_without_orjson(monkeypatch, fast):
+    if fast:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(decoding, "orjson", None)
+    assert loads(b'{"a": [1, 2.5, "x", null]}') == {"a": [1, 2.5, "x", None]}
+    assert loads('{"b": true}') == {"b": True}
+
+
+def test_loads_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        loads(b"{not json")
+
+
+def test_project_scoresaber():
+    body = json.dumps(
+        {
+            "leaderboards": [
+                {
+                    "songHash": "ABC123",
+                    "songName": "Song",
+                    "songAuthorName": "Artist",
+                    "levelAuthorName": "Mapper",
+                    "stars": 7.5,
+                    "rankedDate": "2023-05-01T00:00:00.000Z",
+                    "coverImage": "https://example.com/cover.png",
+                    "difficulty": {"difficulty": 9, "gameMode": "SoloStandard"},
+                },
+                {"songHash": "def456", "rankedDate": "2023-04-01T00:00:00.000Z"},
+            ],
+            "metadata": {"total": 2},
+        }
+    ).encode()
+
+    assert project_scoresaber(body) == [
+        LeaderboardRow("abc123", "Song", "Artist", "Mapper", 7.5, "2023-05-01T00:00:00.000Z"),
+        LeaderboardRow("def456", "", "", "", 0, "2023-04-01T00:00:00.000Z"),
+    ]
+
+
+def test_project_beatleader():
+    body = json.dumps(
+        {
+            "data": [
+                {
+                    "song": {
+                        "hash": "ABC123",
+                        "name": "Song",
+                        "author": "Artist",
+                        "mapper": "Mapper",
+                        "difficulties": [{"stars": 4.0, "notes": 500}],
+                    },
+                    "difficulty": {"stars": 8.2, "rankedTime": 1700000000, "modifierValues": {"fs": 0.2}},
+                },
+                {"difficulty": {"rankedTime": 1600000000}},
+            ]
+        }
+    ).encode()
+
+    assert project_beatleader(body) == [
+        LeaderboardRow("abc123", "Song", "Artist", "Mapper", 8.2, 1700000000),
+        LeaderboardRow("", "", "", "", 0, 1600000000),
+    ]
+
+
+def test_project_empty_page():
+    assert project_scoresaber(b'{"leaderboards": []}') == []
+    assert project_beatleader(b"{}") == []
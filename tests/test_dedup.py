@@ -0,0 +1,97 @@
+"""Tests for the compact disk-backed hash set."""
+
+import hashlib
+
+import pytest
+import httpx
+
+from bs_map_downloader.dedup import BloomFilter, HashSet, digest, unique_maps
+from bs_map_downloader.models import CUTOFF_DATE, MapInfo, Source
+from bs_map_downloader.sources.beatleader import fetch_beatleader
+from bs_map_downloader.sources.scoresaber import fetch_scoresaber
+
+
+def _sha1(i: int) -> str:
+    return hashlib.sha1(str(i).encode()).hexdigest()
+
+
+def test_digest_is_binary_sha1_and_case_insensitive():
+    h = _sha1(1)
+    assert digest(h) == bytes.fromhex(h)
+    assert digest(h.upper()) == digest(h)
+    assert len(digest("not-a-sha1")) == 20
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(digest(_sha1(i)))
+
+    assert all(digest(_sha1(i)) in bloom for i in range(1000))
+    false_positives = sum(digest(_sha1(i)) in bloom for i in range(1000, 11000))
+    assert false_positives < 300
+
+
+def test_hash_set_add_and_contains():
+    with HashSet(capacity=100) as seen:
+        assert seen.add("ABC")
+        assert not seen.add("abc")
+        assert "abc" in seen
+        assert "def" not in seen
+        assert len(seen) == 1
+
+
+def test_hash_set_persists_and_temp_sets_spill_then_are_removed(tmp_path):
+    path = tmp_path / "hashes.sqlite"
+    with HashSet(path) as seen:
+        for i in range(50):
+            seen.add(_sha1(i))
+    with HashSet(path) as seen:
+        assert len(seen) == 50
+        assert _sha1(49) in seen
+
+    small = HashSet()
+    small.add(_sha1(1))
+    small.close()
+    assert small.path is None
+
+    temp = HashSet(spill_at=10)
+    for i in range(20):
+        temp.add(_sha1(i))
+    assert temp.path.exists()
+    assert len(temp) == 20
+    assert all(_sha1(i) in temp for i in range(20))
+    assert not temp.add(_sha1(3))
+    temp.close()
+    assert not temp.path.exists()
+
+
+def test_unique_maps_keeps_first_occurrence():
+    maps = [
+        MapInfo("aaa", "First", "", "", "", Source.SCORESABER),
+        MapInfo("aaa", "Second", "", "", "", Source.BEATLEADER),
+        MapInfo("bbb", "", "", "", "", Source.BEATLEADER),
+    ]
+    with HashSet() as seen:
+        assert [m.song_name for m in unique_maps(maps, seen)] == ["First", ""]
+
+
+@pytest.mark.asyncio
+async def test_shared_set_deduplicates_across_sources():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        if page > 1:
+            return httpx.Response(200, json={})
+        if "scoresaber" in request.url.host:
+            entries = [{"songHash": h, "rankedDate": "2023-01-01T00:00:00Z"} for h in ("AAA", "BBB")]
+            return httpx.Response(200, json={"leaderboards": entries})
+        entries = [{"song": {"hash": h}, "difficulty": {"rankedTime": 1672531200}} for h in ("bbb", "ccc")]
+        return httpx.Response(200, json={"data": entries})
+
+    with HashSet() as seen:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            ss = await fetch_scoresaber(client, None, since=CUTOFF_DATE, until=None, seen=seen)
+            bl = await fetch_beatleader(client, None, since=CUTOFF_DATE, until=None, seen=seen)
+
+    assert [m.song_hash for m in ss] == ["aaa", "bbb"]
+    assert [m.song_hash for m in bl] == ["ccc"]
@@ -1,12 +1,13 @@
 """Tests for download logic."""
 
-import asyncio
+import json
 import zipfile
 
 import pytest
 import httpx
 
-from bs_map_downloader.downloader import download_all, download_map, install_maps
+from bs_map_downloader.cache import LookupCache
+from bs_map_downloader.downloader import download_all, install_maps, resolve_map, transfer_map
 from bs_map_downloader.models import MapInfo, Source
 
 
@@ -23,7 +24,7 @@ def _map_info(song_hash: str = "abc123", download_url: str | None = None) -> Map
 
 
 @pytest.mark.asyncio
-async def test_download_map_with_known_url(tmp_path):
+async def test_transfer_map_with_known_url(tmp_path):
     zip_content = b"PK fake zip"
 
     async def handler(request: httpx.Request) -> httpx.Response:
@@ -31,15 +32,15 @@ async def test_download_map_with_known_url(tmp_path):
 
     async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
         dest = tmp_path / "test.zip"
-        sem = asyncio.Semaphore(5)
-        result = await download_map(client, _map_info(download_url="https://cdn.beatsaver.com/abc.zip"), dest, sem)
+        map_info = _map_info(download_url="https://cdn.beatsaver.com/abc.zip")
+        result = await resolve_map(client, map_info) and await transfer_map(client, map_info, dest)
 
     assert result is True
     assert dest.read_bytes() == zip_content
 
 
 @pytest.mark.asyncio
-async def test_download_map_resolves_url(tmp_path):
+async def test_resolve_map_fills_download_url(tmp_path):
     zip_content = b"PK fake zip"
 
     async def handler(request: httpx.Request) -> httpx.Response:
@@ -51,29 +52,29 @@ async def test_download_map_resolves_url(tmp_path):
 
     async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
         dest = tmp_path / "test.zip"
-        sem = asyncio.Semaphore(5)
-        result = await download_map(client, _map_info(), dest, sem)
+        map_info = _map_info()
+        result = await resolve_map(client, map_info) and await transfer_map(client, map_info, dest)
 
     assert result is True
+    assert map_info.download_url == "https://cdn.beatsaver.com/resolved.zip"
     assert dest.read_bytes() == zip_content
 
 
 @pytest.mark.asyncio
-async def test_download_map_not_found(tmp_path):
+async def test_resolve_map_not_found(tmp_path):
     async def handler(request: httpx.Request) -> httpx.Response:
         return httpx.Response(404)
 
     async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
-        dest = tmp_path / "test.zip"
-        sem = asyncio.Semaphore(5)
-        result = await download_map(client, _map_info(), dest, sem)
+        map_info = _map_info()
+        result = await resolve_map(client, map_info)
 
     assert result is False
-    assert not dest.exists()
+    assert map_info.download_url is None
 
 
 @pytest.mark.asyncio
-async def test_download_map_http_error(tmp_path):
+async def test_transfer_map_http_error(tmp_path):
     async def handler(request: httpx.Request) -> httpx.Response:
         if "/maps/hash/" in str(request.url):
             return httpx.Response(200, json={
@@ -83,10 +84,12 @@ async def test_download_map_http_error(tmp_path):
 
     async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
         dest = tmp_path / "test.zip"
-        sem = asyncio.Semaphore(5)
-        result = await download_map(client, _map_info(), dest, sem)
+        map_info = _map_info()
+        assert await resolve_map(client, map_info)
+        result = await transfer_map(client, map_info, dest)
 
     assert result is False
+    assert not dest.exists()
 
 
 @pytest.mark.asyncio
@@ -182,3 +185,132 @@ def test_install_maps_skips_missing_zip(tmp_path):
     install_maps([m], downloads, install)
 
     assert not (install / "missing").exists()
+
+
+@pytest.mark.asyncio
+async def test_download_all_installs_during_download(tmp_path, monkeypatch):
+    import io
+    import bs_map_downloader.downloader as dl_mod
+    downloads = tmp_path / "downloads"
+    install = tmp_path / "CustomLevels"
+    monkeypatch.setattr(dl_mod, "DOWNLOADS_DIR", downloads)
+
+    downloads.mkdir()
+    _make_zip(downloads / "existing.zip", {"info.dat": b"old"})
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("info.dat", b"new")
+    zip_bytes = buf.getvalue()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=zip_bytes)
+
+    _OrigClient = httpx.AsyncClient
+
+    def _mock_client(**kw):
+        kw.pop("transport", None)
+        return _OrigClient(transport=httpx.MockTransport(handler), **kw)
+
+    monkeypatch.setattr(httpx, "AsyncClient", _mock_client)
+
+    maps = [
+        _map_info(song_hash="existing"),
+        _map_info(song_hash="new_one", download_url="https://cdn.beatsaver.com/new.zip"),
+    ]
+    result = await download_all(maps, install_dir=install)
+
+    assert len(result) == 2
+    assert (install / "existing" / "info.dat").read_bytes() == b"old"
+    assert (install / "new_one" / "info.dat").read_bytes() == b"new"
+
+
+@pytest.mark.asyncio
+async def test_download_all_install_survives_bad_zip(tmp_path, monkeypatch):
+    import bs_map_downloader.downloader as dl_mod
+    downloads = tmp_path / "downloads"
+    install = tmp_path / "CustomLevels"
+    monkeypatch.setattr(dl_mod, "DOWNLOADS_DIR", downloads)
+
+    downloads.mkdir()
+    (downloads / "corrupt.zip").write_bytes(b"not a zip")
+    _make_zip(downloads / "good.zip", {"info.dat": b"ok"})
+
+    result = await download_all([_map_info(song_hash="corrupt"), _map_info(song_hash="good")], install_dir=install)
+
+    assert len(result) == 2
+    assert (install / "good" / "info.dat").read_bytes() == b"ok"
+    assert not (install / "corrupt").exists()
+
+
+@pytest.mark.asyncio
+async def test_download_all_in_processes(tmp_path, monkeypatch):
+    import http.server
+    import threading
+    import bs_map_downloader.downloader as dl_mod
+    downloads = tmp_path / "downloads"
+    monkeypatch.setattr(dl_mod, "DOWNLOADS_DIR", downloads)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/missing") or self.path == f"/maps/hash/{'e' * 40}":
+                self.send_error(404)
+                return
+            if self.path.startswith("/maps/hash/"):
+                # Lookups resolve hash N to /N.zip
+                index = int(self.path.rsplit("/", 1)[1], 16)
+                body = json.dumps({"versions": [{"downloadURL": f"{base}/{index}.zip"}]}).encode()
+            else:
+                body = self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    monkeypatch.setattr(dl_mod, "BEATSAVER_MAP_API", f"{base}/maps/hash")
+
+    # Half the maps need a BeatSaver lookup, which every worker records in the shared cache
+    maps = [_map_info(song_hash=f"{i:040x}", download_url=f"{base}/{i}.zip" if i % 2 else None) for i in range(8)]
+    maps.append(_map_info(song_hash="f" * 40, download_url=f"{base}/missing.zip"))
+    maps.append(_map_info(song_hash="e" * 40))
+    cache_path = tmp_path / "cache.sqlite"
+    reported = []
+    try:
+        result = await download_all(
+            maps,
+            processes=2,
+            mirrors=[],
+            lookup_cache=cache_path,
+            lookup_interval=0.01,
+            on_result=lambda m, ok: reported.append((m.song_hash, ok)),
+        )
+    finally:
+        server.shutdown()
+
+    assert sorted(m.song_hash for m in result) == sorted(m.song_hash for m in maps[:8])
+    failed = [("f" * 40, False), ("e" * 40, False)]
+    assert sorted(reported) == sorted([(m.song_hash, True) for m in maps[:8]] + failed)
+    for i in range(8):
+        assert (downloads / f"{i:040x}.zip").read_bytes() == f"/{i}.zip".encode()
+    with LookupCache(cache_path) as cache:
+        for i in range(0, 8, 2):
+            assert cache.get(f"{i:040x}") == (True, f"{base}/{i}.zip")
+        assert cache.get("e" * 40) == (True, None)
+
+
+@pytest.mark.asyncio
+async def test_resolve_map_rejects_non_json_body():
+    from bs_map_downloader.downloader import resolve_map
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"<html>maintenance</html>")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await resolve_map(client, _map_info()) is False
@@ -0,0 +1,91 @@
+"""Tests for tar shard export."""
+
+import json
+import os
+import tarfile
+import zipfile
+
+from bs_map_downloader.export import export_shards, load_index, read_exported
+from bs_map_downloader.filters import MapFilter
+from bs_map_downloader.models import MapInfo, Source
+
+
+def _make_zip(downloads, i: int, bpm: float = 120) -> str:
+    song_hash = f"{i:040x}"
+    downloads.mkdir(exist_ok=True)
+    with zipfile.ZipFile(downloads / f"{song_hash}.zip", "w") as zf:
+        zf.writestr("Info.dat", json.dumps({"_beatsPerMinute": bpm, "_difficultyBeatmapSets": []}))
+        zf.writestr("song.egg", os.urandom(3000))
+    return song_hash
+
+
+def _map_info(song_hash: str, stars: float, ranked_date: str = "2024-01-01") -> MapInfo:
+    return MapInfo(song_hash, "Song", "Author", "Mapper", ranked_date, Source.SCORESABER, stars=stars)
+
+
+def test_export_packs_zips_into_indexed_shards(tmp_path):
+    downloads, out = tmp_path / "downloads", tmp_path / "out"
+    hashes = [_make_zip(downloads, i) for i in range(6)]
+
+    added = export_shards(downloads, out, shard_size=8 * 1024, workers=3)
+
+    index = load_index(out)
+    assert sorted(index) == hashes == sorted(e.song_hash for e in added)
+    shards = sorted(out.glob("*.tar"))
+    assert len(shards) == 3
+    for shard in shards:
+        assert sum(e.size for e in index.values() if e.shard == shard.name) <= 8 * 1024
+    for song_hash, entry in index.items():
+        assert read_exported(out, entry) == (downloads / f"{song_hash}.zip").read_bytes()
+    with tarfile.open(shards[0]) as tar:
+        assert tar.getnames() == [f"{hashes[0]}.zip", f"{hashes[1]}.zip"]
+
+
+def test_rerun_only_adds_new_maps_in_new_shards(tmp_path):
+    downloads, out = tmp_path / "downloads", tmp_path / "out"
+    for i in range(2):
+        _make_zip(downloads, i)
+    export_shards(downloads, out)
+    first_shard = (out / "maps-00000.tar").read_bytes()
+
+    assert export_shards(downloads, out) == []
+    new_hash = _make_zip(downloads, 2)
+    added = export_shards(downloads, out)
+
+    assert [e.song_hash for e in added] == [new_hash]
+    assert added[0].shard == "maps-00001.tar"
+    assert (out / "maps-00000.tar").read_bytes() == first_shard
+    assert len(load_index(out)) == 3
+
+
+def test_metadata_and_filters(tmp_path):
+    downloads, out = tmp_path / "downloads", tmp_path / "out"
+    maps = [
+        _map_info(_make_zip(downloads, 0, bpm=100), stars=9.0),
+        _map_info(_make_zip(downloads, 1, bpm=200), stars=9.0),
+        _map_info(_make_zip(downloads, 2, bpm=200), stars=2.0),
+    ]
+
+    added = export_shards(downloads, out, maps, MapFilter.parse("stars>=5, bpm>=150"))
+
+    assert [e.song_hash for e in added] == [maps[1].song_hash]
+    assert load_index(out)[maps[1].song_hash].metadata == maps[1].to_metadata()
+    with tarfile.open(out / "maps-00000.tar") as tar:
+        member = tar.extractfile(f"{maps[1].song_hash}.json")
+        assert json.loads(member.read())["stars"] == 9.0
+
+
+def test_bare_date_filter_covers_the_whole_day(tmp_path):
+    downloads = tmp_path / "downloads"
+    maps = [
+        _map_info(_make_zip(downloads, 0), stars=9.0, ranked_date="2024-06-30T23:00:00Z"),
+        _map_info(_make_zip(downloads, 1), stars=9.0, ranked_date="2024-07-01T10:00:00Z"),
+        _map_info(_make_zip(downloads, 2), stars=9.0, ranked_date="2024-07-02T00:00:00Z"),
+    ]
+
+    def exported(expr: str, out: str) -> list[str]:
+        return [e.song_hash for e in export_shards(downloads, tmp_path / out, maps, MapFilter.parse(expr))]
+
+    assert exported("ranked_date=2024-07-01", "eq") == [maps[1].song_hash]
+    assert exported("ranked_date<=2024-07-01", "le") == [maps[0].song_hash, maps[1].song_hash]
+    assert exported("ranked_date>2024-07-01", "gt") == [maps[2].song_hash]
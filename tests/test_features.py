@@ -0,0 +1,77 @@
+"""Tests for beat-aligned audio features."""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+soundfile = pytest.importorskip("soundfile")
+
+from bs_map_downloader.features import (  # noqa: E402
+    N_MELS,
+    STEPS_PER_BEAT,
+    compute_features,
+    load_features,
+    mel_filterbank,
+    preprocess,
+)
+
+SAMPLE_RATE = 22050
+
+
+def _clicks(bpm: float, seconds: float) -> bytes:
+    """Ogg audio with a short noise burst on every beat."""
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    beat = 60.0 / bpm
+    for t in np.arange(0, seconds, beat):
+        start = int(t * SAMPLE_RATE)
+        samples[start : start + 200] = rng.uniform(-0.8, 0.8, 200)[: len(samples) - start]
+    buf = io.BytesIO()
+    soundfile.write(buf, samples, SAMPLE_RATE, format="OGG", subtype="VORBIS")
+    return buf.getvalue()
+
+
+def _make_map(downloads, song_hash: str, bpm: float = 120) -> None:
+    downloads.mkdir(exist_ok=True)
+    with zipfile.ZipFile(downloads / f"{song_hash}.zip", "w") as zf:
+        zf.writestr("Info.dat", json.dumps({"_beatsPerMinute": bpm, "_songFilename": "song.egg"}))
+        zf.writestr("song.egg", _clicks(bpm, 4.0))
+
+
+def test_mel_filterbank_shape():
+    filters = mel_filterbank(SAMPLE_RATE, 1024)
+    assert filters.shape == (N_MELS, 513)
+    assert (filters.sum(axis=1) > 0).all()
+
+
+def test_features_are_on_the_beat_grid():
+    mel, onset = compute_features(_clicks(120, 4.0), bpm=120)
+
+    # 4s at 120 BPM is 8 beats
+    assert len(mel) == len(onset) == pytest.approx(8 * STEPS_PER_BEAT, abs=2)
+    assert mel.shape[1] == N_MELS
+    assert mel.dtype == np.float16
+    # Onsets peak on beat steps
+    on_beat = onset[::STEPS_PER_BEAT][:8]
+    off_beat = np.delete(onset, np.arange(0, len(onset), STEPS_PER_BEAT))
+    assert on_beat.min() > np.median(off_beat) * 5
+
+
+def test_preprocess_stores_memory_mapped_features_once(tmp_path):
+    downloads, out = tmp_path / "downloads", tmp_path / "features"
+    _make_map(downloads, "aaa")
+    _make_map(downloads, "bbb", bpm=60)
+    (downloads / "broken.zip").write_bytes(b"not a zip")
+
+    assert preprocess(downloads, out, workers=2) == (2, 1)
+
+    mel, onset = load_features(out, "aaa")
+    assert isinstance(mel, np.memmap)
+    assert mel.shape[1] == N_MELS
+    assert len(load_features(out, "bbb")[1]) == pytest.approx(len(onset) / 2, abs=2)
+
+    # Existing features are skipped; only the broken map is retried
+    assert preprocess(downloads, out, workers=1) == (0, 1)
@@ -0,0 +1,215 @@
+"""Tests for pre-download map filters."""
+
+import io
+import json
+import zipfile
+
+import pytest
+import httpx
+
+from bs_map_downloader.filters import MapFilter, features_from_beatsaver, features_from_info_dat, prefilter
+from bs_map_downloader.models import MapInfo, Source
+
+
+def _map_info(song_hash: str, download_url: str | None = None) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.SCORESABER,
+        download_url=download_url,
+    )
+
+
+def _bs_doc(song_hash: str, bpm: float, diffs: list[str]) -> dict:
+    return {
+        "metadata": {"bpm": bpm, "duration": 180},
+        "versions": [
+            {
+                "hash": song_hash,
+                "downloadURL": f"https://cdn.beatsaver.com/{song_hash}.zip",
+                "diffs": [{"characteristic": c} for c in diffs],
+            }
+        ],
+    }
+
+
+def _info_zip(bpm: float, environment: str) -> bytes:
+    info = {
+        "_beatsPerMinute": bpm,
+        "_environmentName": environment,
+        "_difficultyBeatmapSets": [
+            {"_beatmapCharacteristicName": "Standard", "_difficultyBeatmaps": [{}, {}]},
+        ],
+    }
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("song.egg", b"\0" * 50000)
+        zf.writestr("Info.dat", json.dumps(info))
+    return buf.getvalue()
+
+
+def test_parse_and_match():
+    f = MapFilter.parse("bpm>=120, difficulties>=3 and characteristic=Standard")
+    assert f.fields == {"bpm", "difficulties", "characteristic"}
+    assert f.matches({"bpm": 150, "difficulties": 4, "characteristic": {"Standard", "Lawless"}})
+    assert not f.matches({"bpm": 100, "difficulties": 4, "characteristic": {"Standard"}})
+    assert not f.matches({"bpm": 150, "difficulties": 4, "characteristic": {"OneSaber"}})
+
+
+def test_unknown_feature_does_not_match():
+    assert not MapFilter.parse("duration<120").matches({"bpm": 120})
+
+
+def test_not_contains_and_string_compare():
+    f = MapFilter.parse("characteristic!=Lightshow, environment='BigMirrorEnvironment'")
+    assert f.matches({"characteristic": {"Standard"}, "environment": "bigmirrorenvironment"})
+    assert not f.matches({"characteristic": {"Lightshow"}, "environment": "BigMirrorEnvironment"})
+
+
+def test_parse_rejects_garbage():
+    with pytest.raises(ValueError):
+        MapFilter.parse("bpm ~ 3")
+    with pytest.raises(ValueError):
+        MapFilter.parse(" , ")
+
+
+@pytest.mark.parametrize(
+    "expr, matches",
+    [
+        ("ranked_date=2024-07-01", True),
+        ("ranked_date!=2024-07-01", False),
+        ("ranked_date<=2024-07-01", True),
+        ("ranked_date>2024-07-01", False),
+        ("ranked_date>=2024-07-01", True),
+        ("ranked_date<2024-07-01", False),
+        ("ranked_date=2024-07-01T10:00:00Z", True),
+        ("ranked_date>2024-07-01T09:00:00+00:00", True),
+    ],
+)
+def test_dates_compare_as_times_with_bare_dates_covering_the_day(expr, matches):
+    assert MapFilter.parse(expr).matches({"ranked_date": "2024-07-01T10:00:00.000Z"}) is matches
+
+
+def test_parse_rejects_non_dates_for_date_fields():
+    with pytest.raises(ValueError, match="ranked_date"):
+        MapFilter.parse("ranked_date>=june")
+
+
+def test_features_from_beatsaver_and_info_dat():
+    assert features_from_beatsaver(_bs_doc("a", 120, ["Standard", "Standard", "Lawless"])) == {
+        "bpm": 120,
+        "duration": 180,
+        "difficulties": 3,
+        "characteristic": {"Standard", "Lawless"},
+    }
+    v4 = {
+        "audio": {"bpm": 90, "songDuration": 200},
+        "difficultyBeatmaps": [{"characteristic": "Standard"}],
+        "environmentNames": ["WeaveEnvironment"],
+    }
+    assert features_from_info_dat(v4) == {
+        "bpm": 90,
+        "duration": 200,
+        "difficulties": 1,
+        "characteristic": {"Standard"},
+        "environment": "WeaveEnvironment",
+    }
+
+
+@pytest.mark.asyncio
+async def test_prefilter_uses_bulk_metadata():
+    requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={
+            "fast": _bs_doc("fast", 180, ["Standard"]),
+            "slow": _bs_doc("slow", 80, ["Standard"]),
+        })
+
+    maps = [_map_info("fast"), _map_info("slow"), _map_info("gone")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        kept = await prefilter(client, maps, MapFilter.parse("bpm>=100"))
+
+    assert [m.song_hash for m in kept] == ["fast"]
+    assert kept[0].download_url == "https://cdn.beatsaver.com/fast.zip"
+    assert requests == ["/maps/hash/fast,slow,gone"]
+
+
+@pytest.mark.asyncio
+async def test_prefilter_reads_info_dat_via_range():
+    zips = {"a": _info_zip(130, "WeaveEnvironment"), "b": _info_zip(130, "BigMirrorEnvironment")}
+    served = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal served
+        data = zips[request.url.path.strip("/").removesuffix(".zip")]
+        spec = request.headers["range"].removeprefix("bytes=")
+        start, _, end = spec.partition("-")
+        if not start:
+            start_i, end_i = len(data) - int(end), len(data) - 1
+        else:
+            start_i, end_i = int(start), min(int(end), len(data) - 1)
+        served += end_i + 1 - start_i
+        return httpx.Response(
+            206,
+            content=data[start_i : end_i + 1],
+            headers={"Content-Range": f"bytes {start_i}-{end_i}/{len(data)}"},
+        )
+
+    maps = [_map_info(h, download_url=f"https://cdn.example/{h}.zip") for h in zips]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        kept = await prefilter(client, maps, MapFilter.parse("environment=WeaveEnvironment, bpm>120"))
+
+    assert [m.song_hash for m in kept] == ["a"]
+    assert served < sum(len(z) for z in zips.values()) // 4
+
+
+def test_keep_unknown():
+    f = MapFilter.parse("duration>=120, bpm>100")
+    assert not f.matches({"bpm": 130})
+    assert f.matches({"bpm": 130}, keep_unknown=True)
+    assert not f.matches({"bpm": 90}, keep_unknown=True)
+
+
+@pytest.mark.asyncio
+async def test_prefilter_survives_failed_bulk_lookup():
+    zip_bytes = _info_zip(150, "WeaveEnvironment")
+    requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        requests.append(path)
+        if path == "/maps/hash/a,b":
+            return httpx.Response(503)
+        if path.startswith("/maps/hash/"):
+            h = path.rsplit("/", 1)[1]
+            return httpx.Response(200, json={"versions": [{"downloadURL": f"https://cdn.example/{h}.zip"}]})
+        return httpx.Response(200, content=zip_bytes)
+
+    maps = [_map_info("a"), _map_info("b")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        # v2 Info.dat has no duration: that clause is unknown and doesn't drop the maps
+        kept = await prefilter(client, maps, MapFilter.parse("bpm>=120, duration>=60"))
+
+    assert sorted(m.song_hash for m in kept) == ["a", "b"]
+    assert {"/maps/hash/a", "/maps/hash/b"} <= set(requests)
+
+
+@pytest.mark.asyncio
+async def test_prefilter_reports_rejected_but_not_uninspectable_maps():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "fast": _bs_doc("fast", 180, ["Standard"]),
+            "slow": _bs_doc("slow", 80, ["Standard"]),
+        })
+
+    rejected: list[MapInfo] = []
+    maps = [_map_info("fast"), _map_info("slow"), _map_info("gone")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await prefilter(client, maps, MapFilter.parse("bpm>=100"), rejected=rejected)
+
+    assert [m.song_hash for m in rejected] == ["slow"]
@@ -0,0 +1,121 @@
+"""Tests for hedged requests."""
+
+import asyncio
+
+import pytest
+import httpx
+
+from bs_map_downloader.downloader import transfer_map
+from bs_map_downloader.hedging import HedgeBudget, Hedger, LatencyTracker
+from bs_map_downloader.mirrors import MirrorPool
+from bs_map_downloader.models import MapInfo, Source
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(percentile=0.9, min_samples=5)
+    for i in range(4):
+        tracker.observe(i)
+    assert tracker.threshold() is None
+
+    for i in range(4, 11):
+        tracker.observe(i)
+    assert tracker.threshold() == 9
+
+
+def test_budget_limits_hedges_to_ratio():
+    budget = HedgeBudget(ratio=0.1, burst=2)
+    granted = 0
+    for _ in range(100):
+        budget.earn()
+        granted += budget.try_spend()
+    assert 9 <= granted <= 10
+
+
+async def _warm(hedger: Hedger, kind: str, seconds: float = 0.01, n: int = 5) -> None:
+    async def quick():
+        await asyncio.sleep(seconds)
+
+    for _ in range(n):
+        await hedger.run(kind, quick)
+
+
+@pytest.mark.asyncio
+async def test_backup_wins_and_primary_is_cancelled():
+    hedger = Hedger(budget=1.0, min_samples=5)
+    await _warm(hedger, "lookup")
+    cancelled = asyncio.Event()
+
+    async def stuck():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def backup():
+        return "backup"
+
+    assert await asyncio.wait_for(hedger.run("lookup", stuck, backup), 1) == "backup"
+    assert cancelled.is_set()
+    assert hedger.wins == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_budget():
+    hedger = Hedger(budget=0.0, min_samples=5)
+    await _warm(hedger, "lookup")
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert await hedger.run("lookup", slow) == "primary"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_falls_back_to_backup():
+    hedger = Hedger(budget=1.0, min_samples=5)
+    await _warm(hedger, "transfer")
+
+    async def slow_then_fail():
+        await asyncio.sleep(0.05)
+        raise httpx.ConnectError("boom")
+
+    async def backup():
+        await asyncio.sleep(0.1)
+        return "backup"
+
+    assert await hedger.run("transfer", slow_then_fail, backup) == "backup"
+
+
+@pytest.mark.asyncio
+async def test_hedged_transfer_goes_to_alternate_mirror(tmp_path):
+    hedger = Hedger(budget=1.0, min_samples=5)
+    await _warm(hedger, "transfer", seconds=0.001)
+    pool = MirrorPool(["https://stuck.mirror", "https://ok.mirror"])
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "stuck.mirror":
+            await asyncio.sleep(10)
+        return httpx.Response(200, content=b"PK from " + request.url.host.encode())
+
+    m = MapInfo(
+        song_hash="abc",
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.BEATSAVER,
+        download_url="https://stuck.mirror/abc.zip",
+    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        ok = await asyncio.wait_for(
+            transfer_map(client, m, tmp_path / "abc.zip", pool, hedger), 2
+        )
+
+    assert ok
+    assert (tmp_path / "abc.zip").read_bytes() == b"PK from ok.mirror"
+    assert not list(tmp_path.glob("*.part"))
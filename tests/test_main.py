@@ -0,0 +1,48 @@
+"""Tests for CLI argument validation."""
+
+import pytest
+
+from bs_map_downloader.main import export_main, parse_args, partial_selection
+
+
+@pytest.mark.parametrize(
+    "argv, partial",
+    [
+        ([], None),
+        (["--limit", "10"], "--limit"),
+        (["--mapper", "someone"], "--mapper"),
+        (["--filter", "bpm>100"], "--filter"),
+        (["--shard", "0/2"], "--shard"),
+        (["--source", "catalog"], "an incremental --source catalog run"),
+        (["--source", "catalog", "--fresh"], None),
+    ],
+)
+def test_partial_selection_disables_sync_pruning(argv, partial):
+    args = parse_args(["--install-dir", "levels", "--sync", *argv])
+    assert partial_selection(args) == partial
+
+
+@pytest.mark.parametrize("option", ["--concurrency", "--resolvers", "--processes"])
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_worker_counts_must_be_positive(option, value):
+    with pytest.raises(SystemExit):
+        parse_args([option, value])
+
+
+def test_lookup_interval_must_not_be_negative():
+    assert parse_args(["--lookup-interval", "0.05"]).lookup_interval == 0.05
+    with pytest.raises(SystemExit):
+        parse_args(["--lookup-interval", "-1"])
+
+
+@pytest.mark.parametrize("mode", ["--watch", "--subscribe"])
+def test_shard_rejected_in_daemon_modes(mode):
+    with pytest.raises(SystemExit):
+        parse_args([mode, "--shard", "0/2"])
+
+
+def test_export_filter_on_manifest_fields_needs_metadata(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        export_main([str(tmp_path / "out"), "--filter", "stars>=10"])
+    assert "--filter on stars needs --metadata" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,113 @@
+"""Tests for CDN mirror selection and failover."""
+
+import asyncio
+
+import pytest
+import httpx
+
+from bs_map_downloader.downloader import fetch_zip
+from bs_map_downloader.mirrors import DEFAULT_MIRRORS, MirrorPool
+
+FAST = "https://fast.mirror"
+SLOW = "https://slow.mirror"
+
+
+def _mirror_client(delays: dict[str, float], failing: set[str] = frozenset(), hits: list[str] | None = None):
+    """Mock client standing in for mirrors with different simulated speeds."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = f"{request.url.scheme}://{request.url.host}"
+        if hits is not None:
+            hits.append(host)
+        await asyncio.sleep(delays.get(host, 0))
+        if host in failing:
+            return httpx.Response(503)
+        return httpx.Response(200, content=b"PK" + request.url.path.encode())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_candidates_rewrites_onto_mirrors():
+    pool = MirrorPool([FAST, SLOW])
+
+    assert pool.candidates(f"{SLOW}/abc.zip") == [f"{SLOW}/abc.zip", f"{FAST}/abc.zip"]
+    assert pool.candidates("https://elsewhere/abc.zip") == ["https://elsewhere/abc.zip"]
+
+
+def test_custom_mirrors_take_over_beatsaver_cdn_urls():
+    pool = MirrorPool([FAST, SLOW])
+    cdn_url = f"{DEFAULT_MIRRORS[0]}/abc.zip"
+
+    # Configured mirrors first, the original CDN URL as the last resort
+    assert pool.candidates(cdn_url) == [f"{FAST}/abc.zip", f"{SLOW}/abc.zip", cdn_url]
+
+
+@pytest.mark.asyncio
+async def test_custom_mirrors_serve_and_fail_over_for_cdn_urls(tmp_path):
+    hits: list[str] = []
+    pool = MirrorPool([FAST, SLOW])
+    async with _mirror_client({}, failing={FAST, SLOW}, hits=hits) as client:
+        await fetch_zip(client, f"{DEFAULT_MIRRORS[0]}/abc.zip", tmp_path / "abc.zip", mirrors=pool)
+
+    assert hits == [FAST, SLOW, DEFAULT_MIRRORS[0]]
+    assert (tmp_path / "abc.zip").read_bytes() == b"PK/abc.zip"
+
+
+def test_candidates_prefer_measured_fastest_and_skip_down_hosts():
+    pool = MirrorPool([FAST, SLOW], max_failures=1)
+    pool.record_success(f"{FAST}/a.zip", latency=0.01, nbytes=1_000_000, transfer_time=0.1)
+    pool.record_success(f"{SLOW}/a.zip", latency=0.5, nbytes=1_000_000, transfer_time=2.0)
+
+    assert pool.candidates(f"{SLOW}/b.zip")[0] == f"{FAST}/b.zip"
+
+    pool.record_failure(f"{FAST}/b.zip")
+    assert pool.candidates(f"{SLOW}/c.zip") == [f"{SLOW}/c.zip", f"{FAST}/c.zip"]
+
+
+def test_small_transfers_dont_outrank_measured_throughput():
+    pool = MirrorPool([FAST, SLOW])
+    # SLOW has only served tiny bodies: low-ish latency, no throughput sample
+    pool.record_success(f"{SLOW}/a.zip", latency=0.2, nbytes=1_000, transfer_time=0.001)
+    pool.record_success(f"{FAST}/a.zip", latency=0.1, nbytes=4 * 1024 * 1024, transfer_time=2.0)
+
+    # Both are scored at 2 MiB/s, so the lower latency wins
+    assert pool.stats[SLOW].throughput is None
+    assert pool.candidates(f"{SLOW}/b.zip")[0] == f"{FAST}/b.zip"
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_mirror(tmp_path):
+    pool = MirrorPool([SLOW, FAST])
+    hits: list[str] = []
+
+    async with _mirror_client({FAST: 0.0, SLOW: 0.05}, hits=hits) as client:
+        for i in range(6):
+            await fetch_zip(client, f"{SLOW}/{i}.zip", tmp_path / f"{i}.zip", pool)
+
+    # Each mirror is probed once, then every transfer goes to the fast one
+    assert sorted(hits[:2]) == [FAST, SLOW]
+    assert hits[2:] == [FAST] * 4
+    assert (tmp_path / "5.zip").read_bytes() == b"PK/5.zip"
+
+
+@pytest.mark.asyncio
+async def test_fails_over_on_server_error(tmp_path):
+    pool = MirrorPool([FAST, SLOW], max_failures=1)
+
+    async with _mirror_client({}, failing={FAST}) as client:
+        await fetch_zip(client, f"{FAST}/abc.zip", tmp_path / "abc.zip", pool)
+
+    assert (tmp_path / "abc.zip").read_bytes() == b"PK/abc.zip"
+    assert pool.stats[FAST].down_until > 0
+    assert not (tmp_path / "abc.zip.part").exists()
+
+
+@pytest.mark.asyncio
+async def test_raises_when_all_mirrors_fail(tmp_path):
+    pool = MirrorPool([FAST, SLOW])
+
+    async with _mirror_client({}, failing={FAST, SLOW}) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_zip(client, f"{FAST}/abc.zip", tmp_path / "abc.zip", pool)
+
+    assert not (tmp_path / "abc.zip").exists()
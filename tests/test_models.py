@@ -42,3 +42,16 @@ def test_to_metadata_defaults():
 def test_cutoff_constants():
     assert CUTOFF_DATE.year == 2022
     assert CUTOFF_TIMESTAMP == int(CUTOFF_DATE.timestamp())
+
+
+def test_from_metadata_round_trip():
+    m = MapInfo(
+        song_hash="abc123",
+        song_name="Test Song",
+        song_author="Artist",
+        mapper="Mapper",
+        ranked_date="2023-01-01T00:00:00+00:00",
+        source=Source.BEATLEADER,
+        stars=5.5,
+    )
+    assert MapInfo.from_metadata(m.to_metadata()) == m
@@ -0,0 +1,140 @@
+"""Tests for retrying page requests and fetch checkpoints."""
+
+import asyncio
+
+import pytest
+import httpx
+
+import bs_map_downloader.pagination as pagination
+from bs_map_downloader.models import CUTOFF_DATE, MapInfo, Source
+from bs_map_downloader.pagination import Checkpoint, get_page
+from bs_map_downloader.sources.beatleader import fetch_beatleader
+
+TS_2023 = 1672531200  # 2023-01-01 UTC
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Skip retry backoff sleeps; returns the delays that would have been slept."""
+    delays: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args):
+        if delay >= 1:
+            delays.append(delay)
+            delay = 0
+        await real_sleep(delay, *args)
+
+    monkeypatch.setattr(pagination.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def _map_info(song_hash: str) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.BEATSAVER,
+        download_url=f"https://cdn.example/{song_hash}.zip",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_page_retries_transient_errors(no_backoff):
+    responses = iter([httpx.Response(503), httpx.Response(429), httpx.Response(200, json={"ok": True})])
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return next(responses)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await get_page(client, "https://api.example/page") == {"ok": True}
+    assert no_backoff == [1.0, 2.0]
+
+
+@pytest.mark.asyncio
+async def test_get_page_does_not_retry_client_errors(no_backoff):
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(404)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await get_page(client, "https://api.example/page")
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_get_page_gives_up_after_retries(no_backoff):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("down")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(httpx.ConnectError):
+            await get_page(client, "https://api.example/page", retries=2)
+    assert len(no_backoff) == 2
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "cp.json"
+    Checkpoint(path, {"since": "2022"}).save(7, [_map_info("aaa")])
+
+    page, maps = Checkpoint(path, {"since": "2022"}).load()
+    assert page == 7
+    assert maps == [_map_info("aaa")]
+
+
+def test_checkpoint_ignored_for_other_query_or_when_stale(tmp_path):
+    path = tmp_path / "cp.json"
+    Checkpoint(path, {"since": "2022"}).save(7, [_map_info("aaa")])
+
+    assert Checkpoint(path, {"since": "2018"}).load() is None
+    assert Checkpoint(path, {"since": "2022"}, ttl=-1).load() is None
+
+
+def test_checkpoint_saves_every_n_pages(tmp_path):
+    cp = Checkpoint(tmp_path / "cp.json", {}, every=3)
+    cp.advance(2, [])
+    cp.advance(3, [])
+    assert cp.load() is None
+    cp.advance(4, [])
+    assert cp.load() == (4, [])
+
+
+def _bl_entry(song_hash: str) -> dict:
+    return {
+        "song": {"hash": song_hash, "name": "Song", "author": "Author", "mapper": "Mapper"},
+        "difficulty": {"rankedTime": TS_2023, "stars": 4.0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_interrupted_fetch_resumes_from_checkpoint(tmp_path, no_backoff):
+    pages = {1: [_bl_entry("aaa")], 2: [_bl_entry("bbb")], 3: [_bl_entry("ccc")], 4: []}
+    requested: list[int] = []
+    healthy = False
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        requested.append(page)
+        if page == 3 and not healthy:
+            return httpx.Response(502)
+        return httpx.Response(200, json={"data": pages[page]})
+
+    path = tmp_path / "beatleader.json"
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_beatleader(client, None, since=CUTOFF_DATE, until=None, checkpoint=Checkpoint(path, {}))
+
+        assert Checkpoint(path, {}).load()[0] == 3
+        healthy = True
+        requested.clear()
+        maps = await fetch_beatleader(client, None, since=CUTOFF_DATE, until=None, checkpoint=Checkpoint(path, {}))
+
+    assert [m.song_hash for m in maps] == ["aaa", "bbb", "ccc"]
+    assert requested == [3, 4]
+    assert not path.exists()
@@ -0,0 +1,76 @@
+"""Tests for per-phase profiling."""
+
+import asyncio
+import pstats
+import tracemalloc
+
+from bs_map_downloader.profiling import PhaseProfiler
+
+
+def _build_table(n: int) -> list[str]:
+    return [f"row {i}" * 10 for i in range(n)]
+
+
+def test_phases_write_numbered_profiles(tmp_path):
+    profiler = PhaseProfiler(tmp_path / "profile", top=5)
+    kept = []
+
+    with profiler.phase("fetch"):
+        kept.append(_build_table(20_000))
+
+    async def download():
+        await asyncio.sleep(0)
+        return _build_table(100)
+
+    async def run():
+        with profiler.phase("download"):
+            kept.append(await download())
+
+    asyncio.run(run())
+
+    names = sorted(p.name for p in (tmp_path / "profile").iterdir())
+    assert names == [
+        "01-fetch.prof",
+        "01-fetch.tracemalloc",
+        "01-fetch.txt",
+        "02-download.prof",
+        "02-download.tracemalloc",
+        "02-download.txt",
+    ]
+
+    stats = pstats.Stats(str(tmp_path / "profile" / "01-fetch.prof"))
+    assert any(func[2] == "_build_table" for func in stats.stats)
+
+    summary = (tmp_path / "profile" / "01-fetch.txt").read_text()
+    assert "phase: fetch (run 1)" in summary
+    assert "peak traced memory" in summary
+    # The call site that built the table is the biggest allocation growth
+    growth = summary.split("only counts towards the peak):\n")[1].splitlines()[0]
+    assert "test_profiling.py" in growth
+
+    snapshot = tracemalloc.Snapshot.load(str(tmp_path / "profile" / "02-download.tracemalloc"))
+    assert snapshot.statistics("filename")
+    assert not tracemalloc.is_tracing()
+
+
+def test_repeated_phases_overwrite_their_files(tmp_path):
+    profiler = PhaseProfiler(tmp_path, top=5)
+    for _ in range(3):
+        with profiler.phase("fetch"):
+            pass
+        with profiler.phase("download"):
+            pass
+
+    assert sorted(p.name for p in tmp_path.glob("*.txt")) == ["01-fetch.txt", "02-download.txt"]
+    assert "phase: fetch (run 3)" in (tmp_path / "01-fetch.txt").read_text()
+
+
+def test_phase_is_written_when_it_raises(tmp_path):
+    profiler = PhaseProfiler(tmp_path, top=5)
+    try:
+        with profiler.phase("install"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert (tmp_path / "01-install.txt").exists()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,76 @@
+"""Tests for bandwidth limiting."""
+
+import asyncio
+import time
+
+import pytest
+import httpx
+
+from bs_map_downloader.downloader import fetch_zip
+from bs_map_downloader.ratelimit import BandwidthLimiter, Pacer, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_bucket_enforces_rate():
+    bucket = TokenBucket(rate=100_000, burst=10_000)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.consume(10_000)
+    # 10k of burst, then 30k at 100k/s
+    assert time.monotonic() - start >= 0.28
+
+
+@pytest.mark.asyncio
+async def test_concurrent_consumers_share_fairly():
+    bucket = TokenBucket(rate=200_000, burst=5_000)
+    order: list[str] = []
+
+    async def transfer(name: str) -> None:
+        for _ in range(5):
+            await bucket.consume(5_000)
+            order.append(name)
+
+    await asyncio.gather(transfer("a"), transfer("b"))
+    # Past the initial burst, neither transfer gets ahead of the other
+    for i in range(1, len(order) + 1):
+        prefix = order[:i]
+        assert abs(prefix.count("a") - prefix.count("b")) <= 2
+    assert order[2:6] in (["b", "a", "b", "a"], ["a", "b", "a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_per_host_buckets_are_independent():
+    limiter = BandwidthLimiter(per_host_rate=50_000)
+    await limiter.throttle("https://a.example/x.zip", 50_000)
+    start = time.monotonic()
+    await limiter.throttle("https://b.example/x.zip", 50_000)
+    assert time.monotonic() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_fetch_zip_is_throttled(tmp_path):
+    body = b"x" * 300_000
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body)
+
+    limiter = BandwidthLimiter(rate=1_000_000)
+    start = time.monotonic()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await fetch_zip(client, "https://cdn.example/a.zip", tmp_path / "a.zip", limiter=limiter)
+
+    # 1 MB of burst is not exhausted by one 300 kB file, so check with a second transfer
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for name in ("b", "c", "d"):
+            await fetch_zip(client, f"https://cdn.example/{name}.zip", tmp_path / f"{name}.zip", limiter=limiter)
+
+    assert time.monotonic() - start >= 0.15
+    assert (tmp_path / "d.zip").read_bytes() == body
+
+
+@pytest.mark.asyncio
+async def test_pacer_spaces_calls_across_callers():
+    pacer = Pacer(0.05)
+    start = time.monotonic()
+    await asyncio.gather(*[pacer.wait() for _ in range(4)])
+    assert time.monotonic() - start >= 0.15
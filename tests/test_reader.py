@@ -0,0 +1,108 @@
+"""Tests for zero-extraction map reader."""
+
+import json
+import zipfile
+
+import pytest
+
+from bs_map_downloader.reader import MapArchive, MapReader, _read_index, read_index
+
+INFO_V2 = {
+    "_songFilename": "song.egg",
+    "_difficultyBeatmapSets": [
+        {
+            "_beatmapCharacteristicName": "Standard",
+            "_difficultyBeatmaps": [
+                {"_difficulty": "Expert", "_beatmapFilename": "ExpertStandard.dat"},
+                {"_difficulty": "Hard", "_beatmapFilename": "HardStandard.dat"},
+            ],
+        }
+    ],
+}
+
+
+def _make_zip(path, files: dict[str, bytes], compression=zipfile.ZIP_DEFLATED) -> None:
+    with zipfile.ZipFile(path, "w", compression=compression) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+
+
+def _map_files() -> dict[str, bytes]:
+    return {
+        "Info.dat": json.dumps(INFO_V2).encode(),
+        "ExpertStandard.dat": b'{"notes": [1, 2, 3]}' * 50,
+        "HardStandard.dat": b'{"notes": [1]}',
+        "song.egg": bytes(range(256)) * 40,
+    }
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_read_members(tmp_path, compression):
+    files = _map_files()
+    _make_zip(tmp_path / "abc.zip", files, compression)
+
+    with MapArchive(tmp_path / "abc.zip") as archive:
+        assert sorted(archive.names()) == sorted(files)
+        for name, content in files.items():
+            assert archive.read(name) == content
+
+
+def test_lookup_is_case_insensitive(tmp_path):
+    _make_zip(tmp_path / "abc.zip", {"info.dat": b"{}"})
+
+    with MapArchive(tmp_path / "abc.zip") as archive:
+        assert "Info.dat" in archive
+        assert archive.read("Info.dat") == b"{}"
+
+
+def test_missing_member_raises_key_error(tmp_path):
+    _make_zip(tmp_path / "abc.zip", {"Info.dat": b"{}"})
+
+    with MapArchive(tmp_path / "abc.zip") as archive:
+        with pytest.raises(KeyError):
+            archive.read("missing.dat")
+
+
+def test_info_audio_and_difficulties(tmp_path):
+    files = _map_files()
+    _make_zip(tmp_path / "abc.zip", files)
+
+    with MapArchive(tmp_path / "abc.zip") as archive:
+        assert archive.info() == INFO_V2
+        assert archive.audio() == files["song.egg"]
+        assert archive.difficulties() == {
+            "ExpertStandard.dat": files["ExpertStandard.dat"],
+            "HardStandard.dat": files["HardStandard.dat"],
+        }
+
+
+def test_bad_zip_raises(tmp_path):
+    (tmp_path / "bad.zip").write_bytes(b"not a zip at all")
+
+    with pytest.raises(zipfile.BadZipFile):
+        MapArchive(tmp_path / "bad.zip")
+
+
+def test_index_is_cached_until_file_changes(tmp_path):
+    path = tmp_path / "abc.zip"
+    _make_zip(path, {"Info.dat": b"{}"})
+
+    first = read_index(path)
+    hits = _read_index.cache_info().hits
+    assert read_index(path) is first
+    assert _read_index.cache_info().hits == hits + 1
+
+    _make_zip(path, {"Info.dat": b"{}", "extra.dat": b"x"})
+    assert "extra.dat" in read_index(path)
+
+
+def test_reader_scans_and_evicts(tmp_path):
+    for song_hash in ("aaa", "bbb", "ccc"):
+        _make_zip(tmp_path / f"{song_hash}.zip", _map_files())
+    (tmp_path / "empty.zip").write_bytes(b"")
+
+    with MapReader(tmp_path, max_open=2) as reader:
+        assert sorted(reader.hashes()) == ["aaa", "bbb", "ccc"]
+        for song_hash in ("aaa", "bbb", "ccc"):
+            assert reader.info(song_hash) == INFO_V2
+        assert list(reader._open) == ["bbb", "ccc"]
@@ -0,0 +1,85 @@
+"""Tests for HTTP Range zip inspection."""
+
+import io
+import os
+import zipfile
+
+import pytest
+import httpx
+
+from bs_map_downloader.remote import RemoteZip
+
+
+def _zip_bytes(files: dict[str, bytes], comment: bytes = b"") -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+        zf.comment = comment
+    return buf.getvalue()
+
+
+def _range_client(data: bytes, requests: list[str] | None = None, honor_range: bool = True) -> httpx.AsyncClient:
+    """Mock client serving `data` with single byte-range support."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        spec = request.headers.get("range", "").removeprefix("bytes=")
+        if requests is not None:
+            requests.append(spec)
+        if not honor_range or not spec:
+            return httpx.Response(200, content=data)
+        start, _, end = spec.partition("-")
+        if not start:
+            start_i, end_i = max(0, len(data) - int(end)), len(data) - 1
+        else:
+            start_i, end_i = int(start), min(int(end), len(data) - 1)
+        return httpx.Response(
+            206,
+            content=data[start_i : end_i + 1],
+            headers={"Content-Range": f"bytes {start_i}-{end_i}/{len(data)}"},
+        )
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_reads_member_without_full_download():
+    audio = os.urandom(200_000)
+    data = _zip_bytes({"song.egg": audio, "Info.dat": b'{"_beatsPerMinute": 128}'})
+    requests: list[str] = []
+
+    async with _range_client(data, requests) as client:
+        remote = RemoteZip(client, "https://cdn.example/abc.zip")
+        assert await remote.read("info.dat") == b'{"_beatsPerMinute": 128}'
+
+    assert remote.size == len(data)
+    assert remote.bytes_fetched < len(data) // 4
+    assert requests[0] == "-4096"
+
+
+@pytest.mark.asyncio
+async def test_large_comment_falls_back_to_full_eocd_search():
+    data = _zip_bytes({"Info.dat": b"{}"}, comment=b"x" * 10000)
+
+    async with _range_client(data) as client:
+        remote = RemoteZip(client, "https://cdn.example/abc.zip")
+        assert await remote.read("Info.dat") == b"{}"
+
+
+@pytest.mark.asyncio
+async def test_server_ignoring_range():
+    data = _zip_bytes({"Info.dat": b"{}", "song.egg": b"audio"})
+
+    async with _range_client(data, honor_range=False) as client:
+        remote = RemoteZip(client, "https://cdn.example/abc.zip")
+        assert await remote.read("song.egg") == b"audio"
+
+
+@pytest.mark.asyncio
+async def test_missing_member():
+    data = _zip_bytes({"Info.dat": b"{}"})
+
+    async with _range_client(data) as client:
+        remote = RemoteZip(client, "https://cdn.example/abc.zip")
+        with pytest.raises(KeyError):
+            await remote.read("missing.dat")
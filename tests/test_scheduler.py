@@ -0,0 +1,136 @@
+"""Tests for priority-ordered download scheduling."""
+
+import asyncio
+
+import pytest
+
+from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.scheduler import ByteBudget, DownloadScheduler, SizeEstimator, priority_key
+
+
+def _map_info(song_hash: str, ranked_date: str = "2023-01-01T00:00:00Z", stars: float = 0.0, size=None) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date=ranked_date,
+        source=Source.SCORESABER,
+        stars=stars,
+        size=size,
+    )
+
+
+async def _run_order(order: str, maps: list[MapInfo]) -> list[str]:
+    scheduler = DownloadScheduler(order, workers=1)
+    for m in maps:
+        scheduler.put(m)
+    seen: list[str] = []
+
+    async def handler(m: MapInfo) -> None:
+        seen.append(m.song_hash)
+
+    await scheduler.run(handler)
+    return seen
+
+
+@pytest.mark.asyncio
+async def test_orders():
+    maps = [
+        _map_info("old", "2022-03-01T00:00:00Z", stars=9, size=300),
+        _map_info("new", "2024-03-01T00:00:00+00:00", stars=2, size=None),
+        _map_info("mid", "2023-03-01T00:00:00.000Z", stars=5, size=100),
+    ]
+    assert await _run_order("input", maps) == ["old", "new", "mid"]
+    assert await _run_order("newest", maps) == ["new", "mid", "old"]
+    assert await _run_order("stars", maps) == ["old", "mid", "new"]
+    assert await _run_order("smallest", maps) == ["mid", "old", "new"]
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        priority_key("random")
+
+
+@pytest.mark.asyncio
+async def test_workers_bound_concurrency():
+    scheduler = DownloadScheduler(workers=3)
+    for i in range(10):
+        scheduler.put(_map_info(str(i)))
+    active = peak = 0
+
+    async def handler(m: MapInfo) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    await scheduler.run(handler)
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_caps_inflight_bytes():
+    scheduler = DownloadScheduler(workers=5, max_inflight_bytes=250)
+    for i in range(6):
+        scheduler.put(_map_info(str(i), size=100))
+    peak = 0
+
+    async def handler(m: MapInfo) -> int:
+        nonlocal peak
+        peak = max(peak, scheduler.budget.in_flight)
+        await asyncio.sleep(0.01)
+        return m.size
+
+    await scheduler.run(handler)
+    assert peak == 200
+
+
+@pytest.mark.asyncio
+async def test_oversized_transfer_is_admitted_alone():
+    budget = ByteBudget(100)
+    async with budget.reserve(1000):
+        assert budget.in_flight == 1000
+    assert budget.in_flight == 0
+
+
+def test_size_estimator():
+    estimator = SizeEstimator(default=50)
+    assert estimator.estimate(_map_info("a")) == 50
+    estimator.observe(100)
+    estimator.observe(300)
+    assert estimator.estimate(_map_info("a")) == 200
+    assert estimator.estimate(_map_info("a", size=7)) == 7
+
+
+@pytest.mark.asyncio
+async def test_resolve_and_transfer_are_separate_stages():
+    scheduler = DownloadScheduler(workers=2, resolvers=1)
+    scheduler.put(_map_info("slow_lookup"))
+    known = _map_info("known")
+    known.download_url = "https://cdn.example/known.zip"
+    scheduler.put(known)
+    scheduler.put(_map_info("unresolvable"))
+    events: list[str] = []
+
+    async def resolve(m: MapInfo) -> bool:
+        await asyncio.sleep(0.02)
+        events.append(f"resolved {m.song_hash}")
+        if m.song_hash == "unresolvable":
+            return False
+        m.download_url = f"https://cdn.example/{m.song_hash}.zip"
+        return True
+
+    async def transfer(m: MapInfo) -> None:
+        events.append(f"transferred {m.song_hash}")
+
+    await scheduler.run(transfer, resolve)
+
+    # The known map is transferred while the lookup is still in flight
+    assert events == [
+        "transferred known",
+        "resolved slow_lookup",
+        "transferred slow_lookup",
+        "resolved unresolvable",
+    ]
@@ -157,3 +157,20 @@ async def test_since_and_until():
 
     assert len(maps) == 1
     assert maps[0].song_hash == "in_range"
+
+
+@pytest.mark.asyncio
+async def test_stops_at_first_known_map():
+    """Polling stops paginating at the first already-known map."""
+    pages = {
+        1: [
+            _ss_entry("brand_new", "2025-06-01T00:00:00Z"),
+            _ss_entry("known", "2025-05-01T00:00:00Z"),
+            _ss_entry("older", "2025-04-01T00:00:00Z"),
+        ],
+        2: [_ss_entry("much_older", "2025-03-01T00:00:00Z")],
+    }
+    async with _make_client(pages) as client:
+        maps = await fetch_scoresaber(client, limit=None, since=CUTOFF_DATE, until=None, known={"known"})
+
+    assert [m.song_hash for m in maps] == ["brand_new"]
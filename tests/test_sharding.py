@@ -0,0 +1,66 @@
+"""Tests for deterministic sharding and manifest merging."""
+
+import json
+
+import pytest
+
+from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.sharding import Shard, merge_manifests, shard_of, write_manifest
+
+
+def _map_info(song_hash: str) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name=f"Song {song_hash}",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.SCORESABER,
+    )
+
+
+def test_parse():
+    assert Shard.parse("2/8") == Shard(2, 8)
+    assert str(Shard(2, 8)) == "2/8"
+    for bad in ("8/8", "-1/4", "1", "a/b", "0/0"):
+        with pytest.raises(ValueError):
+            Shard.parse(bad)
+
+
+def test_shards_partition_maps_disjointly():
+    maps = [_map_info(f"{i:040x}") for i in range(500)]
+    slices = [Shard(i, 4).filter(maps) for i in range(4)]
+
+    assert sum(len(s) for s in slices) == len(maps)
+    assert set().union(*({m.song_hash for m in s} for s in slices)) == {m.song_hash for m in maps}
+    # Roughly balanced
+    assert all(80 < len(s) < 170 for s in slices)
+
+
+def test_shard_of_is_stable_and_case_insensitive():
+    h = "ABCDEF0123456789ABCDEF0123456789ABCDEF01"
+    assert shard_of(h, 16) == shard_of(h.lower(), 16)
+    # Fixed value guards against accidental changes to the partitioning function
+    assert shard_of("abc", 1000) == 721
+
+
+def test_merge_manifests(tmp_path):
+    maps = [_map_info(h) for h in ("aaa", "bbb", "ccc")]
+    for i in range(2):
+        shard = Shard(i, 2)
+        write_manifest(tmp_path / f"m{i}.json", shard.filter(maps), shard)
+
+    merged = merge_manifests([tmp_path / "m0.json", tmp_path / "m1.json"])
+
+    assert sorted(e["songHash"] for e in merged) == ["aaa", "bbb", "ccc"]
+    assert json.loads((tmp_path / "m0.json").read_text())["shard"] == {"index": 0, "count": 2}
+
+
+def test_merge_dedups_and_warns_on_missing_shard(tmp_path, capsys):
+    write_manifest(tmp_path / "a.json", [_map_info("aaa")], Shard(0, 3))
+    write_manifest(tmp_path / "b.json", [_map_info("aaa"), _map_info("bbb")], Shard(1, 3))
+
+    merged = merge_manifests([tmp_path / "a.json", tmp_path / "b.json"])
+
+    assert [e["songHash"] for e in merged] == ["aaa", "bbb"]
+    assert "shard(s) 2" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+"""Tests for CLI startup cost and quiet output mode."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from bs_map_downloader import console, download_progress, fetch_progress, set_quiet
+
+# Modules newly loaded by importing the CLI module. It loads about 30 today; eagerly
+# importing asyncio adds ~30 more, and httpx or rich 60-90 each. Counting modules
+# rather than timing the import keeps the check independent of machine load
+IMPORT_MODULE_BUDGET = 45
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+
+def test_cli_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, bs_map_downloader.main, bs_map_downloader.reader; "
+        "print(sorted(m for m in ('rich', 'httpx', 'asyncio') if m in sys.modules))"
+    )
+    assert _run(["-c", code]).stdout.strip() == "[]"
+
+
+def test_cli_import_loads_few_stdlib_modules():
+    code = (
+        "import json, sys; before = set(sys.modules); import bs_map_downloader.main; "
+        "print(json.dumps(sorted(set(sys.modules) - before)))"
+    )
+    loaded = json.loads(_run(["-c", code]).stdout)
+    third_party = {m.split(".")[0] for m in loaded} - set(sys.stdlib_module_names) - {"bs_map_downloader"}
+    assert not third_party
+    assert len(loaded) < IMPORT_MODULE_BUDGET, loaded
+
+
+def test_help_does_not_load_heavy_dependencies():
+    code = (
+        "import sys\n"
+        "from bs_map_downloader.main import parse_args\n"
+        "try:\n"
+        "    parse_args(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted(m for m in ('rich', 'httpx', 'asyncio') if m in sys.modules), file=sys.stderr)"
+    )
+    assert _run(["-c", code]).stderr.strip() == "[]"
+
+
+@pytest.fixture
+def quiet():
+    set_quiet()
+    yield
+    set_quiet(False)
+
+
+def test_quiet_mode_prints_only_errors_to_stderr(quiet, capsys):
+    console.print("[green]Downloaded 3 new maps.[/green]")
+    console.print("[red]Styled red, but not an error[/red]")
+    console.error("Failed abc: boom")
+
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "Failed abc: boom" in err
+    assert "Downloaded" not in err
+    assert "Styled red" not in err
+
+
+def test_quiet_mode_renders_no_progress(quiet, capsys):
+    with fetch_progress("Fetching...", page="page {task.fields[page]}") as progress:
+        task = progress.add_task("fetch", total=None, page=0)
+        progress.update(task, page=1)
+    with download_progress("Downloading maps") as progress:
+        progress.advance(progress.add_task("download", total=1))
+
+    assert capsys.readouterr() == ("", "")
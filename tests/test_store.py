@@ -0,0 +1,143 @@
+"""Tests for the local map metadata store."""
+
+import pytest
+
+from bs_map_downloader.filters import MapFilter, features_from_map_info
+from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.store import MetadataStore, filter_sql
+
+
+def _map_info(
+    song_hash: str,
+    mapper: str = "Mapper",
+    stars: float = 5.0,
+    ranked_date: str = "2024-01-01T00:00:00Z",
+    source: Source = Source.SCORESABER,
+    download_url: str | None = None,
+) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name=f"Song {song_hash}",
+        song_author="Author",
+        mapper=mapper,
+        ranked_date=ranked_date,
+        source=source,
+        stars=stars,
+        download_url=download_url,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MetadataStore(tmp_path / "store.sqlite") as store:
+        store.add(
+            [
+                _map_info("aaa", mapper="Joetastic", stars=11.2, ranked_date="2024-07-01T10:00:00.000Z"),
+                _map_info(
+                    "bbb", mapper="joetastic", stars=9.0, ranked_date="2024-08-01T00:00:00+00:00", source=Source.BEATLEADER
+                ),
+                _map_info("ccc", mapper="Other", stars=12.0, ranked_date="2023-01-01T00:00:00Z"),
+                _map_info("ddd", mapper="Joetastic", stars=10.5, ranked_date="2024-06-15T00:00:00Z"),
+            ]
+        )
+        yield store
+
+
+def _hashes(maps: list[MapInfo]) -> list[str]:
+    return [m.song_hash for m in maps]
+
+
+def test_query_filters_case_insensitively_by_mapper_stars_and_date(store):
+    query = MapFilter.parse("mapper=JOETASTIC, stars>10, ranked_date>=2024-06-01")
+    assert _hashes(store.query(query)) == ["aaa", "ddd"]
+    assert _hashes(store.query(MapFilter.parse("source=BeatLeader"))) == ["bbb"]
+    assert _hashes(store.query(MapFilter.parse("ranked_date<2024-01-01"))) == ["ccc"]
+
+
+def test_query_sorts_and_limits(store):
+    assert _hashes(store.query()) == ["bbb", "aaa", "ddd", "ccc"]
+    assert _hashes(store.query(sort="oldest", limit=2)) == ["ccc", "ddd"]
+    assert _hashes(store.query(sort="stars", limit=2)) == ["ccc", "aaa"]
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        ("ranked_date=2024-07-01", ["aaa"]),
+        ("ranked_date==2024-07-01", ["aaa"]),
+        ("ranked_date!=2024-07-01", ["bbb", "ddd", "ccc"]),
+        ("ranked_date<=2024-07-01", ["aaa", "ddd", "ccc"]),
+        ("ranked_date>2024-07-01", ["bbb"]),
+        ("ranked_date>=2024-07-01", ["bbb", "aaa"]),
+        ("ranked_date<2024-07-01", ["ddd", "ccc"]),
+        ("ranked_date=2024-07-01T10:00:00Z", ["aaa"]),
+    ],
+)
+def test_bare_dates_cover_the_whole_day(store, expr, expected):
+    assert _hashes(store.query(MapFilter.parse(expr))) == expected
+    # The in-memory filter (used by export) agrees with the SQL translation
+    in_memory = [m for m in store.query() if MapFilter.parse(expr).matches(features_from_map_info(m))]
+    assert _hashes(in_memory) == expected
+
+
+def test_numeric_looking_text_values_compare_as_written(tmp_path):
+    with MetadataStore(tmp_path / "store.sqlite") as store:
+        store.add([_map_info("aaa", mapper="311"), _map_info("bbb", mapper="0.5"), _map_info("ccc", mapper="Other")])
+        assert _hashes(store.query(MapFilter.parse("mapper=311"))) == ["aaa"]
+        assert _hashes(store.query(MapFilter.parse("mapper=0.5"))) == ["bbb"]
+        assert sorted(_hashes(store.query(MapFilter.parse("mapper!=311")))) == ["bbb", "ccc"]
+
+
+def test_add_updates_and_keeps_known_download_url(tmp_path):
+    with MetadataStore(tmp_path / "store.sqlite") as store:
+        store.add([_map_info("aaa", stars=5.0, download_url="https://cdn.example/aaa.zip")])
+        store.add([_map_info("aaa", stars=6.5)])
+        assert len(store) == 1
+
+    with MetadataStore(tmp_path / "store.sqlite") as store:
+        [m] = store.query()
+    assert m.stars == 6.5
+    assert m.download_url == "https://cdn.example/aaa.zip"
+    assert m.source == Source.SCORESABER
+
+
+def test_beatsaver_records_keep_ranked_data(tmp_path):
+    with MetadataStore(tmp_path / "store.sqlite") as store:
+        store.add([_map_info("aaa", mapper="Joetastic", stars=11.5, ranked_date="2024-07-01T10:00:00Z")])
+        store.add(
+            [
+                _map_info(
+                    "aaa",
+                    mapper="Joetastic",
+                    stars=0,
+                    ranked_date="2023-02-03T00:00:00Z",
+                    source=Source.BEATSAVER,
+                    download_url="https://cdn.example/aaa.zip",
+                )
+            ]
+        )
+        [m] = store.query(MapFilter.parse("mapper=joetastic, stars>10, ranked_date>=2024-06-01"))
+        # A BeatSaver-only map still takes the BeatSaver record, and is upgraded by a ranked one
+        store.add([_map_info("bbb", stars=0, ranked_date="2023-01-01T00:00:00Z", source=Source.BEATSAVER)])
+        store.add([_map_info("bbb", stars=8.0, ranked_date="2024-05-01T00:00:00Z")])
+        [other] = store.query(MapFilter.parse("stars=8"))
+
+    assert (m.stars, m.source, m.ranked_date) == (11.5, Source.SCORESABER, "2024-07-01T10:00:00Z")
+    assert m.download_url == "https://cdn.example/aaa.zip"
+    assert (other.song_hash, other.source) == ("bbb", Source.SCORESABER)
+
+
+def test_filter_sql_rejects_unstored_fields_and_bad_values():
+    with pytest.raises(ValueError, match="bpm"):
+        filter_sql(MapFilter.parse("bpm>120"))
+    with pytest.raises(ValueError, match="ranked_date"):
+        filter_sql(MapFilter.parse("ranked_date>=june"))
+    with pytest.raises(ValueError, match="stars"):
+        filter_sql(MapFilter.parse("stars>high"))
+
+
+def test_queries_use_indexes(store):
+    for expr in ("mapper=joetastic", "stars>10", "ranked_date>=2024-06-01"):
+        where, params = filter_sql(MapFilter.parse(expr))
+        plan = store._db.execute(f"EXPLAIN QUERY PLAN SELECT * FROM maps WHERE {where}", params).fetchall()
+        assert "USING INDEX" in " ".join(row[-1] for row in plan), expr
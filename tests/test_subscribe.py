@@ -0,0 +1,128 @@
+"""Tests for the BeatSaver websocket feed subscriber."""
+
+import asyncio
+import json
+
+import pytest
+
+import bs_map_downloader.subscribe as subscribe_mod
+from bs_map_downloader.subscribe import map_from_event, subscribe
+
+
+def _event(song_hash: str, mapper: str = "Mapper", state: str = "Published") -> dict:
+    return {
+        "type": "MAP_UPDATE",
+        "msg": {
+            "versions": [{"hash": song_hash, "state": state, "downloadURL": f"https://cdn.example/{song_hash}.zip"}],
+            "metadata": {"songName": "Song", "songAuthorName": "Author", "levelAuthorName": mapper},
+            "uploader": {"name": mapper},
+            "uploaded": "2025-01-01T00:00:00Z",
+        },
+    }
+
+
+def test_map_from_event():
+    m = map_from_event(_event("ABC"))
+    assert m.song_hash == "abc"
+    assert m.download_url == "https://cdn.example/ABC.zip"
+
+    assert map_from_event(_event("abc", state="Testplay")) is None
+    assert map_from_event({"type": "MAP_DELETE", "msg": "1a2b"}) is None
+    assert map_from_event(_event("abc", mapper="Someone"), mappers={"tracked"}) is None
+    assert map_from_event(_event("abc", mapper="Tracked"), mappers={"tracked"}) is not None
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Start a local feed that sends each connection the next list of events, then hangs up.
+
+    Connections after the first wait delay seconds before sending.
+    """
+    server_mod = pytest.importorskip("websockets.asyncio.server")
+    monkeypatch.setattr(subscribe_mod, "RECONNECT_MIN", 0.01)
+
+    async def start(connections: list[list[dict]], delay: float = 0):
+        remaining = list(connections)
+
+        async def handler(ws):
+            if len(remaining) < len(connections):
+                await asyncio.sleep(delay)
+            events = remaining.pop(0) if remaining else []
+            for event in events:
+                await ws.send(json.dumps(event))
+            if not remaining:
+                await ws.wait_closed()
+
+        server = await server_mod.serve(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        return server, f"ws://127.0.0.1:{port}"
+
+    return start
+
+
+async def _run_until(url: str, known: set[str], expected: int, **kwargs) -> list[list[str]]:
+    batches: list[list[str]] = []
+    stop = asyncio.Event()
+
+    async def deliver(maps):
+        batches.append([m.song_hash for m in maps])
+        if sum(map(len, batches)) >= expected:
+            stop.set()
+        return maps
+
+    await asyncio.wait_for(subscribe(deliver, known, stop, url=url, batch_delay=0.05, **kwargs), timeout=5)
+    return batches
+
+
+@pytest.mark.asyncio
+async def test_pushed_maps_are_delivered_once(serve):
+    events = [_event("aaa"), _event("aaa"), _event("old"), {"type": "MAP_DELETE", "msg": "x"}, _event("bbb")]
+    server, url = await serve([events])
+    known = {"old"}
+    async with server:
+        batches = await _run_until(url, known, expected=2)
+
+    assert batches == [["aaa", "bbb"]]
+    assert known == {"old", "aaa", "bbb"}
+
+
+@pytest.mark.asyncio
+async def test_reconnects_after_connection_drops(serve):
+    server, url = await serve([[_event("aaa")], [_event("bbb")]])
+    async with server:
+        batches = await _run_until(url, set(), expected=2)
+
+    assert sorted(h for batch in batches for h in batch) == ["aaa", "bbb"]
+
+
+@pytest.mark.asyncio
+async def test_only_tracked_mappers(serve):
+    server, url = await serve([[_event("aaa", mapper="Other"), _event("bbb", mapper="Tracked")]])
+    async with server:
+        batches = await _run_until(url, set(), expected=1, mappers={"tracked"})
+
+    assert batches == [["bbb"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_logged_and_draining_continues(serve, capsys):
+    # The feed resends aaa after the first delivery has failed
+    server, url = await serve([[_event("aaa")], [_event("aaa"), _event("bbb")]], delay=0.3)
+    batches: list[list[str]] = []
+    stop = asyncio.Event()
+
+    async def deliver(maps):
+        if not batches:
+            batches.append([])
+            raise RuntimeError("boom")
+        batches.append([m.song_hash for m in maps])
+        stop.set()
+        return maps
+
+    known: set[str] = set()
+    async with server:
+        await asyncio.wait_for(subscribe(deliver, known, stop, url=url, batch_delay=0.05), timeout=5)
+
+    assert batches == [[], ["aaa", "bbb"]]
+    assert known == {"aaa", "bbb"}
+    assert "Delivery failed: RuntimeError('boom')" in capsys.readouterr().out
@@ -0,0 +1,159 @@
+"""Tests for incremental install-dir sync."""
+
+import json
+import zipfile
+
+from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.sync import MANIFEST_NAME, load_manifest, sync_install
+
+
+def _map_info(song_hash: str) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.SCORESABER,
+    )
+
+
+def _make_zip(path, files: dict[str, bytes]) -> None:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+
+
+def _dirs(tmp_path):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    return downloads, tmp_path / "CustomLevels"
+
+
+def test_installs_and_records_manifest(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a"})
+
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert result.installed == 1
+    assert (install / "aaa" / "info.dat").read_bytes() == b"a"
+    assert set(load_manifest(install)) == {"aaa"}
+
+
+def test_second_sync_is_a_no_op(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a"})
+    sync_install([_map_info("aaa")], downloads, install)
+
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert (result.installed, result.repaired, result.unchanged) == (0, 0, 1)
+
+
+def test_prunes_only_managed_maps(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "old.zip", {"info.dat": b"old"})
+    sync_install([_map_info("old")], downloads, install)
+    (install / "users_own_map").mkdir()
+
+    result = sync_install([], downloads, install)
+
+    assert result.pruned == 1
+    assert not (install / "old").exists()
+    assert (install / "users_own_map").exists()
+    assert load_manifest(install) == {}
+
+
+def test_prune_to_trash_dir(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    trash = tmp_path / "trash"
+    _make_zip(downloads / "old.zip", {"info.dat": b"old"})
+    sync_install([_map_info("old")], downloads, install)
+
+    sync_install([], downloads, install, trash_dir=trash)
+
+    assert (trash / "old" / "info.dat").read_bytes() == b"old"
+
+
+def test_repairs_unmanaged_and_partial_directories(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a", "song.egg": b"audio"})
+    # Half-extracted directory from an interrupted install_maps run
+    (install / "aaa").mkdir(parents=True)
+    (install / "aaa" / "info.dat").write_bytes(b"a")
+    # Leftover from an interrupted atomic extraction
+    (install / ".bbb.partial").mkdir()
+
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert result.repaired == 1
+    assert (install / "aaa" / "song.egg").read_bytes() == b"audio"
+    assert not (install / ".bbb.partial").exists()
+
+
+def test_reextracts_when_zip_changes(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"v1"})
+    sync_install([_map_info("aaa")], downloads, install)
+
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"version two"})
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert result.repaired == 1
+    assert (install / "aaa" / "info.dat").read_bytes() == b"version two"
+
+
+def test_reinstalls_deleted_managed_map_and_skips_missing_zip(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a"})
+    sync_install([_map_info("aaa")], downloads, install)
+    (install / "aaa" / "info.dat").unlink()
+    (install / "aaa").rmdir()
+
+    result = sync_install([_map_info("aaa"), _map_info("nozip")], downloads, install)
+
+    assert result.installed == 1
+    assert result.missing == 1
+    assert (install / "aaa" / "info.dat").exists()
+
+
+def test_corrupt_manifest_is_ignored(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    install.mkdir()
+    (install / MANIFEST_NAME).write_text("{not json")
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a"})
+
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert result.installed == 1
+    assert json.loads((install / MANIFEST_NAME).read_text())["maps"]["aaa"]["size"] > 0
+
+
+def test_adopts_complete_unmanaged_directory_without_reextracting(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    _make_zip(downloads / "aaa.zip", {"info.dat": b"a", "song.egg": b"audio"})
+    (install / "aaa").mkdir(parents=True)
+    (install / "aaa" / "info.dat").write_bytes(b"A")
+    (install / "aaa" / "song.egg").write_bytes(b"AUDIO")
+    (install / "aaa" / "notes.txt").write_bytes(b"user file")
+
+    result = sync_install([_map_info("aaa")], downloads, install)
+
+    assert result.unchanged == 1 and result.repaired == 0
+    assert (install / "aaa" / "info.dat").read_bytes() == b"A"
+    assert (install / "aaa" / "notes.txt").exists()
+    assert "aaa" in load_manifest(install)
+
+
+def test_no_prune_keeps_managed_maps_outside_the_selection(tmp_path):
+    downloads, install = _dirs(tmp_path)
+    for h in ("aaa", "bbb"):
+        _make_zip(downloads / f"{h}.zip", {"info.dat": h.encode()})
+    sync_install([_map_info("aaa"), _map_info("bbb")], downloads, install)
+
+    result = sync_install([_map_info("aaa")], downloads, install, prune=False)
+
+    assert result.pruned == 0
+    assert (install / "bbb").exists()
+    assert set(load_manifest(install)) == {"aaa", "bbb"}
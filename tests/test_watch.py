@@ -0,0 +1,124 @@
+"""Tests for watch mode."""
+
+import asyncio
+import os
+import signal
+
+import pytest
+import httpx
+
+from bs_map_downloader.models import MapInfo, Source
+from bs_map_downloader.watch import downloaded_hashes, install_stop_signals, watch
+
+
+def _map_info(song_hash: str) -> MapInfo:
+    return MapInfo(
+        song_hash=song_hash,
+        song_name="Test",
+        song_author="Author",
+        mapper="Mapper",
+        ranked_date="2023-01-01",
+        source=Source.SCORESABER,
+    )
+
+
+def test_downloaded_hashes(tmp_path):
+    (tmp_path / "aaa.zip").write_bytes(b"PK")
+    (tmp_path / "empty.zip").write_bytes(b"")
+    (tmp_path / "bbb.zip.part").write_bytes(b"PK")
+
+    assert downloaded_hashes(tmp_path) == {"aaa"}
+    assert downloaded_hashes(tmp_path / "missing") == set()
+
+
+@pytest.mark.asyncio
+async def test_watch_delivers_only_new_maps_and_retries_failures():
+    stop = asyncio.Event()
+    feed = [["old", "new1"], ["new2", "new1", "flaky"], ["flaky"]]
+    polled_with: list[set[str]] = []
+    delivered: list[list[str]] = []
+
+    async def poll(known: set[str]) -> list[MapInfo]:
+        polled_with.append(set(known))
+        hashes = feed[len(polled_with) - 1]
+        if len(polled_with) == len(feed):
+            stop.set()
+        return [_map_info(h) for h in hashes]
+
+    async def deliver(maps: list[MapInfo]) -> list[MapInfo]:
+        delivered.append([m.song_hash for m in maps])
+        # "flaky" fails the first time it's delivered
+        return [m for m in maps if m.song_hash != "flaky" or len(delivered) > 2]
+
+    known = {"old"}
+    await watch(poll, deliver, known, interval=0, stop=stop)
+
+    assert delivered == [["new1"], ["new2", "flaky"], ["flaky"]]
+    assert known == {"old", "new1", "new2", "flaky"}
+
+
+@pytest.mark.asyncio
+async def test_watch_survives_poll_errors():
+    stop = asyncio.Event()
+    calls = 0
+
+    async def poll(known: set[str]) -> list[MapInfo]:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise httpx.ConnectError("down")
+        stop.set()
+        return [_map_info("aaa")]
+
+    delivered: list[MapInfo] = []
+
+    async def deliver(maps: list[MapInfo]) -> list[MapInfo]:
+        delivered.extend(maps)
+        return maps
+
+    await watch(poll, deliver, set(), interval=0, stop=stop)
+
+    assert [m.song_hash for m in delivered] == ["aaa"]
+
+
+@pytest.mark.asyncio
+async def test_watch_survives_delivery_errors():
+    stop = asyncio.Event()
+    attempts = 0
+
+    async def poll(known: set[str]) -> list[MapInfo]:
+        return [_map_info("aaa")]
+
+    async def deliver(maps: list[MapInfo]) -> list[MapInfo]:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            request = httpx.Request("GET", "https://api.beatsaver.com/maps/hash/aaa")
+            raise httpx.HTTPStatusError("bad gateway", request=request, response=httpx.Response(502))
+        stop.set()
+        return maps
+
+    known: set[str] = set()
+    await watch(poll, deliver, known, interval=0, stop=stop)
+
+    assert attempts == 2
+    assert known == {"aaa"}
+
+
+@pytest.mark.asyncio
+async def test_sigterm_stops_watch():
+    stop = asyncio.Event()
+    install_stop_signals(stop)
+
+    async def poll(known: set[str]) -> list[MapInfo]:
+        return []
+
+    async def deliver(maps: list[MapInfo]) -> list[MapInfo]:
+        return maps
+
+    task = asyncio.create_task(watch(poll, deliver, set(), interval=60, stop=stop))
+    await asyncio.sleep(0.01)
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(task, 1)
+
+    assert stop.is_set()